@@ -0,0 +1,77 @@
+"""Compare batch and streaming subtask division against a fake streaming LLM.
+
+Usage:
+    python bench_streaming.py [--subtasks 200] [--token-latency 0.0005] [--result-kb 20]
+
+The fake LLM (``FakeStreamingLLM`` from test_streaming.py) answers the
+division prompt with ``--subtasks`` lines (and blank lines between them) at
+``--token-latency`` seconds per token, and answers each subtask with
+``--result-kb`` of text after ``--task-latency`` seconds.
+
+Batch mode waits for the whole division, runs the subtasks and joins the
+results in memory. Streaming mode dispatches each subtask as its line arrives
+and writes results through a ResultWriter. Reported for each: time to the
+first dispatched subtask, wall time and peak traced memory.
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from pr.agent_management import AgentManagement
+from pr.result_aggregation_system import ResultAggregationSystem, ResultWriter
+from pr.subtask_division_system import SubTaskDivisionSystem
+from pr.task_manager import TaskComponent
+from pr.task_scheduler import TaskScheduler
+from test_streaming import FakeStreamingLLM
+
+
+def run(mode, llm, agents, out_path):
+    divider = SubTaskDivisionSystem(llm)
+    scheduler = TaskScheduler(llm, agents)
+    task = TaskComponent("benchmark")
+    tracemalloc.start()
+    start = time.perf_counter()
+    if mode == "batch":
+        subtasks = divider.divide_task(task)
+        aggregator = ResultAggregationSystem()
+        scheduler.run(subtasks, on_result=aggregator.add_result)
+        with open(out_path, "w", encoding="utf-8") as out:
+            out.write(aggregator.aggregate_results())
+        count = len(subtasks.subtasks)
+    else:
+        with ResultWriter(out_path) as writer:
+            scheduler.run_stream(divider.iter_subtasks(task), on_result=writer.add_result)
+        count = writer.count
+    wall = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, llm.first_call - start, wall, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming subtask division")
+    parser.add_argument("--subtasks", type=int, default=200)
+    parser.add_argument("--tokens-per-line", type=int, default=20)
+    parser.add_argument("--token-latency", type=float, default=0.0005, help="Seconds per token")
+    parser.add_argument("--task-latency", type=float, default=0.02, help="Seconds per subtask")
+    parser.add_argument("--result-kb", type=int, default=20, help="Size of each subtask result")
+    parser.add_argument("--agents", type=int, default=8)
+    args = parser.parse_args()
+
+    agent_mgmt = AgentManagement()
+    agents = [agent_mgmt.add_agent(f"agent_{i}") for i in range(args.agents)]
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("batch", "stream"):
+            llm = FakeStreamingLLM(args.subtasks, args.tokens_per_line, args.token_latency,
+                                   args.task_latency, args.result_kb)
+            out_path = os.path.join(tmp, f"{mode}.txt")
+            count, first, wall, peak = run(mode, llm, agents, out_path)
+            size = os.path.getsize(out_path)
+            print(f"{mode:7} subtasks {count:5}  first dispatch {first * 1000:7.1f} ms  "
+                  f"wall {wall:6.2f}s  peak memory {peak / 2**20:6.1f} MiB  output {size / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Benchmark and check the TaskManager scheduler on a large DAG.
+
+Usage:
+    python bench_task_manager.py [--tasks 300000] [--cancel 0.001] [--reprioritize 0.05]
+
+Builds a random DAG (each task depends on up to two of the ``--window`` tasks
+before it, with a random priority), then drains it with ``pop_ready`` and
+``complete`` while cancelling and reprioritizing tasks along the way. The run
+checks that no task starts before its dependencies, that cancelled tasks and
+their dependents never start, and that sampled pops always take a
+highest-priority ready task. It also times cycle detection on the same graph
+with one back edge added.
+"""
+import argparse
+import random
+import time
+
+from pr.task_manager import CANCELLED, DONE, TaskComponent, TaskManager
+
+
+def build_tasks(count: int, window: int, rng: random.Random):
+    tasks = []
+    for i in range(count):
+        low = max(0, i - window)
+        deps = [tasks[rng.randrange(low, i)] for _ in range(rng.randint(0, 2))] if i else []
+        tasks.append(TaskComponent(f"task {i}", deps, priority=rng.randrange(10)))
+    return tasks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the TaskManager scheduler")
+    parser.add_argument("--tasks", type=int, default=300_000)
+    parser.add_argument("--window", type=int, default=1000, help="How far back dependencies reach")
+    parser.add_argument("--cancel", type=float, default=0.001, help="Share of tasks cancelled up front")
+    parser.add_argument("--reprioritize", type=float, default=0.05,
+                        help="Reprioritizations per pop, on random ready tasks")
+    parser.add_argument("--sample", type=int, default=5000, help="Check heap order every N pops")
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    tasks = build_tasks(args.tasks, args.window, rng)
+    manager = TaskManager()
+    start = time.perf_counter()
+    entities = manager.add_tasks(tasks)
+    add = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cancelled = set()
+    for entity in rng.sample(entities, int(args.tasks * args.cancel)):
+        cancelled.update(manager.cancel(entity))
+    cancel = time.perf_counter() - start
+
+    order = {}
+    reprioritized = 0
+    start = time.perf_counter()
+    while True:
+        if args.sample and len(order) % args.sample == 0 and len(manager.ready):
+            best = max(manager.store.get(e, "priority") for e in manager.ready_tasks())
+        else:
+            best = None
+        entity = manager.pop_ready()
+        if entity is None:
+            break
+        if best is not None:
+            assert manager.store.get(entity, "priority") == best, "pop skipped a higher priority"
+        order[entity] = len(order)
+        manager.complete(entity)
+        if rng.random() < args.reprioritize and len(manager.ready):
+            target = manager.ready.dense[rng.randrange(len(manager.ready))]
+            manager.reprioritize(target, rng.randrange(10))
+            reprioritized += 1
+    drain = time.perf_counter() - start
+
+    for task, entity in zip(tasks, entities):
+        if entity in cancelled:
+            assert entity not in order and manager.status(entity) == CANCELLED
+            continue
+        assert manager.status(entity) == DONE, f"{task.description} never ran"
+        for dep in task.dependencies:
+            assert order[manager.entities[dep]] < order[entity], "ran before a dependency"
+
+    # Close a loop between the last task with a dependency and that dependency.
+    last = next(task for task in reversed(tasks) if task.dependencies)
+    last.dependencies[0].dependencies.append(last)
+    start = time.perf_counter()
+    try:
+        TaskManager().add_tasks(tasks)
+        raise AssertionError("cycle not detected")
+    except ValueError:
+        pass
+    cycle = time.perf_counter() - start
+
+    print(f"tasks:            {args.tasks:,}")
+    print(f"add (with cycle check): {add:.2f}s")
+    print(f"cancel:           {len(cancelled):,} tasks (incl. dependents) in {cancel * 1000:.0f} ms")
+    print(f"drain:            {len(order):,} tasks, {reprioritized:,} reprioritized, {drain:.2f}s "
+          f"({len(order) / drain:,.0f} tasks/s)")
+    print(f"cycle detection:  {cycle:.2f}s")
+    print("checks:           dependency order, cancellation and priority order OK")
+
+
+if __name__ == "__main__":
+    main()
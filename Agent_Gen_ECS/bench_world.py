@@ -0,0 +1,97 @@
+"""Benchmark the ECS World with a large number of task entities.
+
+Usage:
+    python bench_world.py [--tasks 1000000] [--max-deps 2] [--window 1000]
+
+Builds a random DAG of tasks in a TaskManager (each task depends on up to
+``--max-deps`` tasks among the ``--window`` before it), then reports memory
+per entity, the cost of querying ready tasks and idle agents, and the time
+for a system to drain the graph by completing ready tasks wave by wave.
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from pr.agent_management import AgentManagement
+from pr.task_manager import TaskComponent, TaskManager
+from pr.world import World
+
+
+def build_tasks(count: int, max_deps: int, window: int, seed: int = 0):
+    rng = random.Random(seed)
+    tasks = []
+    for i in range(count):
+        low = max(0, i - window)
+        deps = [tasks[rng.randrange(low, i)] for _ in range(rng.randint(0, max_deps))] if i else []
+        tasks.append(TaskComponent(f"task {i}", deps))
+    return tasks
+
+
+def build_world(tasks, agents: int):
+    world = World()
+    manager = TaskManager(world)
+    manager.add_tasks(tasks)
+    agent_mgmt = AgentManagement(world)
+    for i in range(agents):
+        agent_mgmt.add_agent(f"agent_{i}")
+    return world, manager, agent_mgmt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ECS World")
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--max-deps", type=int, default=2, help="Dependencies per task, at most")
+    parser.add_argument("--window", type=int, default=1000, help="How far back dependencies reach")
+    parser.add_argument("--agents", type=int, default=1000)
+    args = parser.parse_args()
+
+    tasks = build_tasks(args.tasks, args.max_deps, args.window)
+
+    # Memory is measured on a separate build; tracing slows allocation down.
+    tracemalloc.start()
+    traced = build_world(tasks, args.agents)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del traced
+
+    start = time.perf_counter()
+    world, manager, agent_mgmt = build_world(tasks, args.agents)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ready = sum(1 for _ in world.query("task", "ready"))
+    query = time.perf_counter() - start
+    start = time.perf_counter()
+    idle = sum(1 for _ in agent_mgmt.idle_agents())
+    idle_query = time.perf_counter() - start
+
+    # A status scan over the dense column, the way a system sweeps a store.
+    start = time.perf_counter()
+    pending = manager.store.columns["status"].count(0)
+    scan = time.perf_counter() - start
+
+    start = time.perf_counter()
+    waves = done = 0
+    while len(manager.ready):
+        waves += 1
+        for entity in manager.ready_tasks():
+            manager.start(entity)
+            manager.complete(entity)
+            done += 1
+    drain = time.perf_counter() - start
+
+    entities = args.tasks + args.agents
+    print(f"entities:           {entities:,}")
+    print(f"build:              {build:.2f}s")
+    print(f"world memory:       {memory / 2**20:.1f} MiB ({memory / entities:.0f} B/entity, "
+          f"excluding the TaskComponent objects)")
+    print(f"ready query:        {ready:,} tasks in {query * 1000:.1f} ms")
+    print(f"idle agents query:  {idle:,} agents in {idle_query * 1000:.2f} ms")
+    print(f"status scan:        {pending:,} pending in {scan * 1000:.1f} ms")
+    print(f"drain:              {done:,} tasks in {waves} waves, {drain:.2f}s "
+          f"({done / drain:,.0f} tasks/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,82 @@
+import argparse
 import os
 import json
+import sys
+import time
 from datetime import datetime
+from pathlib import Path
 from typing import List, Dict
+
+# llm_common sits at the repository root, shared with agentic_task_gen.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
 from pr.task_generation_system import TaskGenerationSystem
 from pr.subtask_division_system import SubTaskDivisionSystem
-from pr.task_assignment_system import TaskAssignmentSystem
-from pr.result_aggregation_system import ResultAggregationSystem
+from pr.task_scheduler import TaskScheduler
+from pr.result_aggregation_system import ResultWriter
 from pr.agent_management import AgentManagement
 from pr.task_manager import TaskManager
 from pr.llm import LLM
+from pr.llm_cache import CachedLLM
+from pr.world import World
+from llm_common.run_journal import JournaledLLM, RunJournal
+
+MODEL = "gpt-3.5-turbo"
 
 # Main Execution Flow
 def main():
-    llm = LLM()
+    parser = argparse.ArgumentParser(description="Generate, divide and run tasks with an LLM")
+    parser.add_argument("--journal", default="run_journal.jsonl",
+                        help="Run journal; an interrupted run resumes from it")
+    parser.add_argument("--fresh", action="store_true", help="Discard the journal and start over")
+    parser.add_argument("--replay", action="store_true",
+                        help="Answer every prompt from the journal without calling the API")
+    args = parser.parse_args()
+    if args.fresh and os.path.exists(args.journal):
+        os.remove(args.journal)
+    start = time.perf_counter()
+
+    journal = RunJournal(args.journal)
+    # Prompts answered in the journal are not sent again; the rest go through
+    # llm_cache.sqlite3, which answers identical prompts from earlier runs.
+    cached = None if args.replay else CachedLLM(LLM(model=MODEL), path="llm_cache.sqlite3")
+    llm = JournaledLLM(cached, journal, replay=args.replay, model=MODEL)
     task_gen_system = TaskGenerationSystem(llm)
     subtask_div_system = SubTaskDivisionSystem(llm)
-    task_assign_system = TaskAssignmentSystem()
-    result_agg_system = ResultAggregationSystem()
-    agent_mgmt = AgentManagement()
-    task_manager = TaskManager()
+    # Agents and tasks are entities of one ECS world.
+    world = World()
+    agent_mgmt = AgentManagement(world)
+    task_manager = TaskManager(world)
 
     # Example Agents
     agents = [agent_mgmt.add_agent(f"agent_{i}") for i in range(3)]
 
     # Generate Main Task
     main_task = task_gen_system.generate_task("Create a comprehensive guide on AI-driven task management systems.")
-    task_manager.add_task(main_task)
-
-    # Divide Main Task into Sub-Tasks
-    subtasks = subtask_div_system.divide_task(main_task)
-    task_manager.add_subtasks(main_task, subtasks)
-
-    # Assign Sub-Tasks to Agents
-    assignments = task_assign_system.assign_tasks(subtasks, agents)
-
-    # Simulate Agent Processing (For Demonstration)
-    results = {agent: f"Result from {agent.agent_id} for {task.description}" for agent, task in assignments.items()}
-
-    # Aggregate Results
-    final_result = result_agg_system.aggregate_results(results)
+    main_entity = task_manager.add_task(main_task)
+    # The main task is divided, not executed, so keep it away from the scheduler.
+    task_manager.start(main_entity)
+    journal.record_state(main_task.description, "generated")
+
+    # Divide Main Task into Sub-Tasks, Dispatching Each as Soon as It Is Parsed
+    divided = []
+
+    def stream_subtasks():
+        for subtask in subtask_div_system.iter_subtasks(main_task):
+            divided.append(subtask)
+            yield subtask
+
+    # Run Sub-Tasks in Parallel Across Agents, Writing Results as They Finish
+    scheduler = TaskScheduler(llm, agents, task_manager=task_manager, journal=journal)
+    with ResultWriter("final_result.txt") as result_writer:
+        scheduler.run_stream(stream_subtasks(), on_result=result_writer.add_result)
+        if scheduler.failures:
+            # Failed sub-tasks get a second, separate pass; failures are never written as results.
+            print(f"Retrying {len(scheduler.failures)} failed sub-tasks.")
+            scheduler.retry_failed(on_result=result_writer.add_result)
+    task_manager.subtasks[main_entity] = [task_manager.entities[subtask] for subtask in divided]
+    task_manager.complete(main_entity)
+    journal.record_state(main_task.description, "divided", subtasks=len(divided))
 
     # Generate README.md
     readme_content = generate_readme()
@@ -48,6 +86,14 @@ def main():
         readme_file.write(readme_content)
 
     print("README.md generated successfully.")
+    print(f"{result_writer.count} sub-task results written to final_result.txt.")
+    if scheduler.failures:
+        print(f"{len(scheduler.failures)} sub-tasks still failing; rerun to retry them.")
+    print(f"Journal: {llm.stats} in {time.perf_counter() - start:.3f}s")
+    if cached is not None:
+        print(f"LLM cache: {cached.stats()}")
+    llm.close()
+    journal.close()
 
 def generate_readme():
     return f"""
@@ -60,14 +106,19 @@ This project implements an AI-driven task management system using principles fro
 - **TaskComponent**: Stores task descriptions.
 - **SubTaskComponent**: Stores sub-task lists derived from a main task.
 - **AgentComponent**: Represents an agent handling tasks.
+- **World**: Holds agents and tasks as integer entities with array-backed component stores and tag queries.
 
 ## Systems
 - **TaskGenerationSystem**: Generates initial tasks from prompts.
 - **SubTaskDivisionSystem**: Breaks tasks into smaller sub-tasks.
 - **TaskAssignmentSystem**: Assigns sub-tasks to agents.
+- **TaskScheduler**: Runs sub-tasks in parallel across agents in dependency order.
 - **ResultAggregationSystem**: Aggregates results into a final package.
+- **ResultWriter**: Streams sub-task results to a file as they finish.
 - **AgentManagement**: Manages dynamic addition and removal of agents.
 - **TaskManager**: Manages tasks with different priority levels and dependencies.
+- **CachedLLM**: Caches LLM responses in memory and on disk and coalesces duplicate requests.
+- **RunJournal**: Records every prompt, response and task state so interrupted runs resume and runs can be replayed.
 
 ## File Structure
 """
@@ -1,16 +1,47 @@
+from typing import Dict, Iterator, List, Optional
+
+from pr.world import World
+
+
 class AgentComponent:
+    __slots__ = ("agent_id",)
+
     def __init__(self, agent_id: str):
         self.agent_id = agent_id
 
 
 class AgentManagement:
-    def __init__(self):
-        self.agents = []
+    """Agents as entities of a World, tagged "idle" while free for work."""
+
+    def __init__(self, world: Optional[World] = None):
+        self.world = world if world is not None else World()
+        self.store = self.world.register("agent", {"component": "O"})
+        self.idle = self.world.register("idle")
+        self._entities: Dict[str, int] = {}
+
+    @property
+    def agents(self) -> List[AgentComponent]:
+        return list(self.store.columns["component"])
 
     def add_agent(self, agent_id: str) -> AgentComponent:
         agent = AgentComponent(agent_id)
-        self.agents.append(agent)
+        entity = self._entities[agent_id] = self.world.create()
+        self.store.add(entity, component=agent)
+        self.idle.add(entity)
         return agent
 
     def remove_agent(self, agent_id: str):
-        self.agents = [agent for agent in self.agents if agent.agent_id != agent_id]
+        entity = self._entities.pop(agent_id, None)
+        if entity is not None:
+            self.world.destroy(entity)
+
+    def idle_agents(self) -> Iterator[AgentComponent]:
+        return (self.store.get(entity, "component") for entity in self.idle)
+
+    def set_busy(self, agent: AgentComponent) -> None:
+        self.idle.remove(self._entities[agent.agent_id])
+
+    def set_idle(self, agent: AgentComponent) -> None:
+        entity = self._entities.get(agent.agent_id)
+        if entity is not None:
+            self.idle.add(entity)
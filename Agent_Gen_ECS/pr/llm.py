@@ -1,19 +1,46 @@
-from openai import OpenAI
 import logging
+import os
+from typing import Dict, Iterator, List
+
+SYSTEM_PROMPT = "You are a helpful assistant."
+
 
 class LLM:
-    def __init__(self):
-        self.client = OpenAI(api_key='API')
+    def __init__(self, client=None, model: str = "gpt-3.5-turbo"):
+        # Any object with the shared client's generate/generate_many works here.
+        # The default needs llm_common (at the repository root) importable;
+        # main.py puts the root on sys.path. Set OPENAI_BASE_URL to run against
+        # a local endpoint (llm_common/mock_server.py).
+        if client is None:
+            from llm_common.async_client import SyncLLMClient
+
+            client = SyncLLMClient(model=model, api_key=os.environ.get("OPENAI_API_KEY", "API"))
+        self.client = client
+        self.model = model
+
+    def messages(self, prompt: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
 
     def generate(self, prompt: str) -> str:
+        return self.client.generate(self.messages(prompt))
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Yield the response in pieces as the model produces it."""
+        return self.client.stream(self.messages(prompt))
+
+    def generate_many(self, prompts: List[str], return_exceptions: bool = False) -> List:
+        """Send ``prompts`` concurrently; results come back in the same order.
 
-        response = self.client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": prompt}
-            ]
+        With ``return_exceptions`` a failed prompt's exception takes its place
+        in the list instead of being raised.
+        """
+        return self.client.generate_many(
+            [self.messages(prompt) for prompt in prompts], return_exceptions=return_exceptions
         )
-        result = response.choices[0]['message']['content'].strip()
 
-        return result
\ No newline at end of file
+    def close(self) -> None:
+        if hasattr(self.client, "close"):
+            self.client.close()
@@ -0,0 +1,321 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Iterator, List, Optional
+
+from pr.llm import LLM
+
+
+class CachedLLM:
+    """Response cache in front of an LLM's ``generate`` and ``generate_many``.
+
+    Lookups go to an in-memory LRU first, then to an SQLite store on disk.
+    Entries are keyed on a hash of the model and the full message list, expire
+    after ``ttl`` seconds (if set), and the disk store is trimmed to
+    ``max_disk_entries`` by least recent use. Concurrent calls with the same
+    key are coalesced: one request goes out and every caller gets its result.
+    Errors are passed to all waiting callers and never cached.
+    """
+
+    def __init__(
+        self,
+        llm: LLM,
+        path: str = ":memory:",
+        max_memory_entries: int = 1024,
+        max_disk_entries: int = 100_000,
+        ttl: Optional[float] = None,
+    ):
+        self.llm = llm
+        self.model = getattr(llm, "model", "")
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._db.commit()
+        self._inserts = 0
+        self.stats_counts = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+        self._miss_seconds = 0.0
+
+    def key(self, prompt: str) -> str:
+        messages = self.llm.messages(prompt) if hasattr(self.llm, "messages") else [
+            {"role": "user", "content": prompt}
+        ]
+        payload = json.dumps({"model": self.model, "messages": messages}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def _memory_get(self, key: str, now: float) -> Optional[str]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        response, created_at = entry
+        if self._expired(created_at, now):
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return response
+
+    def _memory_put(self, key: str, response: str, created_at: float) -> None:
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str, now: float) -> Optional[tuple]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self._expired(row[1], now):
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            return row
+
+    def _disk_put(self, key: str, response: str, now: float) -> None:
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, response, now, now),
+            )
+            self._inserts += 1
+            # Trimming needs a count; amortize it over a batch of inserts.
+            if self._inserts % 100 == 0:
+                self._trim()
+            self._db.commit()
+
+    def _trim(self) -> None:
+        (count,) = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()
+        if count > self.max_disk_entries:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_disk_entries,),
+            )
+        if self.ttl is not None:
+            self._db.execute(
+                "DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,)
+            )
+
+    def generate(self, prompt: str) -> str:
+        key = self.key(prompt)
+        now = time.time()
+        with self._lock:
+            response = self._memory_get(key, now)
+            if response is not None:
+                self.stats_counts["memory_hits"] += 1
+                return response
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+            else:
+                self.stats_counts["coalesced"] += 1
+        if not owner:
+            return future.result()
+
+        try:
+            row = self._disk_get(key, now)
+            if row is not None:
+                response, created_at = row
+                with self._lock:
+                    self.stats_counts["disk_hits"] += 1
+                    self._memory_put(key, response, created_at)
+            else:
+                start = time.perf_counter()
+                response = self.llm.generate(prompt)
+                elapsed = time.perf_counter() - start
+                now = time.time()
+                self._disk_put(key, response, now)
+                with self._lock:
+                    self.stats_counts["misses"] += 1
+                    self._miss_seconds += elapsed
+                    self._memory_put(key, response, now)
+        except BaseException as exc:
+            with self._lock:
+                self.stats_counts["errors"] += 1
+                del self._in_flight[key]
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            del self._in_flight[key]
+        future.set_result(response)
+        return response
+
+    def _settle(self, key: str, future: Future, outcome) -> None:
+        with self._lock:
+            del self._in_flight[key]
+        if isinstance(outcome, BaseException):
+            future.set_exception(outcome)
+        else:
+            future.set_result(outcome)
+
+    def _generate_batch(self, prompts: List[str]) -> List:
+        if hasattr(self.llm, "generate_many"):
+            return self.llm.generate_many(prompts, return_exceptions=True)
+        results = []
+        for prompt in prompts:
+            try:
+                results.append(self.llm.generate(prompt))
+            except Exception as exc:
+                results.append(exc)
+        return results
+
+    def generate_many(self, prompts: List[str], return_exceptions: bool = False) -> List:
+        """``generate`` for a batch, in input order.
+
+        Hits come from memory or disk and prompts already in flight are
+        coalesced; only the distinct remaining misses go to the wrapped LLM,
+        in one ``generate_many`` call. With ``return_exceptions`` a failed
+        prompt's exception takes its place in the list instead of being raised.
+        """
+        keys = [self.key(prompt) for prompt in prompts]
+        now = time.time()
+        outcomes: Dict[str, object] = {}
+        waiting: Dict[str, Future] = {}
+        owned: Dict[str, Future] = {}
+        owned_prompts: Dict[str, str] = {}
+        with self._lock:
+            for key, prompt in zip(keys, prompts):
+                if key in outcomes or key in waiting or key in owned:
+                    continue
+                response = self._memory_get(key, now)
+                if response is not None:
+                    self.stats_counts["memory_hits"] += 1
+                    outcomes[key] = response
+                elif key in self._in_flight:
+                    self.stats_counts["coalesced"] += 1
+                    waiting[key] = self._in_flight[key]
+                else:
+                    owned[key] = self._in_flight[key] = Future()
+                    owned_prompts[key] = prompt
+
+        try:
+            misses = []
+            for key in owned:
+                row = self._disk_get(key, now)
+                if row is None:
+                    misses.append(key)
+                    continue
+                response, created_at = row
+                with self._lock:
+                    self.stats_counts["disk_hits"] += 1
+                    self._memory_put(key, response, created_at)
+                outcomes[key] = response
+                self._settle(key, owned[key], response)
+            if misses:
+                start = time.perf_counter()
+                fresh = self._generate_batch([owned_prompts[key] for key in misses])
+                # One call served the whole batch; split its time across the misses.
+                share = (time.perf_counter() - start) / len(misses)
+                now = time.time()
+                for key, result in zip(misses, fresh):
+                    if isinstance(result, BaseException):
+                        with self._lock:
+                            self.stats_counts["errors"] += 1
+                    else:
+                        self._disk_put(key, result, now)
+                        with self._lock:
+                            self.stats_counts["misses"] += 1
+                            self._miss_seconds += share
+                            self._memory_put(key, result, now)
+                    outcomes[key] = result
+                    self._settle(key, owned[key], result)
+        except BaseException as exc:
+            for key, future in owned.items():
+                if not future.done():
+                    self._settle(key, future, exc)
+            raise
+
+        for key, future in waiting.items():
+            try:
+                outcomes[key] = future.result()
+            except Exception as exc:
+                outcomes[key] = exc
+        results = [outcomes[key] for key in keys]
+        if not return_exceptions:
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+        return results
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Stream a response, caching it once complete.
+
+        A cached response comes back as a single piece. Streams are not
+        coalesced with concurrent requests for the same prompt.
+        """
+        key = self.key(prompt)
+        now = time.time()
+        with self._lock:
+            response = self._memory_get(key, now)
+            if response is not None:
+                self.stats_counts["memory_hits"] += 1
+        if response is None:
+            row = self._disk_get(key, now)
+            if row is not None:
+                response, created_at = row
+                with self._lock:
+                    self.stats_counts["disk_hits"] += 1
+                    self._memory_put(key, response, created_at)
+        if response is not None:
+            yield response
+            return
+
+        pieces = []
+        start = time.perf_counter()
+        try:
+            for piece in self.llm.stream(prompt):
+                pieces.append(piece)
+                yield piece
+        except Exception:
+            with self._lock:
+                self.stats_counts["errors"] += 1
+            raise
+        elapsed = time.perf_counter() - start
+        response = "".join(pieces).strip()
+        now = time.time()
+        self._disk_put(key, response, now)
+        with self._lock:
+            self.stats_counts["misses"] += 1
+            self._miss_seconds += elapsed
+            self._memory_put(key, response, now)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self.stats_counts)
+            misses = stats["misses"]
+            stats["memory_entries"] = len(self._memory)
+            stats["mean_miss_latency"] = self._miss_seconds / misses if misses else 0.0
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["coalesced"] + misses
+        stats["hit_rate"] = (lookups - misses) / lookups if lookups else 0.0
+        return stats
+
+    def close(self) -> None:
+        with self._db_lock:
+            self._db.commit()
+            self._db.close()
+        if hasattr(self.llm, "close"):
+            self.llm.close()
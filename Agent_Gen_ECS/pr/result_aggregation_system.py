@@ -1,9 +1,47 @@
-from typing import Dict
+from typing import Dict, List, Optional, TextIO, Tuple
 
 from pr.agent_management import AgentComponent
+from pr.task_manager import TaskComponent
 
 
 class ResultAggregationSystem:
-    def aggregate_results(self, results: Dict[AgentComponent, str]) -> str:
+    def __init__(self):
+        # (agent, task, result) in the order results arrived.
+        self.results: List[Tuple[AgentComponent, TaskComponent, str]] = []
+
+    def add_result(self, agent: AgentComponent, task: TaskComponent, result: str):
+        self.results.append((agent, task, result))
+
+    def aggregate_results(self, results: Optional[Dict[AgentComponent, str]] = None) -> str:
+        if results is None:
+            return "\n".join(result for _, _, result in self.results)
         final_result = "\n".join(results.values())
         return final_result
+
+
+class ResultWriter:
+    """Writes each result to a file as it arrives instead of keeping it.
+
+    ``add_result`` has the signature TaskScheduler expects for ``on_result``.
+    Writes go through a buffer of ``buffer_size`` bytes, and the output is
+    the same text ``aggregate_results`` would build, ending with a newline.
+    """
+
+    def __init__(self, path: str, buffer_size: int = 64 * 1024):
+        self.path = path
+        self.file: TextIO = open(path, "w", encoding="utf-8", buffering=buffer_size)
+        self.count = 0
+
+    def add_result(self, agent: AgentComponent, task: TaskComponent, result: str):
+        self.file.write(result)
+        self.file.write("\n")
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self) -> "ResultWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,14 +1,50 @@
+from typing import Iterable, Iterator
+
 from pr.llm import LLM
 from pr.task_manager import TaskComponent, SubTaskComponent
 
 
+def iter_lines(chunks: Iterable[str]) -> Iterator[str]:
+    """Yield complete lines from text that arrives in arbitrary pieces."""
+    partial = []
+    for chunk in chunks:
+        lines = chunk.split("\n")
+        if len(lines) > 1:
+            partial.append(lines[0])
+            yield "".join(partial)
+            yield from lines[1:-1]
+            partial = []
+        if lines[-1]:
+            partial.append(lines[-1])
+    if partial:
+        yield "".join(partial)
+
+
 class SubTaskDivisionSystem:
     def __init__(self, llm: LLM):
         self.llm = llm
 
+    def prompt(self, task: TaskComponent) -> str:
+        return f"Divide the task: {task.description}"
+
+    @staticmethod
+    def parse_subtasks(lines: Iterable[str]) -> Iterator[TaskComponent]:
+        """One subtask per non-blank line."""
+        for line in lines:
+            description = line.strip()
+            if description:
+                yield TaskComponent(description=description)
+
     def divide_task(self, task: TaskComponent) -> SubTaskComponent:
-        prompt = f"Divide the task: {task.description}"
-        response = self.llm.generate(prompt)
-        subtask_descriptions = response.split('\n')
-        subtasks = [TaskComponent(description=desc) for desc in subtask_descriptions]
+        response = self.llm.generate(self.prompt(task))
+        subtasks = list(self.parse_subtasks(response.split("\n")))
         return SubTaskComponent(parent_task=task, subtasks=subtasks)
+
+    def iter_subtasks(self, task: TaskComponent) -> Iterator[TaskComponent]:
+        """Yield subtasks as soon as each line of the response arrives.
+
+        Falls back to a single ``generate`` call for LLMs that cannot stream.
+        """
+        prompt = self.prompt(task)
+        chunks = self.llm.stream(prompt) if hasattr(self.llm, "stream") else [self.llm.generate(prompt)]
+        return self.parse_subtasks(iter_lines(chunks))
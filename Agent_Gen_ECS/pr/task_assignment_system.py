@@ -6,9 +6,10 @@ from pr.task_manager import TaskComponent, SubTaskComponent
 
 class TaskAssignmentSystem:
     def assign_tasks(self, subtask_component: SubTaskComponent, agents: List[AgentComponent]) -> Dict[
-        AgentComponent, TaskComponent]:
-        assignments = {}
+        AgentComponent, List[TaskComponent]]:
+        """Round-robin the subtasks over the agents; an agent may get several."""
+        assignments = {agent: [] for agent in agents}
         for i, subtask in enumerate(subtask_component.subtasks):
             agent = agents[i % len(agents)]
-            assignments[agent] = subtask
+            assignments[agent].append(subtask)
         return assignments
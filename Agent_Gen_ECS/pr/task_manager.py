@@ -1,9 +1,27 @@
-from typing import List
+import heapq
+from itertools import count
+from typing import Dict, Iterator, List, Optional
+
+from pr.world import World
+
+# Values of the "task" store's status column.
+PENDING, RUNNING, DONE, FAILED, CANCELLED = range(5)
 
 
 class TaskComponent:
-    def __init__(self, description: str):
+    __slots__ = ("description", "dependencies", "priority")
+
+    def __init__(
+        self,
+        description: str,
+        dependencies: Optional[List["TaskComponent"]] = None,
+        priority: int = 0,
+    ):
         self.description = description
+        # Tasks whose results must be available before this one can start.
+        self.dependencies = list(dependencies or [])
+        # Higher runs first among ready tasks; equal priorities run in order added.
+        self.priority = priority
 
 
 class SubTaskComponent:
@@ -12,13 +30,238 @@ class SubTaskComponent:
         self.subtasks = subtasks
 
 
+def find_cycle(tasks: List[TaskComponent]) -> List[TaskComponent]:
+    """Return the tasks among ``tasks`` that can never run because of a cycle.
+
+    Only dependencies inside ``tasks`` count. Empty when the graph is acyclic.
+    """
+    indegree = dict.fromkeys(tasks, 0)
+    dependents: Dict[TaskComponent, List[TaskComponent]] = {}
+    for task in indegree:
+        for dep in set(task.dependencies):
+            if dep in indegree:
+                indegree[task] += 1
+                dependents.setdefault(dep, []).append(task)
+    queue = [task for task, degree in indegree.items() if degree == 0]
+    while queue:
+        for child in dependents.get(queue.pop(), ()):
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                queue.append(child)
+    return [task for task, degree in indegree.items() if degree > 0]
+
+
 class TaskManager:
-    def __init__(self):
-        self.tasks = {}
-        self.subtasks = {}
+    """Tasks as entities of a World, scheduled by priority and dependencies.
+
+    Each task entity has a "task" component (status, count of unfinished
+    dependencies, priority, the TaskComponent itself and the entities waiting
+    on it) and, while it is pending with nothing left to wait for, a "ready"
+    tag. Tasks are tracked by identity, so two tasks with the same description
+    stay distinct.
+
+    Ready tasks also sit in a heap ordered by priority. Entries are never
+    removed from the middle: starting, cancelling or reprioritizing a task
+    only bumps its ticket, and entries whose ticket no longer matches are
+    dropped when they reach the top. Finishing a task touches only its own
+    dependents, so unblocking work costs O(out-degree).
+    """
+
+    def __init__(self, world: Optional[World] = None):
+        self.world = world if world is not None else World()
+        self.store = self.world.register("task", {
+            "status": "b", "unmet": "i", "priority": "i", "ticket": "q",
+            "component": "O", "dependents": "O",
+        })
+        self.ready = self.world.register("ready")
+        self.entities: Dict[TaskComponent, int] = {}
+        self.subtasks: Dict[int, List[int]] = {}
+        self._heap: List[tuple] = []
+        self._tickets = count(1)
+
+    def add_task(self, task: TaskComponent) -> int:
+        return self.add_tasks([task])[0]
+
+    def add_tasks(self, tasks: List[TaskComponent]) -> List[int]:
+        """Add ``tasks`` and return their entities.
+
+        Dependencies may point anywhere in the batch or at tasks already
+        added; dependencies the manager has never seen count as done. Raises
+        ValueError, without adding anything, if the batch contains a cycle.
+        """
+        entities = self.entities
+        new = [task for task in dict.fromkeys(tasks) if task not in entities]
+        stuck = find_cycle(new)
+        if stuck:
+            raise ValueError(f"Dependency cycle among tasks: {[t.description for t in stuck[:5]]}")
+        created = self.world.create_many(len(new))
+        entities.update(zip(new, created))
+        self.store.extend(created, priority=[task.priority for task in new], component=new)
+
+        sparse = self.store.sparse
+        status, unmet_counts = self.store.columns["status"], self.store.columns["unmet"]
+        dependents = self.store.columns["dependents"]
+        ready, cancelled = [], []
+        for task, entity in zip(new, created):
+            unmet = 0
+            deps = task.dependencies
+            for dep in set(deps) if len(deps) > 1 else deps:
+                dep_entity = entities.get(dep)
+                if dep_entity is None:
+                    continue
+                index = sparse[dep_entity] - 1
+                if status[index] not in (DONE, CANCELLED, FAILED):
+                    unmet += 1
+                    if dependents[index] is None:
+                        dependents[index] = [entity]
+                    else:
+                        dependents[index].append(entity)
+                elif status[index] != DONE:
+                    # Waiting on something that will never finish.
+                    status[sparse[entity] - 1] = CANCELLED
+            if status[sparse[entity] - 1] == CANCELLED:
+                cancelled.append(entity)
+                continue
+            if unmet:
+                unmet_counts[sparse[entity] - 1] = unmet
+            else:
+                ready.append(entity)
+        for entity in cancelled:
+            # Batch members added after it may already be waiting on it.
+            self._cancel_dependents(entity)
+        self.ready.extend(ready)
+        for entity in ready:
+            self._push(entity)
+        return [entities[task] for task in tasks]
+
+    def add_subtasks(self, task: TaskComponent, subtask_component: SubTaskComponent) -> List[int]:
+        parent = self.add_task(task)
+        children = self.add_tasks(subtask_component.subtasks)
+        self.subtasks.setdefault(parent, []).extend(children)
+        return children
+
+    def task(self, entity: int) -> TaskComponent:
+        return self.store.get(entity, "component")
+
+    def status(self, entity: int) -> int:
+        return self.store.get(entity, "status")
+
+    def ready_tasks(self) -> Iterator[int]:
+        """Pending tasks whose dependencies have all finished, in no set order."""
+        return iter(self.ready)
+
+    def _push(self, entity: int) -> None:
+        ticket = next(self._tickets)
+        self.store.set(entity, "ticket", ticket)
+        heapq.heappush(self._heap, (-self.store.get(entity, "priority"), ticket, entity))
+        # Stale entries pile up under heavy reprioritizing; rebuild once they dominate.
+        if len(self._heap) > 2 * len(self.ready) + 1024:
+            store = self.store
+            self._heap = [
+                (-store.get(e, "priority"), store.get(e, "ticket"), e) for e in self.ready.dense
+            ]
+            heapq.heapify(self._heap)
+
+    def pop_ready(self) -> Optional[int]:
+        """Start and return the highest-priority ready task, or None."""
+        heap, store, ready = self._heap, self.store, self.ready
+        while heap:
+            _, ticket, entity = heapq.heappop(heap)
+            if entity in ready and store.get(entity, "ticket") == ticket:
+                self.start(entity)
+                return entity
+        return None
+
+    def start(self, entity: int) -> None:
+        self.store.set(entity, "status", RUNNING)
+        self.ready.remove(entity)
+
+    def complete(self, entity: int) -> List[int]:
+        """Mark ``entity`` done and return the dependents it unblocked."""
+        if self.store.get(entity, "status") == CANCELLED:
+            return []
+        self.store.set(entity, "status", DONE)
+        self.ready.remove(entity)
+        return self._release(entity)
+
+    def fail(self, entity: int) -> List[int]:
+        """Mark ``entity`` failed and cancel everything depending on it.
+
+        Returns the cancelled dependents.
+        """
+        self.store.set(entity, "status", FAILED)
+        self.ready.remove(entity)
+        return self._cancel_dependents(entity)
+
+    def cancel(self, entity: int) -> List[int]:
+        """Cancel an unfinished task and everything depending on it.
+
+        Returns every task cancelled. A running task keeps running, but
+        ``complete`` will ignore it. Finished tasks are left alone.
+        """
+        if self.store.get(entity, "status") in (DONE, FAILED, CANCELLED):
+            return []
+        self.store.set(entity, "status", CANCELLED)
+        self.ready.remove(entity)
+        return [entity] + self._cancel_dependents(entity)
+
+    def _cancel_dependents(self, entity: int) -> List[int]:
+        store, cancelled = self.store, []
+        stack = list(store.get(entity, "dependents") or ())
+        store.set(entity, "dependents", None)
+        while stack:
+            child = stack.pop()
+            if store.get(child, "status") != PENDING:
+                continue
+            store.set(child, "status", CANCELLED)
+            self.ready.remove(child)
+            cancelled.append(child)
+            stack.extend(store.get(child, "dependents") or ())
+            store.set(child, "dependents", None)
+        return cancelled
+
+    def record_outcome(self, entity: int, status: int) -> None:
+        """Overwrite a finished task's status with one decided elsewhere.
+
+        Used when a failed or cancelled task is rerun on another manager.
+        Dependents were already cancelled and are not revived.
+        """
+        if self.store.get(entity, "status") not in (FAILED, CANCELLED):
+            raise ValueError("Only failed or cancelled tasks can take a new outcome")
+        self.store.set(entity, "status", status)
+
+    def reprioritize(self, entity: int, priority: int) -> None:
+        self.store.set(entity, "priority", priority)
+        self.store.get(entity, "component").priority = priority
+        if entity in self.ready:
+            self._push(entity)
 
-    def add_task(self, task: TaskComponent):
-        self.tasks[task.description] = task
+    def _release(self, entity: int) -> List[int]:
+        # Hot path: index the columns directly rather than through get/set.
+        sparse, columns = self.store.sparse, self.store.columns
+        unmet, status, dependents = columns["unmet"], columns["status"], columns["dependents"]
+        index = sparse[entity] - 1
+        waiting, dependents[index] = dependents[index] or (), None
+        unblocked = []
+        for child in waiting:
+            index = sparse[child] - 1
+            unmet[index] -= 1
+            if unmet[index] == 0 and status[index] == PENDING:
+                self.ready.add(child)
+                self._push(child)
+                unblocked.append(child)
+        return unblocked
 
-    def add_subtasks(self, task: TaskComponent, subtask_component: SubTaskComponent):
-        self.subtasks[task.description] = subtask_component.subtasks
+    def remove_task(self, entity: int) -> None:
+        """Forget a task. Anything still waiting on it no longer has to."""
+        task = self.task(entity)
+        if self.store.get(entity, "status") != DONE:
+            self._release(entity)
+        for dep in set(task.dependencies):
+            dep_entity = self.entities.get(dep)
+            waiting = self.store.get(dep_entity, "dependents") if dep_entity is not None else None
+            if waiting and entity in waiting:
+                waiting.remove(entity)
+        self.subtasks.pop(entity, None)
+        del self.entities[task]
+        self.world.destroy(entity)
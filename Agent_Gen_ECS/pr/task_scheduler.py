@@ -0,0 +1,208 @@
+import hashlib
+import logging
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+from pr.agent_management import AgentComponent
+from pr.llm import LLM
+from pr.task_manager import CANCELLED, DONE, FAILED, SubTaskComponent, TaskComponent, TaskManager
+
+logger = logging.getLogger(__name__)
+
+ResultCallback = Callable[[AgentComponent, TaskComponent, str], None]
+
+# Kinds of event on the scheduler's queue.
+_ADDED, _EXHAUSTED, _FINISHED = "added", "exhausted", "finished"
+
+
+class TaskScheduler:
+    """Run the subtasks of a SubTaskComponent in parallel across agents.
+
+    Each agent works on one task at a time. A task becomes ready once all of
+    its dependencies inside the same SubTaskComponent have finished, and the
+    highest-priority ready task goes to whichever agent is idle, so wall time
+    tracks the critical path of the dependency graph rather than the number of
+    tasks. Ordering, cancellation and reprioritizing are the TaskManager's;
+    pass one in to steer a run while it is in progress. A run works through
+    every ready task that manager holds.
+    """
+
+    def __init__(
+        self,
+        llm: LLM,
+        agents: List[AgentComponent],
+        task_manager: Optional[TaskManager] = None,
+        journal=None,
+    ):
+        if not agents:
+            raise ValueError("TaskScheduler needs at least one agent")
+        self.llm = llm
+        self.agents = agents
+        self.task_manager = task_manager
+        # Optional llm_common.run_journal.RunJournal recording task state changes.
+        self.journal = journal
+        self.failures: Dict[TaskComponent, Exception] = {}
+        self.skipped: List[TaskComponent] = []
+        # Results kept by the last run; retry_failed feeds them to retried tasks.
+        self.results: Dict[TaskComponent, str] = {}
+        self._task_ids: Dict[TaskComponent, str] = {}
+
+    def build_prompt(self, task: TaskComponent, results: Dict[TaskComponent, str]) -> str:
+        prompt = f"Complete the task: {task.description}"
+        context = [results[dep] for dep in task.dependencies if dep in results]
+        if context:
+            prompt += "\n\nResults of prerequisite tasks:\n" + "\n".join(context)
+        return prompt
+
+    def execute(self, agent: AgentComponent, task: TaskComponent, prompt: str) -> str:
+        return self.llm.generate(prompt)
+
+    def run(
+        self,
+        subtask_component: SubTaskComponent,
+        on_result: Optional[ResultCallback] = None,
+    ) -> Dict[TaskComponent, str]:
+        """Execute every subtask and return their results.
+
+        ``on_result`` is called as each task finishes. A failed task is
+        recorded in ``failures`` and the tasks depending on it are cancelled
+        and listed in ``skipped``.
+        """
+        return self._run(subtask_component.subtasks, None, on_result, keep_results=True)
+
+    def run_stream(
+        self,
+        subtasks: Iterable[TaskComponent],
+        on_result: Optional[ResultCallback] = None,
+        keep_results: bool = False,
+    ) -> Dict[TaskComponent, str]:
+        """Execute subtasks while ``subtasks`` is still producing them.
+
+        ``subtasks`` is read on a separate thread (e.g. from
+        ``SubTaskDivisionSystem.iter_subtasks``) and each subtask is dispatched
+        as soon as it arrives and its dependencies are done. Results go to
+        ``on_result``; unless ``keep_results`` is set, only results that other
+        tasks are waiting on are kept and returned, so memory stays flat.
+        An error raised by ``subtasks`` is re-raised once running tasks finish.
+        """
+        return self._run([], subtasks, on_result, keep_results)
+
+    def retry_failed(self, on_result: Optional[ResultCallback] = None) -> Dict[TaskComponent, str]:
+        """Run the tasks that failed or were skipped in the last run once more.
+
+        Their dependencies that finished in the last run count as done, and
+        their results from that run go into the retried tasks' prompts. The
+        retry runs on a private TaskManager, and a shared one then gets each
+        retried task's new status (DONE, FAILED or CANCELLED). Returns the
+        last run's results updated with the retried ones.
+        """
+        tasks = list(self.failures) + self.skipped
+        shared, self.task_manager = self.task_manager, None
+        try:
+            results = self._run(tasks, None, on_result, keep_results=True, seed=self.results)
+        finally:
+            self.task_manager = shared
+        if shared is not None:
+            skipped = set(self.skipped)
+            for task in tasks:
+                status = FAILED if task in self.failures else CANCELLED if task in skipped else DONE
+                shared.record_outcome(shared.entities[task], status)
+        return results
+
+    def task_id(self, task: TaskComponent) -> str:
+        """Journal key for ``task``: its arrival index plus a description hash.
+
+        Descriptions may repeat, so they cannot key states on their own. Tasks
+        are numbered in the order they reach the scheduler, which a resumed or
+        replayed run reproduces, and keep their id across retry_failed.
+        """
+        task_id = self._task_ids.get(task)
+        if task_id is None:
+            digest = hashlib.sha256(task.description.encode("utf-8")).hexdigest()[:12]
+            task_id = self._task_ids[task] = f"{len(self._task_ids)}:{digest}"
+        return task_id
+
+    def _record(self, task: TaskComponent, state: str, **details) -> None:
+        if self.journal is not None:
+            self.journal.record_state(self.task_id(task), state, description=task.description, **details)
+
+    @staticmethod
+    def _produce(subtasks: Iterable[TaskComponent], events: "queue.Queue") -> None:
+        error = None
+        try:
+            for task in subtasks:
+                events.put((_ADDED, task))
+        except Exception as exc:
+            error = exc
+        events.put((_EXHAUSTED, error))
+
+    def _run(self, tasks, stream, on_result, keep_results, seed=None) -> Dict[TaskComponent, str]:
+        manager = self.task_manager if self.task_manager is not None else TaskManager()
+        # Raises ValueError on a dependency cycle.
+        manager.add_tasks(tasks)
+        for task in tasks:
+            self.task_id(task)
+        # Finished tasks and streamed subtasks both arrive on this queue.
+        events: "queue.Queue" = queue.Queue()
+        producing = stream is not None
+        if producing:
+            threading.Thread(target=self._produce, args=(stream, events), daemon=True).start()
+        idle = deque(self.agents)
+        results: Dict[TaskComponent, str] = dict(seed or {})
+        self.failures, self.skipped = {}, []
+        stream_error = None
+
+        with ThreadPoolExecutor(max_workers=len(self.agents)) as pool:
+            in_flight = 0
+            while True:
+                while idle:
+                    entity = manager.pop_ready()
+                    if entity is None:
+                        break
+                    task, agent = manager.task(entity), idle.popleft()
+                    prompt = self.build_prompt(task, results)
+                    self._record(task, "running", agent=agent.agent_id)
+                    future = pool.submit(self.execute, agent, task, prompt)
+                    future.add_done_callback(
+                        lambda f, agent=agent, entity=entity: events.put((_FINISHED, (agent, entity, f)))
+                    )
+                    in_flight += 1
+                if not in_flight and not producing:
+                    break
+                kind, payload = events.get()
+                if kind == _ADDED:
+                    manager.add_task(payload)
+                    self.task_id(payload)
+                    continue
+                if kind == _EXHAUSTED:
+                    producing, stream_error = False, payload
+                    continue
+                agent, entity, future = payload
+                in_flight -= 1
+                idle.append(agent)
+                task = manager.task(entity)
+                try:
+                    result = future.result()
+                except Exception as exc:
+                    logger.warning("Subtask %r failed: %s", task.description, exc)
+                    self.failures[task] = exc
+                    self._record(task, "failed", error=repr(exc))
+                    for skipped in manager.fail(entity):
+                        self.skipped.append(manager.task(skipped))
+                        self._record(manager.task(skipped), "cancelled")
+                    continue
+                if manager.status(entity) == CANCELLED:
+                    continue
+                if keep_results or manager.store.get(entity, "dependents"):
+                    results[task] = result
+                manager.complete(entity)
+                self._record(task, "done")
+                if on_result is not None:
+                    on_result(agent, task, result)
+        self.results = results
+        if stream_error is not None:
+            raise stream_error
+        return results
@@ -0,0 +1,156 @@
+from array import array
+from typing import Dict, Iterator, Optional
+
+
+class ComponentStore:
+    """Sparse set of entities holding one component type.
+
+    Component data is stored column-wise: each field is an ``array`` of the
+    given typecode (``'b'``, ``'i'``, ``'d'``, ...), or a list for ``'O'``
+    (Python objects). ``dense`` lists member entities contiguously, so a system
+    iterates only over entities that have the component, and ``sparse`` maps an
+    entity to its dense index plus one (0 = absent). Add, remove and lookup
+    are O(1); removal swaps the last member into the freed slot.
+
+    A store with no fields is a tag, e.g. "ready" or "idle".
+    """
+
+    __slots__ = ("name", "dense", "sparse", "columns")
+
+    def __init__(self, name: str, fields: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.dense = array("i")
+        self.sparse = array("i")
+        self.columns = {
+            field: [] if code == "O" else array(code) for field, code in (fields or {}).items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.dense)
+
+    def __contains__(self, entity: int) -> bool:
+        return entity < len(self.sparse) and self.sparse[entity] != 0
+
+    def __iter__(self) -> Iterator[int]:
+        # A snapshot, so systems can add and remove components while iterating.
+        return iter(self.dense.tolist())
+
+    def add(self, entity: int, **values) -> None:
+        """Attach the component to ``entity``, or update it if present."""
+        if entity in self:
+            for field, value in values.items():
+                self.columns[field][self.sparse[entity] - 1] = value
+            return
+        if entity >= len(self.sparse):
+            grow = max(entity + 1 - len(self.sparse), len(self.sparse))
+            self.sparse.extend(array("i", bytes(4 * grow)))
+        self.dense.append(entity)
+        for field, column in self.columns.items():
+            column.append(values.get(field, None if isinstance(column, list) else 0))
+        self.sparse[entity] = len(self.dense)
+
+    def extend(self, entities, **values) -> None:
+        """Attach the component to many new entities at once.
+
+        Each keyword is a sequence of values aligned with ``entities``;
+        fields left out get 0 (or None for object fields).
+        """
+        entities = array("i", entities)
+        if not entities:
+            return
+        if max(entities) >= len(self.sparse):
+            grow = max(max(entities) + 1 - len(self.sparse), len(self.sparse))
+            self.sparse.extend(array("i", bytes(4 * grow)))
+        sparse = self.sparse
+        if any(sparse[entity] for entity in entities):
+            raise ValueError(f"some entities already have {self.name!r}")
+        for index, entity in enumerate(entities, len(self.dense) + 1):
+            sparse[entity] = index
+        self.dense.extend(entities)
+        for field, column in self.columns.items():
+            if field in values:
+                column.extend(values[field])
+            elif isinstance(column, list):
+                column.extend([None] * len(entities))
+            else:
+                column.extend(array(column.typecode, bytes(column.itemsize * len(entities))))
+
+    def remove(self, entity: int) -> None:
+        index = self.sparse[entity] - 1 if entity in self else -1
+        if index < 0:
+            return
+        last = len(self.dense) - 1
+        if index != last:
+            moved = self.dense[last]
+            self.dense[index] = moved
+            for column in self.columns.values():
+                column[index] = column[last]
+            self.sparse[moved] = index + 1
+        self.dense.pop()
+        for column in self.columns.values():
+            column.pop()
+        self.sparse[entity] = 0
+
+    def get(self, entity: int, field: str):
+        return self.columns[field][self.sparse[entity] - 1]
+
+    def set(self, entity: int, field: str, value) -> None:
+        self.columns[field][self.sparse[entity] - 1] = value
+
+
+class World:
+    """Entities are plain integers; components live in named ComponentStores.
+
+    Destroyed entity ids are recycled, so callers should drop ids once they
+    destroy them.
+    """
+
+    __slots__ = ("stores", "_next", "_free")
+
+    def __init__(self):
+        self.stores: Dict[str, ComponentStore] = {}
+        self._next = 0
+        self._free = array("i")
+
+    def register(self, name: str, fields: Optional[Dict[str, str]] = None) -> ComponentStore:
+        """Return the store called ``name``, creating it on first use."""
+        store = self.stores.get(name)
+        if store is None:
+            store = self.stores[name] = ComponentStore(name, fields)
+        return store
+
+    def create(self) -> int:
+        if self._free:
+            return self._free.pop()
+        self._next += 1
+        return self._next - 1
+
+    def create_many(self, count: int) -> list:
+        reused = min(count, len(self._free))
+        entities = self._free[len(self._free) - reused:].tolist()
+        del self._free[len(self._free) - reused:]
+        entities.extend(range(self._next, self._next + count - reused))
+        self._next += count - reused
+        return entities
+
+    def destroy(self, entity: int) -> None:
+        for store in self.stores.values():
+            store.remove(entity)
+        self._free.append(entity)
+
+    def __len__(self) -> int:
+        return self._next - len(self._free)
+
+    def query(self, *names: str) -> Iterator[int]:
+        """Iterate over the entities that have every named component.
+
+        The smallest store drives the query and each other store filters it,
+        so a query on a small tag such as "ready" costs time in proportion to
+        that tag, not to the world.
+        """
+        stores = sorted((self.stores[name] for name in names), key=len)
+        members = stores[0].dense.tolist()
+        for store in stores[1:]:
+            sparse, size = store.sparse, len(store.sparse)
+            members = [entity for entity in members if entity < size and sparse[entity]]
+        return iter(members)
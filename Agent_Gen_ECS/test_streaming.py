@@ -0,0 +1,113 @@
+"""Batch and streaming subtask division against a fake streaming LLM.
+
+``FakeStreamingLLM`` is also what bench_streaming.py times.
+"""
+import threading
+import time
+
+from pr.agent_management import AgentManagement
+from pr.result_aggregation_system import ResultAggregationSystem, ResultWriter
+from pr.subtask_division_system import SubTaskDivisionSystem
+from pr.task_manager import TaskComponent
+from pr.task_scheduler import TaskScheduler
+
+
+class FakeStreamingLLM:
+    """Streams ``subtasks`` lines for the division prompt, token by token.
+
+    Every other prompt is answered after ``task_latency`` seconds with the
+    task's description padded to ``result_kb``. ``calls`` lists the task
+    descriptions in the order they were dispatched, ``first_call`` is when the
+    first one was, and ``division_done`` is when the division stream ended.
+    """
+
+    def __init__(self, subtasks, tokens_per_line=3, token_latency=0.0, task_latency=0.0, result_kb=1):
+        self.subtasks = subtasks
+        self.tokens_per_line = tokens_per_line
+        self.token_latency = token_latency
+        self.task_latency = task_latency
+        self.result_kb = result_kb
+        self.calls = []
+        self.first_call = None
+        self.division_done = None
+        self._lock = threading.Lock()
+
+    def lines(self):
+        return [" ".join(f"step{i}.{token}" for token in range(self.tokens_per_line))
+                for i in range(self.subtasks)]
+
+    def stream(self, prompt):
+        if not prompt.startswith("Divide the task"):
+            yield self.generate(prompt)
+            return
+        for i in range(self.subtasks):
+            for token in range(self.tokens_per_line):
+                time.sleep(self.token_latency)
+                yield f"step{i}.{token}" + (" " if token < self.tokens_per_line - 1 else "")
+            # Blank lines between items must not turn into subtasks.
+            yield "\n\n" if i % 2 else "\n"
+        self.division_done = time.perf_counter()
+
+    def generate(self, prompt):
+        if prompt.startswith("Divide the task"):
+            return "".join(self.stream(prompt))
+        description = prompt.split(": ", 1)[1]
+        with self._lock:
+            if self.first_call is None:
+                self.first_call = time.perf_counter()
+            self.calls.append(description)
+        time.sleep(self.task_latency)
+        return description.ljust(self.result_kb * 1024 - 1, "x")
+
+
+def agents(count):
+    agent_mgmt = AgentManagement()
+    return [agent_mgmt.add_agent(f"agent_{i}") for i in range(count)]
+
+
+def run_batch(llm, workers, out_path):
+    subtasks = SubTaskDivisionSystem(llm).divide_task(TaskComponent("test"))
+    aggregator = ResultAggregationSystem()
+    TaskScheduler(llm, agents(workers)).run(subtasks, on_result=aggregator.add_result)
+    with open(out_path, "w", encoding="utf-8") as out:
+        out.write(aggregator.aggregate_results() + "\n")
+
+
+def run_stream(llm, workers, out_path):
+    divider = SubTaskDivisionSystem(llm)
+    with ResultWriter(out_path) as writer:
+        TaskScheduler(llm, agents(workers)).run_stream(
+            divider.iter_subtasks(TaskComponent("test")), on_result=writer.add_result)
+    return writer.count
+
+
+def test_stream_dispatches_in_line_order_before_division_ends(tmp_path):
+    llm = FakeStreamingLLM(20, token_latency=0.002)
+    assert run_stream(llm, 1, tmp_path / "out.txt") == 20
+    assert llm.calls == llm.lines()
+    assert llm.first_call < llm.division_done
+
+
+def test_batch_dispatches_after_division_ends(tmp_path):
+    llm = FakeStreamingLLM(20, token_latency=0.002)
+    run_batch(llm, 1, tmp_path / "out.txt")
+    assert llm.calls == llm.lines()
+    assert llm.first_call > llm.division_done
+
+
+def test_batch_and_stream_write_the_same_output(tmp_path):
+    outputs = {}
+    for mode, run in (("batch", run_batch), ("stream", run_stream)):
+        run(FakeStreamingLLM(30), 1, tmp_path / mode)
+        outputs[mode] = (tmp_path / mode).read_text(encoding="utf-8")
+    assert outputs["batch"] == outputs["stream"]
+    assert outputs["stream"].count("\n") == 30
+
+
+def test_parallel_agents_produce_every_result(tmp_path):
+    outputs = {}
+    for mode, run in (("batch", run_batch), ("stream", run_stream)):
+        run(FakeStreamingLLM(40, task_latency=0.002), 4, tmp_path / mode)
+        outputs[mode] = sorted((tmp_path / mode).read_text(encoding="utf-8").splitlines())
+    assert outputs["batch"] == outputs["stream"]
+    assert [line.rstrip("x") for line in outputs["stream"]] == sorted(FakeStreamingLLM(40).lines())
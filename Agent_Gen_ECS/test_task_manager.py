@@ -0,0 +1,159 @@
+"""Tests for TaskManager ordering and cancellation and TaskScheduler failure handling."""
+import threading
+
+import pytest
+
+from pr.agent_management import AgentManagement
+from pr.task_manager import CANCELLED, DONE, FAILED, PENDING, RUNNING, SubTaskComponent, TaskComponent, TaskManager
+from pr.task_scheduler import TaskScheduler
+
+
+def drain(manager):
+    order = []
+    while (entity := manager.pop_ready()) is not None:
+        order.append(manager.task(entity).description)
+        manager.complete(entity)
+    return order
+
+
+def test_ready_tasks_pop_by_priority_then_insertion_order():
+    manager = TaskManager()
+    manager.add_tasks([TaskComponent("low", priority=1), TaskComponent("high a", priority=5),
+                       TaskComponent("mid", priority=3), TaskComponent("high b", priority=5)])
+    assert drain(manager) == ["high a", "high b", "mid", "low"]
+
+
+def test_reprioritize_skips_stale_heap_entries():
+    manager = TaskManager()
+    a, b, c = manager.add_tasks([TaskComponent("a", priority=3), TaskComponent("b", priority=2),
+                                 TaskComponent("c", priority=1)])
+    manager.reprioritize(c, 10)
+    manager.reprioritize(a, 0)
+    manager.reprioritize(a, 4)
+    manager.reprioritize(a, 0)
+    assert drain(manager) == ["c", "b", "a"]
+    # Every outdated entry was dropped rather than popped twice.
+    assert manager.pop_ready() is None
+
+
+def test_dependents_wait_for_their_dependencies():
+    manager = TaskManager()
+    first = TaskComponent("first", priority=0)
+    second = TaskComponent("second", [first], priority=9)
+    third = TaskComponent("third", [first, second], priority=9)
+    entities = manager.add_tasks([third, second, first])
+    assert [manager.status(e) for e in entities] == [PENDING] * 3
+    assert drain(manager) == ["first", "second", "third"]
+
+
+def test_cycles_are_rejected_without_adding_anything():
+    a = TaskComponent("a")
+    b = TaskComponent("b", [a])
+    a.dependencies.append(b)
+    manager = TaskManager()
+    with pytest.raises(ValueError):
+        manager.add_tasks([a, b, TaskComponent("c")])
+    assert manager.entities == {}
+
+
+def test_cancel_cascades_and_cancelled_tasks_never_start():
+    manager = TaskManager()
+    root = TaskComponent("root")
+    child = TaskComponent("child", [root])
+    grandchild = TaskComponent("grandchild", [child])
+    other = TaskComponent("other")
+    root_e, child_e, grandchild_e, other_e = manager.add_tasks([root, child, grandchild, other])
+    assert set(manager.cancel(child_e)) == {child_e, grandchild_e}
+    assert drain(manager) == ["root", "other"]
+    assert manager.status(grandchild_e) == CANCELLED
+    # Tasks added later that depend on a cancelled task are cancelled on arrival.
+    late = manager.add_task(TaskComponent("late", [grandchild]))
+    assert manager.status(late) == CANCELLED
+
+
+def test_completing_a_cancelled_running_task_is_ignored():
+    manager = TaskManager()
+    task = TaskComponent("task")
+    entity = manager.add_task(task)
+    dependent = manager.add_task(TaskComponent("dependent", [task]))
+    assert manager.pop_ready() == entity and manager.status(entity) == RUNNING
+    manager.cancel(entity)
+    assert manager.complete(entity) == []
+    assert manager.status(dependent) == CANCELLED
+
+
+class FlakyLLM:
+    """Answers every prompt, except the first ``failures`` prompts per failing task."""
+
+    def __init__(self, failing=(), failures=1):
+        self.failing = {description: failures for description in failing}
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def generate(self, prompt):
+        description = prompt.split("\n", 1)[0].removeprefix("Complete the task: ")
+        with self._lock:
+            self.prompts.append(prompt)
+            if self.failing.get(description, 0) > 0:
+                self.failing[description] -= 1
+                raise RuntimeError(f"{description} failed")
+        return f"result of {description}"
+
+
+def agents(count=2):
+    agent_mgmt = AgentManagement()
+    return [agent_mgmt.add_agent(f"agent_{i}") for i in range(count)]
+
+
+def diamond():
+    # fetch -> (parse, index) -> report, plus an independent task.
+    fetch = TaskComponent("fetch")
+    parse = TaskComponent("parse", [fetch])
+    index = TaskComponent("index", [fetch])
+    report = TaskComponent("report", [parse, index])
+    return [fetch, parse, index, report, TaskComponent("independent")]
+
+
+def test_failure_cancels_dependents_only():
+    tasks = diamond()
+    manager = TaskManager()
+    scheduler = TaskScheduler(FlakyLLM(failing=["parse"]), agents(), task_manager=manager)
+    results = scheduler.run(SubTaskComponent(TaskComponent("root"), tasks))
+    fetch, parse, index, report, independent = tasks
+    assert set(scheduler.failures) == {parse}
+    assert scheduler.skipped == [report]
+    assert set(results) == {fetch, index, independent}
+    assert [manager.status(manager.entities[t]) for t in tasks] == [DONE, FAILED, DONE, CANCELLED, DONE]
+
+
+def test_retry_failed_reruns_with_prerequisite_results_and_updates_shared_statuses():
+    tasks = diamond()
+    fetch, parse, index, report, independent = tasks
+    llm = FlakyLLM(failing=["parse"])
+    manager = TaskManager()
+    scheduler = TaskScheduler(llm, agents(), task_manager=manager)
+    scheduler.run(SubTaskComponent(TaskComponent("root"), tasks))
+    llm.prompts.clear()
+
+    retried = []
+    results = scheduler.retry_failed(on_result=lambda agent, task, result: retried.append(task))
+    assert retried == [parse, report]
+    assert scheduler.failures == {} and scheduler.skipped == []
+    assert results[report] == "result of report"
+    # Only the failed and skipped tasks ran again, with their prerequisites' results.
+    assert len(llm.prompts) == 2
+    assert "result of fetch" in llm.prompts[0]
+    assert "result of parse" in llm.prompts[1] and "result of index" in llm.prompts[1]
+    assert all(manager.status(manager.entities[t]) == DONE for t in tasks)
+
+
+def test_retry_failed_records_tasks_that_fail_again():
+    tasks = diamond()
+    fetch, parse, index, report, independent = tasks
+    manager = TaskManager()
+    scheduler = TaskScheduler(FlakyLLM(failing=["parse"], failures=2), agents(), task_manager=manager)
+    scheduler.run(SubTaskComponent(TaskComponent("root"), tasks))
+    scheduler.retry_failed()
+    assert set(scheduler.failures) == {parse} and scheduler.skipped == [report]
+    assert manager.status(manager.entities[parse]) == FAILED
+    assert manager.status(manager.entities[report]) == CANCELLED
@@ -0,0 +1,95 @@
+"""Throughput of the worker pool on a CPU-bound stub, and lease recovery.
+
+Usage:
+    python bench_worker_pool.py [--subtasks 200] [--rounds 20000] [--workers 1 2 4]
+
+Each subtask runs ``stub_handler`` (``--rounds`` iterations of SHA-256), so
+throughput can only grow with workers while there are spare cores. The
+second part starts two workers, SIGKILLs one mid-item, and checks that its
+leased item is handed out again and every subtask still completes.
+"""
+import argparse
+import os
+import signal
+import tempfile
+import threading
+import time
+from functools import partial
+
+from components import SubTaskComponent
+from work_queue import WorkQueue
+from worker_pool import run_pool, stub_handler
+
+
+def make_subtasks(count):
+    return [SubTaskComponent(f"Subtask {i}: benchmark item", []) for i in range(count)]
+
+
+def throughput(queue_path, subtasks, workers, handler):
+    start = time.perf_counter()
+    queue = run_pool(subtasks, queue_path, workers=workers, handler=handler)
+    wall = time.perf_counter() - start
+    done = queue.counts()["done"]
+    queue.close()
+    return done, wall
+
+
+def kill_one(queue_path, subtasks, handler, visibility_timeout, kill_after):
+    killed = []
+
+    def on_start(processes):
+        pid = processes[0].pid
+
+        def kill():
+            # Wait until worker-0 holds a lease so the kill strands an item.
+            watcher = WorkQueue(queue_path)
+            time.sleep(kill_after)
+            while not any(a.agent_id == "worker-0" and a.status == "busy" for a in watcher.agents()):
+                time.sleep(0.001)
+            os.kill(pid, signal.SIGKILL)
+            killed.append(pid)
+            watcher.close()
+
+        threading.Thread(target=kill, daemon=True).start()
+
+    start = time.perf_counter()
+    queue = run_pool(subtasks, queue_path, workers=2, handler=handler,
+                     visibility_timeout=visibility_timeout, on_start=on_start)
+    wall = time.perf_counter() - start
+    counts, reissued, agents = queue.counts(), queue.attempts(), queue.agents()
+    queue.close()
+    return killed, counts, reissued, agents, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the agentic_task_gen worker pool")
+    parser.add_argument("--subtasks", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=20000, help="SHA-256 rounds per subtask")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--visibility-timeout", type=float, default=1.0,
+                        help="Lease length for the kill test")
+    args = parser.parse_args()
+
+    handler = partial(stub_handler, rounds=args.rounds)
+    print(f"{os.cpu_count()} CPUs available")
+    with tempfile.TemporaryDirectory() as tmp:
+        queue_path = os.path.join(tmp, "queue.sqlite")
+        baseline = None
+        for workers in args.workers:
+            done, wall = throughput(queue_path, make_subtasks(args.subtasks), workers, handler)
+            baseline = baseline or wall
+            print(f"workers {workers:2}  done {done:5}  wall {wall:6.2f}s  "
+                  f"{done / wall:7.1f} items/s  speedup {baseline / wall:4.2f}x")
+
+        subtasks = make_subtasks(args.subtasks)
+        killed, counts, reissued, agents, wall = kill_one(
+            queue_path, subtasks, handler, args.visibility_timeout, kill_after=0.5)
+        complete = all(subtask.results for subtask in subtasks)
+        print(f"killed pid {killed}  counts {counts}  re-issued items {reissued}  "
+              f"all subtasks have results: {complete}  wall {wall:.2f}s")
+        for agent in agents:
+            print(f"  {agent.agent_id}: {agent.status}, {agent.results} items")
+
+
+if __name__ == "__main__":
+    main()
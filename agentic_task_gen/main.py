@@ -1,41 +1,79 @@
 #main.py
+import argparse
 import os
+from functools import partial
 from components import TaskComponent
 from task_generator import TaskGenerationSystem
 from task_divider import TaskDivisionSystem
 from task_integrator import TaskIntegrationSystem
-
-# Ensure output directory exists
-output_dir = "/output/"
-os.makedirs(output_dir, exist_ok=True)
+from worker_pool import llm_handler, run_pool, stub_handler
 
 # OpenAI API key
 API_KEY = "your_openai_api_key_here"
 
-# Initialize systems
-task_gen_system = TaskGenerationSystem(API_KEY)
-task_div_system = TaskDivisionSystem()
-task_int_system = TaskIntegrationSystem()
 
-# Create initial task
-task = TaskComponent("Main Task", ["Generate a task list for organizing a hackathon."])
+def main():
+    parser = argparse.ArgumentParser(description="Generate and divide tasks with an LLM")
+    parser.add_argument("--output-dir", default="/output/")
+    parser.add_argument("--journal", help="Run journal; an interrupted run resumes from it "
+                                          "(default: run_journal.jsonl in the output directory)")
+    parser.add_argument("--replay", action="store_true",
+                        help="Answer every prompt from the journal without calling the API")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Execute subtasks on this many worker processes (0: only list them)")
+    parser.add_argument("--stub-work", type=int, default=0,
+                        help="Workers run this many SHA-256 rounds per subtask instead of calling the LLM")
+    parser.add_argument("--visibility-timeout", type=float, default=30.0,
+                        help="Seconds before a dead worker's subtask is handed out again")
+    args = parser.parse_args()
+
+    # Ensure output directory exists
+    output_dir = args.output_dir
+    os.makedirs(output_dir, exist_ok=True)
+    journal = args.journal or os.path.join(output_dir, "run_journal.jsonl")
+
+    # Initialize systems
+    task_gen_system = TaskGenerationSystem(API_KEY, journal_path=journal, replay=args.replay)
+    task_div_system = TaskDivisionSystem()
+    task_int_system = TaskIntegrationSystem()
+
+    # Create initial task
+    task = TaskComponent("Main Task", ["Generate a task list for organizing a hackathon."])
+
+    # Generate tasks; prompts that keep failing are left out of the results
+    failed_prompts = task_gen_system.generate_tasks(task)
+    task_gen_system.record_state(task, "generated", results=len(task.results), failed=len(failed_prompts))
+    if failed_prompts:
+        print(f"{len(failed_prompts)} prompts failed; rerun to retry them.")
 
-# Generate tasks
-task_gen_system.generate_tasks(task)
+    # Create README.md
+    readme_content = task_int_system.create_readme(task.description, "output/\n  README.md\n  final_result.txt")
+    with open(os.path.join(output_dir, "README.md"), "w") as readme_file:
+        readme_file.write(readme_content)
 
-# Divide tasks
-subtasks = task_div_system.divide_task(task)
+    if args.workers > 0:
+        # Coordinator: queue the subtasks for worker processes, then write them with their results.
+        handler = partial(stub_handler, rounds=args.stub_work) if args.stub_work else llm_handler
+        subtasks = task_div_system.divide_task(task)
+        queue = run_pool(subtasks, os.path.join(output_dir, "work_queue.sqlite"), workers=args.workers,
+                         handler=handler, visibility_timeout=args.visibility_timeout)
+        for agent in queue.agents():
+            print(f"{agent.agent_id}: {agent.status}, {agent.results} subtasks")
+        failed = queue.counts()["failed"]
+        queue.close()
+        with open(os.path.join(output_dir, "final_result.txt"), "w", buffering=64 * 1024) as result_file:
+            subtask_count = task_int_system.write_results(subtasks, result_file)
+        task_gen_system.record_state(task, "executed", subtasks=subtask_count, failed=failed)
+    else:
+        # Divide tasks and write each subtask to the final result as it is produced
+        with open(os.path.join(output_dir, "final_result.txt"), "w", buffering=64 * 1024) as result_file:
+            subtask_count = task_int_system.write_tasks(task_div_system.iter_subtasks(task), result_file)
+        task_gen_system.record_state(task, "integrated", subtasks=subtask_count)
 
-# Integrate tasks
-final_result = task_int_system.integrate_tasks(subtasks)
+    task_gen_system.close()
 
-# Create README.md
-readme_content = task_int_system.create_readme(task.description, "output/\n  README.md\n  final_result.txt")
-with open(os.path.join(output_dir, "README.md"), "w") as readme_file:
-    readme_file.write(readme_content)
+    print("Task generation completed. Check the output directory for results.")
 
-# Save final result
-with open(os.path.join(output_dir, "final_result.txt"), "w") as result_file:
-    result_file.write(final_result)
 
-print("Task generation completed. Check the output directory for results.")
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,16 @@
+from components import SubTaskComponent
+
+
 class TaskDivisionSystem:
     def divide_task(self, task_component):
-        subtasks = self._create_subtasks(task_component)
+        subtasks = list(self.iter_subtasks(task_component))
         return subtasks
 
-    def _create_subtasks(self, task_component):
-        subtasks = []
-        for i, result in enumerate(task_component.results):
-            subtask = SubTaskComponent(f"Subtask {i}: {result}", [task_component])
-            subtasks.append(subtask)
-        return subtasks
+    def iter_subtasks(self, task_component):
+        """Yield a subtask per non-blank result, as the caller consumes them."""
+        i = 0
+        for result in task_component.results:
+            if not result.strip():
+                continue
+            yield SubTaskComponent(f"Subtask {i}: {result}", [task_component])
+            i += 1
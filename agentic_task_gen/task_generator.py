@@ -1,21 +1,59 @@
+import sys
+from pathlib import Path
+
+# llm_common sits at the repository root, shared with Agent_Gen_ECS.
+_ROOT = str(Path(__file__).resolve().parent.parent)
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
+
+from llm_common.async_client import SyncLLMClient
+from llm_common.run_journal import JournaledLLM, RunJournal
 
-import openai
 
 class TaskGenerationSystem:
-    def __init__(self, api_key):
-        openai.api_key = api_key
-
-    def generate_tasks(self, task_component):
-        for prompt in task_component.prompts:
-            try:
-                response = openai.ChatCompletion.create(
-                    model="gpt-4",
-                    messages=[
-                        {"role": "system", "content": "You are a helpful assistant."},
-                        {"role": "user", "content": prompt}
-                    ]
-                )
-                task_component.results.append(response['choices'][0]['message']['content'])
-            except Exception as e:
-                print(f"Error generating task for prompt '{prompt}': {e}")
-                task_component.results.append(f"Error generating task: {e}")
+    def __init__(self, api_key, client=None, model="gpt-4", journal_path=None, replay=False):
+        # Set OPENAI_BASE_URL to run against a local endpoint (llm_common/mock_server.py).
+        if client is None and not replay:
+            client = SyncLLMClient(model=model, api_key=api_key)
+        # With a journal, prompts answered in an earlier (possibly interrupted)
+        # run are not sent again, and replay=True never calls the API.
+        self.journal = RunJournal(journal_path) if journal_path else None
+        if self.journal is not None:
+            client = JournaledLLM(client, self.journal, replay=replay, model=model)
+        self.client = client
+
+    def generate_tasks(self, task_component, retries=1):
+        """Append the response to each prompt to ``task_component.results``.
+
+        All prompts go out concurrently through the shared rate-limited
+        client. Prompts that fail get up to ``retries`` further passes of
+        their own; any still failing are returned and never written into
+        the results.
+        """
+        prompts = task_component.prompts
+        responses = {}
+        pending = list(range(len(prompts)))
+        for attempt in range(retries + 1):
+            if not pending:
+                break
+            results = self.client.generate_many([prompts[i] for i in pending], return_exceptions=True)
+            failed = []
+            for i, result in zip(pending, results):
+                if isinstance(result, Exception):
+                    print(f"Error generating task for prompt '{prompts[i]}' (attempt {attempt + 1}): {result}")
+                    failed.append(i)
+                else:
+                    responses[i] = result
+            pending = failed
+        task_component.results.extend(responses[i] for i in sorted(responses))
+        return [prompts[i] for i in pending]
+
+    def record_state(self, task_component, state, **details):
+        if self.journal is not None:
+            self.journal.record_state(task_component.description, state, **details)
+
+    def close(self):
+        if self.client is not None and hasattr(self.client, "close"):
+            self.client.close()
+        if self.journal is not None:
+            self.journal.close()
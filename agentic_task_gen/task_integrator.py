@@ -1,10 +1,24 @@
-
 class TaskIntegrationSystem:
     def integrate_tasks(self, subtasks):
-        final_result = ""
+        return "".join(f"{subtask.task}\n" for subtask in subtasks)
+
+    def write_tasks(self, subtasks, result_file):
+        """Write each subtask to ``result_file`` as it arrives; returns how many."""
+        count = 0
+        for subtask in subtasks:
+            result_file.write(subtask.task)
+            result_file.write("\n")
+            count += 1
+        return count
+
+    def write_results(self, subtasks, result_file):
+        """Write each executed subtask followed by its result; returns how many."""
+        count = 0
         for subtask in subtasks:
-            final_result += subtask.task + "\n"
-        return final_result
+            result = subtask.results if subtask.results is not None else "(failed)"
+            result_file.write(f"{subtask.task}\n{result}\n\n")
+            count += 1
+        return count
 
     def create_readme(self, task_description, file_tree):
         readme_content = f"# Project Overview\n\n{task_description}\n\n## File Tree\n\n{file_tree}"
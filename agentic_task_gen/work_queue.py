@@ -0,0 +1,137 @@
+import json
+import sqlite3
+import time
+
+from components import AgentComponent
+
+QUEUED, LEASED, DONE, FAILED = "queued", "leased", "done", "failed"
+
+
+class WorkQueue:
+    """SQLite-backed work queue with leases, shared by local processes.
+
+    A worker claims an item and holds a lease on it for
+    ``visibility_timeout`` seconds. If the worker acknowledges the item in
+    time it is done. If the worker dies, the lease runs out and the item is
+    handed to the next worker that asks. An item claimed ``max_attempts``
+    times without success is marked failed. Every process opens its own
+    WorkQueue on the same path.
+    """
+
+    def __init__(self, path, visibility_timeout=30.0, max_attempts=3):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        # Autocommit; claims take the write lock explicitly with BEGIN IMMEDIATE.
+        self.db = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS items ("
+            "id INTEGER PRIMARY KEY, payload TEXT NOT NULL, status TEXT NOT NULL, "
+            "lease_owner TEXT, lease_expires REAL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "result TEXT, error TEXT)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS items_status ON items (status, lease_expires)")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS agents ("
+            "agent_id TEXT PRIMARY KEY, status TEXT NOT NULL, processed INTEGER NOT NULL, "
+            "updated_at REAL NOT NULL)"
+        )
+
+    def put_many(self, payloads):
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO items (payload, status) VALUES (?, ?)",
+                ((json.dumps(payload), QUEUED) for payload in payloads),
+            )
+
+    def put(self, payload):
+        self.put_many([payload])
+
+    def claim(self, worker_id):
+        """Lease the oldest available item; returns (item_id, payload) or None."""
+        now = time.time()
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            # Items whose lease ran out on their last allowed attempt have failed.
+            self.db.execute(
+                "UPDATE items SET status = ?, error = COALESCE(error, 'lease expired') "
+                "WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                (FAILED, LEASED, now, self.max_attempts),
+            )
+            row = self.db.execute(
+                "UPDATE items SET status = ?, lease_owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE id = (SELECT id FROM items WHERE status = ? OR (status = ? AND lease_expires < ?) "
+                "ORDER BY id LIMIT 1) RETURNING id, payload",
+                (LEASED, worker_id, now + self.visibility_timeout, QUEUED, LEASED, now),
+            ).fetchone()
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        return (row[0], json.loads(row[1])) if row else None
+
+    def ack(self, item_id, worker_id, result):
+        """Complete an item. False if the lease was lost to another worker."""
+        with self.db:
+            cursor = self.db.execute(
+                "UPDATE items SET status = ?, result = ?, lease_expires = NULL "
+                "WHERE id = ? AND status = ? AND lease_owner = ?",
+                (DONE, json.dumps(result), item_id, LEASED, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def nack(self, item_id, worker_id, error):
+        """Give an item back after a failure; it fails for good after max_attempts."""
+        with self.db:
+            self.db.execute(
+                "UPDATE items SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                "error = ?, lease_expires = NULL WHERE id = ? AND status = ? AND lease_owner = ?",
+                (self.max_attempts, FAILED, QUEUED, error, item_id, LEASED, worker_id),
+            )
+
+    def counts(self):
+        rows = self.db.execute("SELECT status, COUNT(*) FROM items GROUP BY status").fetchall()
+        return {QUEUED: 0, LEASED: 0, DONE: 0, FAILED: 0, **dict(rows)}
+
+    def unfinished(self):
+        counts = self.counts()
+        return counts[QUEUED] + counts[LEASED]
+
+    def results(self):
+        """(payload, result) for finished items, in the order they were queued."""
+        for payload, result in self.db.execute(
+            "SELECT payload, result FROM items WHERE status = ? ORDER BY id", (DONE,)
+        ):
+            yield json.loads(payload), json.loads(result)
+
+    def failures(self):
+        return self.db.execute(
+            "SELECT id, payload, attempts, error FROM items WHERE status = ? ORDER BY id", (FAILED,)
+        ).fetchall()
+
+    def attempts(self):
+        """Number of items claimed more than once (e.g. after a worker died)."""
+        return self.db.execute("SELECT COUNT(*) FROM items WHERE attempts > 1").fetchone()[0]
+
+    def update_agent(self, agent):
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO agents (agent_id, status, processed, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (agent.agent_id, agent.status, agent.results or 0, time.time()),
+            )
+
+    def agents(self):
+        """AgentComponents as last reported by each worker; results counts the items completed."""
+        agents = []
+        for agent_id, status, processed in self.db.execute(
+            "SELECT agent_id, status, processed FROM agents ORDER BY agent_id"
+        ):
+            agent = AgentComponent(agent_id, status)
+            agent.results = processed
+            agents.append(agent)
+        return agents
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,123 @@
+import hashlib
+import multiprocessing
+import os
+import time
+
+from components import AgentComponent
+from work_queue import WorkQueue
+
+_llm = None
+# Spawned workers start clean: a forked child would inherit the coordinator's
+# open SQLite connections and the SyncLLMClient event-loop thread mid-use.
+_spawn = multiprocessing.get_context("spawn")
+
+
+def stub_handler(payload, rounds=20000):
+    """CPU-bound stand-in for an LLM call: iterated SHA-256 of the subtask."""
+    digest = payload["task"].encode("utf-8")
+    for _ in range(rounds):
+        digest = hashlib.sha256(digest).digest()
+    return f"stub {digest.hex()[:16]}"
+
+
+def llm_handler(payload, model="gpt-4"):
+    """Ask the model to carry out the subtask; one client per worker process."""
+    global _llm
+    if _llm is None:
+        # Imported here so spawned workers running other handlers skip the client stack.
+        from task_generator import TaskGenerationSystem
+
+        _llm = TaskGenerationSystem(os.environ.get("OPENAI_API_KEY", "API"), model=model).client
+    return _llm.generate(f"Carry out this subtask and report the result:\n{payload['task']}")
+
+
+def worker_loop(queue_path, worker_id, handler, visibility_timeout=30.0, max_attempts=3, poll_interval=0.05):
+    """Claim, execute and acknowledge items until the queue has nothing left.
+
+    The worker's AgentComponent goes idle -> busy -> idle per item and ends
+    as stopped; ``results`` counts the items it completed.
+    """
+    queue = WorkQueue(queue_path, visibility_timeout, max_attempts)
+    agent = AgentComponent(worker_id, "idle")
+    agent.results = 0
+    queue.update_agent(agent)
+    try:
+        while True:
+            claimed = queue.claim(worker_id)
+            if claimed is None:
+                # Items leased by other workers may still come back if they die.
+                if not queue.unfinished():
+                    break
+                time.sleep(poll_interval)
+                continue
+            item_id, payload = claimed
+            agent.status = "busy"
+            queue.update_agent(agent)
+            try:
+                result = handler(payload)
+            except Exception as exc:
+                print(f"{worker_id}: item {item_id} failed: {exc}")
+                queue.nack(item_id, worker_id, repr(exc))
+            else:
+                if queue.ack(item_id, worker_id, result):
+                    agent.results += 1
+            agent.status = "idle"
+            queue.update_agent(agent)
+        agent.status = "stopped"
+        queue.update_agent(agent)
+    finally:
+        queue.close()
+
+
+def _reset(queue_path):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(queue_path + suffix):
+            os.remove(queue_path + suffix)
+
+
+def run_pool(subtasks, queue_path, workers=4, handler=stub_handler, visibility_timeout=30.0,
+             max_attempts=3, poll_interval=0.05, on_start=None):
+    """Execute ``subtasks`` on ``workers`` processes through a fresh WorkQueue.
+
+    Each subtask's ``results`` is set to its handler's output. Workers that
+    exit abnormally are replaced while work remains, and their leased items
+    are handed out again once the lease expires. Workers are spawned, not
+    forked, so ``handler`` must be importable (a module-level function or a
+    ``functools.partial`` of one). ``on_start(processes)`` is called after
+    the workers start. Returns the WorkQueue for inspection; the caller
+    closes it.
+    """
+    subtasks = list(subtasks)
+    _reset(queue_path)
+    queue = WorkQueue(queue_path, visibility_timeout, max_attempts)
+    queue.put_many({"index": i, "task": subtask.task} for i, subtask in enumerate(subtasks))
+
+    spawned = [0] * workers
+
+    def spawn(i):
+        # Replacements get a fresh agent id; the dead worker's row keeps its last status.
+        worker_id = f"worker-{i}" if not spawned[i] else f"worker-{i}.{spawned[i]}"
+        spawned[i] += 1
+        process = _spawn.Process(
+            target=worker_loop,
+            args=(queue_path, worker_id, handler, visibility_timeout, max_attempts, poll_interval),
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    processes = [spawn(i) for i in range(workers)]
+    if on_start is not None:
+        on_start(processes)
+    while queue.unfinished():
+        for i, process in enumerate(processes):
+            if not process.is_alive() and process.exitcode != 0:
+                print(f"worker {process.pid} exited with {process.exitcode}; starting a replacement")
+                processes[i] = spawn(i)
+        time.sleep(poll_interval)
+    for process in processes:
+        process.join()
+
+    for payload, result in queue.results():
+        subtasks[payload["index"]].results = result
+    return queue
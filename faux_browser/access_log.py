@@ -0,0 +1,98 @@
+"""Buffered, thread-safe log files written from a background thread.
+
+Request threads only enqueue lines. A single writer thread appends them in
+batches, flushing once ``flush_lines`` lines are pending or ``flush_interval``
+seconds have passed, and rotates the file once it would exceed ``max_bytes``.
+``close`` drains every line queued before it was called.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from pathlib import Path
+
+_STOP = object()
+
+
+class BufferedLog:
+    def __init__(
+        self,
+        path: Path,
+        flush_lines: int = 256,
+        flush_interval: float = 1.0,
+        max_bytes: int = 0,
+        backups: int = 5,
+    ):
+        self.path = path
+        self.flush_lines = flush_lines
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self._fh = path.open("ab")
+        self._size = self._fh.tell()
+        self._thread = threading.Thread(target=self._run, name=f"log-{path.name}", daemon=True)
+        self._thread.start()
+
+    def write(self, line: str) -> None:
+        with self._close_lock:
+            if not self._closed:
+                self._queue.put(line)
+                return
+            # Late writers after shutdown append synchronously so nothing is lost.
+            with self.path.open("a", encoding="utf-8") as fh:
+                fh.write(line)
+
+    def close(self) -> None:
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._fh.close()
+
+    def _run(self) -> None:
+        pending: list[str] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self._flush(pending)
+                return
+            if item is not None:
+                pending.append(item)
+            if len(pending) >= self.flush_lines or time.monotonic() >= deadline:
+                self._flush(pending)
+                pending = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _flush(self, lines: list[str]) -> None:
+        if not lines:
+            return
+        data = "".join(lines).encode("utf-8")
+        if self.max_bytes and self._size and self._size + len(data) > self.max_bytes:
+            self._rotate()
+        self._fh.write(data)
+        self._fh.flush()
+        self._size += len(data)
+
+    def _rotate(self) -> None:
+        self._fh.close()
+        for idx in range(self.backups - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{idx}")
+            if older.exists():
+                older.replace(self.path.with_name(f"{self.path.name}.{idx + 1}"))
+        if self.backups:
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+        self._fh = self.path.open("ab")
+        self._size = 0
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Benchmark fetcher.fetch_all against local stand-in HTTP servers.
+
+Usage:
+    python bench_fetcher.py --pages 500 --domains 8 --concurrency 16 --delay 0.02
+
+Each stand-in "domain" is a threaded HTTP server on its own localhost port that
+returns a synthetic HTML page after ``--delay`` seconds. The report lists
+pages/sec and p50/p99 per-page fetch latency.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from fetcher import fetch_all
+from manifest_store import ManifestStore
+
+PAGE = (
+    "<html><head><title>Page {n}</title><script>alert(1)</script></head>"
+    "<body><h1 onclick='x()'>Page {n}</h1>" + "<p>Lorem ipsum dolor sit amet.</p>" * 50
+    + "</body></html>"
+)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    delay = 0.0
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        body = PAGE.format(n=self.path).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_servers(count: int, delay: float) -> list[ThreadingHTTPServer]:
+    StandInHandler.delay = delay
+    servers = []
+    for _ in range(count):
+        httpd = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        httpd.daemon_threads = True
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        servers.append(httpd)
+    return servers
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the concurrent fetcher")
+    parser.add_argument("--pages", type=int, default=500, help="Number of URLs to fetch")
+    parser.add_argument("--domains", type=int, default=8, help="Number of stand-in servers")
+    parser.add_argument("--concurrency", type=int, default=16, help="Parallel fetches")
+    parser.add_argument("--per-domain", type=int, default=4, help="In-flight cap per domain")
+    parser.add_argument("--delay", type=float, default=0.02, help="Server delay per page (s)")
+    args = parser.parse_args()
+
+    servers = start_servers(args.domains, args.delay)
+    urls = [
+        f"http://127.0.0.1:{servers[i % len(servers)].server_port}/page/{i}"
+        for i in range(args.pages)
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        output_dir = Path(tmp)
+        start = time.perf_counter()
+        with ManifestStore(output_dir / "manifest.json") as manifest:
+            results = fetch_all(
+                urls,
+                output_dir,
+                manifest,
+                concurrency=args.concurrency,
+                per_domain=args.per_domain,
+            )
+        wall = time.perf_counter() - start
+    for httpd in servers:
+        httpd.shutdown()
+
+    latencies = [r.elapsed for r in results if r.error is None]
+    failed = len(results) - len(latencies)
+    print(f"pages:       {len(latencies)} ok, {failed} failed")
+    print(f"wall time:   {wall:.2f}s")
+    print(f"throughput:  {len(latencies) / wall:.1f} pages/sec")
+    if latencies:
+        print(f"latency p50: {percentile(latencies, 50) * 1000:.1f} ms")
+        print(f"latency p99: {percentile(latencies, 99) * 1000:.1f} ms")
+        print(f"latency avg: {statistics.mean(latencies) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Micro-benchmark for the HTML sanitizer backends.
+
+Usage:
+    python bench_sanitize.py                 # synthetic ~1 MB news-style page
+    python bench_sanitize.py page1.html ...  # your own saved pages
+
+Each backend sanitizes every input ``--rounds`` times on a single core and the
+report lists throughput in MB/s. Every backend's output is also checked against
+the reference ``html.parser`` backend after re-parsing both with BeautifulSoup
+and ignoring whitespace, so a faster backend that changes the result is flagged.
+The synthetic page and the comparison come from test_sanitizer.py, which runs
+the same check, plus misnested markup, under pytest.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+from sanitizer import BACKENDS, sanitize_html
+from test_sanitizer import normalized, synthetic_page
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark HTML sanitizer backends")
+    parser.add_argument("files", nargs="*", help="HTML files to sanitize")
+    parser.add_argument("--rounds", type=int, default=3, help="Repetitions per backend")
+    args = parser.parse_args()
+
+    pages = [Path(f).read_text(encoding="utf-8", errors="replace") for f in args.files]
+    pages = pages or [synthetic_page()]
+    total_mb = sum(len(page.encode("utf-8")) for page in pages) / 1e6
+    reference = [normalized(sanitize_html(page)) for page in pages]
+
+    print(f"input: {len(pages)} page(s), {total_mb:.2f} MB")
+    for backend in BACKENDS:
+        try:
+            outputs = [sanitize_html(page, backend) for page in pages]
+        except Exception as exc:  # e.g. lxml not installed
+            print(f"{backend:12} unavailable: {exc}")
+            continue
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            for page in pages:
+                sanitize_html(page, backend)
+        elapsed = time.perf_counter() - start
+        same = all(normalized(out) == ref for out, ref in zip(outputs, reference))
+        print(
+            f"{backend:12} {total_mb * args.rounds / elapsed:7.2f} MB/s per core"
+            f"  output {'matches' if same else 'DIFFERS from'} html.parser"
+        )
+
+
+if __name__ == "__main__":
+    main()
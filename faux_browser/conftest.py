@@ -0,0 +1,29 @@
+"""Shared fixtures for the faux_browser tests."""
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from load_test import free_port, wait_for_port
+
+
+@pytest.fixture(scope="module")
+def start_server():
+    """Return a function that runs offline_server.py on a free port and returns the port."""
+    processes = []
+
+    def start(repo: Path, profile: Path, *args: str) -> int:
+        port = free_port()
+        processes.append(subprocess.Popen(
+            [sys.executable, str(Path(__file__).with_name("offline_server.py")),
+             "--repo", str(repo), "--port", str(port), "--profile", str(profile), *args],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        ))
+        wait_for_port(port)
+        return port
+
+    yield start
+    for process in processes:
+        process.terminate()
+        process.wait()
@@ -0,0 +1,231 @@
+"""Building blocks for ``fetcher.py --depth``: URL normalization, stable local
+paths, link rewriting, a deduplicating frontier, and a resumable crawl journal.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from collections import deque
+from hashlib import blake2b
+from pathlib import Path
+from urllib.parse import quote, unquote, urljoin, urlsplit, urlunsplit
+
+from sanitizer import _render_starttag, _StreamSanitizer
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# Attribute holding the URL for each tag whose links are rewritten and followed.
+LINK_ATTRS = {"a": "href", "area": "href", "link": "href", "img": "src", "source": "src"}
+_UNSAFE = re.compile(r"[^\w.~@+=,-]")
+# Extensions stored as files. Any other last segment, dotted or not (``/v1.2``,
+# ``/wiki/U.S._Navy``), is treated as a page and gets its own index.html.
+FILE_EXTENSIONS = frozenset((
+    "html", "htm", "xhtml", "css", "js", "mjs", "json", "xml", "rss", "atom", "txt", "csv",
+    "pdf", "png", "jpg", "jpeg", "gif", "webp", "svg", "ico", "bmp", "avif",
+    "woff", "woff2", "ttf", "otf", "eot", "mp3", "mp4", "webm", "ogg", "wav",
+    "zip", "gz", "tar", "tgz",
+))
+
+
+def normalize_url(url: str, base: str | None = None) -> str | None:
+    """Return a canonical absolute form of ``url``, or None if it is not http(s).
+
+    The scheme and host are lowercased, default ports and fragments dropped,
+    and ``.``/``..`` path segments resolved, so equivalent links dedupe.
+    """
+    if base is not None:
+        url = urljoin(base, url.strip())
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+    try:
+        port = parts.port
+    except ValueError:
+        return None
+    netloc = parts.hostname.lower()
+    if port is not None and port != DEFAULT_PORTS[scheme]:
+        netloc = f"{netloc}:{port}"
+    segments: list[str] = []
+    for segment in parts.path.split("/")[1:]:
+        if segment == "..":
+            if segments:
+                segments.pop()
+        elif segment != ".":
+            segments.append(segment)
+    path = "/" + "/".join(segments)
+    if parts.path.endswith(("/.", "/..")) and not path.endswith("/"):
+        path += "/"
+    return urlunsplit((scheme, netloc, path, parts.query, ""))
+
+
+def local_path(url: str) -> str:
+    """Map ``url`` to a stable path under ``pages/<domain>/``.
+
+    ``/`` and paths ending in ``/`` or without one of ``FILE_EXTENSIONS`` map to
+    an ``index.html`` in a directory of that name, so ``/about`` and
+    ``/about/team`` (or ``/v1.2`` and ``/v1.2/x.html``) can both be stored. A
+    query string adds a short hash to the file name.
+    """
+    parts = urlsplit(url)
+    segments = [_UNSAFE.sub("_", unquote(s)) for s in parts.path.split("/") if s]
+    segments = [s for s in segments if s not in (".", "..")]
+    if parts.path.endswith("/") or not segments or not _is_file(segments[-1]):
+        segments.append("index.html")
+    if parts.query:
+        stem, _, ext = segments[-1].rpartition(".")
+        tag = blake2b(parts.query.encode("utf-8"), digest_size=4).hexdigest()
+        segments[-1] = f"{stem}__{tag}.{ext}"
+    return "/".join(segments)
+
+
+def _is_file(segment: str) -> bool:
+    stem, dot, ext = segment.rpartition(".")
+    return bool(stem and dot) and ext.lower() in FILE_EXTENSIONS
+
+
+def page_href(url: str) -> str:
+    """Return the offline server path that serves the local copy of ``url``."""
+    return f"/pages/{urlsplit(url).netloc}/{quote(local_path(url))}"
+
+
+class LinkRewriter(_StreamSanitizer):
+    """Point same-domain links at their local copies and collect them.
+
+    Input is expected to be sanitized already; markup is copied through the
+    same way as the ``stream`` sanitizer backend.
+    """
+
+    def __init__(self, base_url: str):
+        super().__init__()
+        self.base_url = base_url
+        self.domain = urlsplit(base_url).netloc
+        self.links: list[str] = []
+
+    def _emit_starttag(self, tag, attrs, close):
+        name = LINK_ATTRS.get(tag)
+        if tag == "base":
+            href = dict(attrs).get("href")
+            if href:
+                self.base_url = urljoin(self.base_url, href)
+        if name is None:
+            super()._emit_starttag(tag, attrs, close)
+            return
+        rewritten = []
+        changed = False
+        for attr, value in attrs:
+            if attr == name and value:
+                target = normalize_url(value, self.base_url)
+                if target and urlsplit(target).netloc == self.domain:
+                    self.links.append(target)
+                    fragment = urlsplit(value).fragment
+                    value = page_href(target) + (f"#{fragment}" if fragment else "")
+                    changed = True
+            if not attr.startswith("on"):
+                rewritten.append((attr, value))
+        if changed:
+            self.out.append(_render_starttag(tag, rewritten, close))
+        else:
+            super()._emit_starttag(tag, attrs, close)
+
+
+def rewrite_links(html: str, base_url: str) -> tuple[str, list[str]]:
+    """Return ``html`` with local links rewritten, and the links it contains."""
+    parser = LinkRewriter(normalize_url(base_url) or base_url)
+    parser.feed(html)
+    parser.close()
+    return "".join(parser.out), parser.links
+
+
+def _url_key(url: str) -> int:
+    return int.from_bytes(blake2b(url.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class Frontier:
+    """FIFO of URLs to crawl that admits each URL at most once.
+
+    URLs are remembered by a 64-bit hash rather than the string, and no more
+    than ``max_urls`` are ever admitted, so memory stays proportional to the
+    page budget however many links the crawled pages contain.
+    """
+
+    def __init__(self, max_urls: int):
+        self.max_urls = max_urls
+        self._queue: deque[tuple[str, int]] = deque()
+        self._seen: set[int] = set()
+
+    def add(self, url: str, depth: int) -> bool:
+        key = _url_key(url)
+        if key in self._seen or len(self._seen) >= self.max_urls:
+            return False
+        self._seen.add(key)
+        self._queue.append((url, depth))
+        return True
+
+    def mark_seen(self, url: str) -> None:
+        self._seen.add(_url_key(url))
+
+    def pop(self) -> tuple[str, int]:
+        return self._queue.popleft()
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+
+class CrawlJournal:
+    """Append-only JSONL record of discovered and finished URLs.
+
+    Each line is either ``{"url": ..., "depth": n}`` for a URL admitted to the
+    frontier or ``{"done": url}`` once it has been stored. After an interrupt,
+    ``replay`` rebuilds the frontier with the URLs that were not finished. The
+    journal is deleted when a crawl completes.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fh = None
+
+    def replay(self, frontier: Frontier) -> int:
+        """Load an interrupted crawl into ``frontier``; return pages already done."""
+        if not self.path.exists():
+            return 0
+        discovered: dict[str, int] = {}
+        done: set[int] = set()
+        with self.path.open(encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn last line from a crash
+                if "done" in record:
+                    done.add(_url_key(record["done"]))
+                else:
+                    discovered.setdefault(record["url"], record["depth"])
+        for url, depth in discovered.items():
+            if _url_key(url) in done:
+                frontier.mark_seen(url)
+            else:
+                frontier.add(url, depth)
+        return len(done)
+
+    def _write(self, record: dict) -> None:
+        if self._fh is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Line buffered: every record reaches the OS before the next fetch.
+            self._fh = self.path.open("a", encoding="utf-8", buffering=1)
+        self._fh.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def discovered(self, url: str, depth: int) -> None:
+        self._write({"url": url, "depth": depth})
+
+    def done(self, url: str) -> None:
+        self._write({"done": url})
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def finish(self) -> None:
+        self.close()
+        self.path.unlink(missing_ok=True)
@@ -0,0 +1,98 @@
+"""Compiled domain rules for user profiles.
+
+Profile lists are compiled once into a trie keyed on reversed domain labels
+(``www.example.com`` is stored as ``com -> example -> www``), so classifying a
+domain walks at most one node per label regardless of how many rules exist.
+
+Patterns:
+
+* ``example.com`` matches exactly that host.
+* ``*.example.com`` matches any subdomain of ``example.com`` but not the
+  domain itself.
+* ``.example.com`` matches ``example.com`` and all of its subdomains.
+
+The most specific matching rule wins. When the same pattern appears in more
+than one list, blocked beats allowed, which beats soft-allow.
+"""
+
+from __future__ import annotations
+
+ALLOW = "allow"
+SOFT_ALLOW = "soft_allow"
+BLOCK = "block"
+DENY = "deny"
+
+_PRECEDENCE = {SOFT_ALLOW: 1, ALLOW: 2, BLOCK: 3}
+_MEMO_LIMIT = 65536
+
+
+class _Node:
+    __slots__ = ("children", "exact", "subdomains")
+
+    def __init__(self):
+        self.children: dict[str, _Node] = {}
+        self.exact: str | None = None
+        self.subdomains: str | None = None
+
+
+def _merge(current: str | None, verdict: str) -> str:
+    if current is None or _PRECEDENCE[verdict] > _PRECEDENCE[current]:
+        return verdict
+    return current
+
+
+class DomainPolicy:
+    def __init__(self, allowed=(), soft_allow=(), blocked=()):
+        self._root = _Node()
+        self._memo: dict[str, str] = {}
+        for verdict, patterns in ((ALLOW, allowed), (SOFT_ALLOW, soft_allow), (BLOCK, blocked)):
+            for pattern in patterns:
+                self.add(pattern, verdict)
+
+    @classmethod
+    def from_profile(cls, profile: dict) -> "DomainPolicy":
+        return cls(
+            profile.get("allowed_domains", []),
+            profile.get("soft_allow_domains", []),
+            profile.get("blocked_domains", []),
+        )
+
+    def add(self, pattern: str, verdict: str) -> None:
+        pattern = pattern.strip().lower().rstrip(".")
+        exact = include_subdomains = False
+        if pattern.startswith("*."):
+            pattern, include_subdomains = pattern[2:], True
+        elif pattern.startswith("."):
+            pattern, exact, include_subdomains = pattern[1:], True, True
+        else:
+            exact = True
+        node = self._root
+        for label in reversed(pattern.split(".")):
+            node = node.children.setdefault(label, _Node())
+        if exact:
+            node.exact = _merge(node.exact, verdict)
+        if include_subdomains:
+            node.subdomains = _merge(node.subdomains, verdict)
+        self._memo.clear()
+
+    def verdict(self, domain: str) -> str:
+        """Return ALLOW, SOFT_ALLOW, BLOCK, or DENY for ``domain``."""
+        cached = self._memo.get(domain)
+        if cached is not None:
+            return cached
+        labels = domain.lower().rstrip(".").split(".")
+        node = self._root
+        result = None
+        for depth, label in enumerate(reversed(labels)):
+            if node.subdomains is not None:
+                result = node.subdomains
+            node = node.children.get(label)
+            if node is None:
+                break
+            if depth == len(labels) - 1 and node.exact is not None:
+                result = node.exact
+        result = result or DENY
+        if len(self._memo) >= _MEMO_LIMIT:
+            self._memo.clear()
+        self._memo[domain] = result
+        return result
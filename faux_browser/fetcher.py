@@ -4,81 +4,511 @@
 from __future__ import annotations
 
 import argparse
-import json
-from hashlib import sha256
+import threading
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime, timezone
+from hashlib import sha256
+from typing import Callable, Iterator, NamedTuple
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from crawler import CrawlJournal, Frontier, local_path, normalize_url, rewrite_links
+from manifest_store import ManifestStore, atomic_write_bytes, file_hash
+from objects import BlobStore
+from sanitizer import BACKENDS, sanitize_html
+from search_index import INDEX_NAME, SearchIndex
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+FAILED = "failed"
+CRAWL_JOURNAL = "crawl.jsonl"
+
+
+class FetchResult(NamedTuple):
+    url: str
+    elapsed: float
+    status: str = CHANGED
+    error: Exception | None = None
 
 
 def read_sites(path: Path) -> list[str]:
     return [line.strip() for line in path.read_text().splitlines() if line.strip()]
 
 
-def sanitize_html(html: str) -> str:
-    """Strip scripts, forms, and event handlers."""
-    soup = BeautifulSoup(html, "html.parser")
-    for tag in soup(["script", "form", "iframe"]):
-        tag.decompose()
-    for tag in soup.find_all(True):
-        attrs = dict(tag.attrs)
-        for attr in list(attrs):
-            if attr.lower().startswith("on"):
-                del tag.attrs[attr]
-    return str(soup)
+def url_domain(url: str) -> str:
+    return url.split("//", 1)[-1].split("/", 1)[0]
 
 
-def file_hash(path: Path) -> str:
-    h = sha256()
-    with path.open("rb") as fh:
-        for chunk in iter(lambda: fh.read(8192), b""):
-            h.update(chunk)
-    return h.hexdigest()
+def make_session(pool_size: int = 10, retries: int = 3, backoff: float = 0.5) -> requests.Session:
+    """Return a session with pooled keep-alive connections and retry/backoff."""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=("GET",),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
 
-def update_manifest(manifest: Path, url: str, file_path: Path) -> None:
-    manifest_data = {}
-    if manifest.exists():
-        manifest_data = json.loads(manifest.read_text())
+class DomainLimiter:
+    """Cap the number of in-flight requests per domain."""
 
-    relative = file_path.relative_to(manifest.parent)
-    manifest_data[url] = {
+    def __init__(self, per_domain: int):
+        self.per_domain = per_domain
+        self._lock = threading.Lock()
+        self._slots: dict[str, threading.Semaphore] = {}
+
+    def slot(self, domain: str) -> threading.Semaphore:
+        with self._lock:
+            sem = self._slots.get(domain)
+            if sem is None:
+                sem = self._slots[domain] = threading.Semaphore(self.per_domain)
+            return sem
+
+
+def update_manifest(
+    manifest: ManifestStore,
+    url: str,
+    file_path: Path,
+    digest: str | None = None,
+    **extra,
+) -> None:
+    relative = file_path.relative_to(manifest.path.parent)
+    now = datetime.now(timezone.utc).isoformat()
+    entry = {
         "path": str(relative),
-        "sha256": file_hash(file_path),
-        "fetched_at": datetime.now(timezone.utc).isoformat(),
+        "sha256": digest or file_hash(file_path),
+        "fetched_at": now,
+        "checked_at": now,
+        **extra,
     }
+    previous = manifest.get(url)
+    if previous and "screenshot" in previous:
+        # Kept so screenshot_fetcher.py can tell the page changed since capture.
+        entry["screenshot"] = previous["screenshot"]
+    manifest.set(url, entry)
+
+
+def _mark_checked(manifest: ManifestStore, url: str, entry: dict, **validators) -> None:
+    now = datetime.now(timezone.utc).isoformat()
+    manifest.set(url, {**entry, **validators, "checked_at": now})
 
-    manifest.write_text(json.dumps(manifest_data, indent=2))
 
+def _has_local_copy(output_dir: Path, entry: dict | None, html_path: Path) -> bool:
+    if entry is None:
+        return False
+    if entry.get("object"):
+        return (output_dir / entry["object"]).exists()
+    return html_path.exists()
 
-def fetch_site(url: str, output_dir: Path, manifest: Path) -> None:
-    resp = requests.get(url, timeout=10)
+
+def _write_page(
+    output_dir: Path, dest: Path, data: bytes, digest: str, store: BlobStore | None
+) -> dict:
+    """Write ``data`` to ``dest`` and return extra manifest fields."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    if store is None:
+        atomic_write_bytes(dest, data)
+        return {}
+    blob = store.put(data, digest)
+    store.link(blob, dest)
+    return {"object": blob.relative_to(output_dir).as_posix()}
+
+
+def fetch_site(
+    url: str,
+    output_dir: Path,
+    manifest: ManifestStore,
+    session: requests.Session | None = None,
+    sanitize: Callable[[str], str] = sanitize_html,
+    incremental: bool = False,
+    store: BlobStore | None = None,
+    index: SearchIndex | None = None,
+) -> str:
+    """Fetch ``url`` into the repository and return CHANGED or UNCHANGED.
+
+    With ``incremental``, the request carries the ETag/Last-Modified validators
+    stored in the manifest, and a 304 response or a body that hashes the same
+    as last time skips sanitizing and rewriting the page. With a ``store``, the
+    page body is written once to the content-addressed object store and
+    hard-linked into ``pages/``. Changed pages are added to the search
+    ``index`` if one is given.
+    """
+    domain = url_domain(url)
+    html_path = output_dir / "pages" / domain / "index.html"
+    previous = manifest.get(url) if incremental else None
+    if not _has_local_copy(output_dir, previous, html_path):
+        previous = None
+    headers = {}
+    if previous:
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+
+    resp = (session or requests).get(url, timeout=10, headers=headers)
+    if previous and resp.status_code == 304:
+        _mark_checked(manifest, url, previous)
+        return UNCHANGED
     resp.raise_for_status()
-    domain = url.split("//", 1)[-1].split("/", 1)[0]
-    dest = output_dir / "pages" / domain
-    dest.mkdir(parents=True, exist_ok=True)
-    sanitized = sanitize_html(resp.text)
-    html_path = dest / "index.html"
-    html_path.write_text(sanitized, encoding="utf-8")
-    update_manifest(manifest, url, html_path)
+    validators = {
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+        "source_sha256": sha256(resp.content).hexdigest(),
+    }
+    if previous and previous.get("source_sha256") == validators["source_sha256"]:
+        _mark_checked(manifest, url, previous, **validators)
+        return UNCHANGED
+
+    data = sanitize(resp.text).encode("utf-8")
+    digest = sha256(data).hexdigest()
+    if previous and previous.get("sha256") == digest:
+        _mark_checked(manifest, url, previous, **validators)
+        return UNCHANGED
+    validators.update(_write_page(output_dir, html_path, data, digest, store))
+    update_manifest(manifest, url, html_path, digest, **validators)
+    if index is not None:
+        rel = html_path.relative_to(output_dir).as_posix()
+        index.add(rel, url, domain, data.decode("utf-8"), digest)
+    return CHANGED
+
+
+class _Resources(NamedTuple):
+    session: requests.Session
+    limiter: DomainLimiter
+    sanitize: Callable[[str], str]
+    store: BlobStore | None
+    index: SearchIndex | None
+
+
+@contextmanager
+def _fetch_resources(
+    output_dir: Path,
+    concurrency: int,
+    per_domain: int,
+    retries: int,
+    backend: str,
+    sanitize_workers: int,
+    dedup: bool,
+    index: bool,
+) -> Iterator[_Resources]:
+    """Set up the session, limits, sanitizer pool and stores shared by a run."""
+    session = make_session(pool_size=max(concurrency, 1), retries=retries)
+    store = BlobStore(output_dir) if dedup else None
+    search = SearchIndex(output_dir / INDEX_NAME) if index else None
+    sanitizer_pool = ProcessPoolExecutor(sanitize_workers) if sanitize_workers > 0 else None
+
+    def sanitize(html: str) -> str:
+        if sanitizer_pool is None:
+            return sanitize_html(html, backend)
+        return sanitizer_pool.submit(sanitize_html, html, backend).result()
+
+    try:
+        with session:
+            yield _Resources(session, DomainLimiter(per_domain), sanitize, store, search)
+    finally:
+        if sanitizer_pool is not None:
+            sanitizer_pool.shutdown()
+        if search is not None:
+            search.close()
+
+
+def fetch_all(
+    urls: list[str],
+    output_dir: Path,
+    manifest: ManifestStore,
+    concurrency: int = 1,
+    per_domain: int = 2,
+    retries: int = 3,
+    backend: str = "html.parser",
+    sanitize_workers: int = 0,
+    incremental: bool = False,
+    dedup: bool = False,
+    index: bool = False,
+) -> list[FetchResult]:
+    """Fetch ``urls`` on a thread pool sharing one pooled session.
+
+    At most ``per_domain`` requests to the same host are in flight at once.
+    With ``sanitize_workers`` > 0, HTML sanitization runs in a process pool so
+    parsing large pages does not hold up the download threads.
+    Failures are collected in the returned results instead of aborting the run.
+    """
+    with _fetch_resources(
+        output_dir, concurrency, per_domain, retries, backend, sanitize_workers, dedup, index
+    ) as res:
+
+        def run(url: str) -> FetchResult:
+            with res.limiter.slot(url_domain(url)):
+                start = time.perf_counter()
+                try:
+                    status = fetch_site(
+                        url,
+                        output_dir,
+                        manifest,
+                        session=res.session,
+                        sanitize=res.sanitize,
+                        incremental=incremental,
+                        store=res.store,
+                        index=res.index,
+                    )
+                except Exception as exc:  # reported per URL, keep going
+                    return FetchResult(url, time.perf_counter() - start, FAILED, exc)
+                return FetchResult(url, time.perf_counter() - start, status)
+
+        with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool:
+            futures = [pool.submit(run, url) for url in urls]
+            return [future.result() for future in as_completed(futures)]
+
+
+def crawl_page(
+    url: str,
+    output_dir: Path,
+    manifest: ManifestStore,
+    session: requests.Session,
+    sanitize: Callable[[str], str] = sanitize_html,
+    store: BlobStore | None = None,
+    index: SearchIndex | None = None,
+) -> list[str]:
+    """Store ``url`` at its ``local_path`` and return the same-domain links in it.
+
+    HTML is sanitized and its links rewritten to the local copies; other
+    content types are stored as received.
+    """
+    resp = session.get(url, timeout=10)
+    resp.raise_for_status()
+    domain = url_domain(url)
+    dest = output_dir / "pages" / domain / local_path(url)
+    is_html = "html" in resp.headers.get("Content-Type", "text/html")
+    links: list[str] = []
+    if is_html:
+        # Relative links resolve against the final URL after redirects.
+        html, links = rewrite_links(sanitize(resp.text), resp.url or url)
+        data = html.encode("utf-8")
+    else:
+        data = resp.content
+    digest = sha256(data).hexdigest()
+    extra = _write_page(output_dir, dest, data, digest, store)
+    update_manifest(manifest, url, dest, digest, **extra)
+    if index is not None and is_html:
+        index.add(dest.relative_to(output_dir).as_posix(), url, domain, html, digest)
+    return links
+
+
+class CrawlSummary(NamedTuple):
+    counts: dict[str, int]
+    failed: list[FetchResult]
+    resumed: int
+
+
+def crawl(
+    seeds: list[str],
+    output_dir: Path,
+    manifest: ManifestStore,
+    depth: int = 1,
+    max_pages: int = 1000,
+    concurrency: int = 1,
+    per_domain: int = 2,
+    retries: int = 3,
+    backend: str = "html.parser",
+    sanitize_workers: int = 0,
+    dedup: bool = False,
+    index: bool = False,
+) -> CrawlSummary:
+    """Crawl same-domain links from ``seeds`` up to ``depth`` hops away.
+
+    At most ``max_pages`` URLs are admitted to the frontier in total. Progress
+    is journaled to ``metadata/crawl.jsonl``; running the same command after an
+    interrupt continues where it stopped. Only counts and failures are kept,
+    so memory does not grow with the number of pages stored.
+    """
+    frontier = Frontier(max_pages)
+    journal = CrawlJournal(output_dir / "metadata" / CRAWL_JOURNAL)
+    resumed = journal.replay(frontier)
+    if not resumed and not len(frontier):
+        for seed in seeds:
+            url = normalize_url(seed)
+            if url and frontier.add(url, 0):
+                journal.discovered(url, 0)
+    counts = {CHANGED: 0, FAILED: 0}
+    failed: list[FetchResult] = []
+
+    with _fetch_resources(
+        output_dir, concurrency, per_domain, retries, backend, sanitize_workers, dedup, index
+    ) as res:
+
+        def run(url: str) -> tuple[FetchResult, list[str]]:
+            with res.limiter.slot(url_domain(url)):
+                start = time.perf_counter()
+                try:
+                    links = crawl_page(
+                        url, output_dir, manifest, res.session, res.sanitize, res.store, res.index
+                    )
+                except Exception as exc:  # reported per URL, retried on resume
+                    return FetchResult(url, time.perf_counter() - start, FAILED, exc), []
+                return FetchResult(url, time.perf_counter() - start), links
+
+        workers = max(concurrency, 1)
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                in_flight: dict = {}
+                while frontier or in_flight:
+                    # Keep a small window in flight so the frontier, not the
+                    # executor queue, holds the backlog.
+                    while frontier and len(in_flight) < workers * 2:
+                        url, hops = frontier.pop()
+                        in_flight[pool.submit(run, url)] = hops
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        hops = in_flight.pop(future)
+                        result, links = future.result()
+                        counts[result.status] += 1
+                        if result.status == FAILED:
+                            failed.append(result)
+                            continue
+                        if hops < depth:
+                            for link in links:
+                                if frontier.add(link, hops + 1):
+                                    journal.discovered(link, hops + 1)
+                        journal.done(result.url)
+        finally:
+            journal.close()
+    if not failed:
+        journal.finish()
+    return CrawlSummary(counts, failed, resumed)
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Fetch whitelisted sites")
     parser.add_argument("--sites", required=True, help="Path to file listing allowed URLs")
     parser.add_argument("--output", default="repository", help="Repository directory")
+    parser.add_argument(
+        "--concurrency", type=int, default=1, help="Number of parallel fetches"
+    )
+    parser.add_argument(
+        "--per-domain", type=int, default=2, help="Max in-flight requests per domain"
+    )
+    parser.add_argument(
+        "--retries", type=int, default=3, help="Retries with backoff for failed requests"
+    )
+    parser.add_argument(
+        "--parser",
+        choices=BACKENDS,
+        default="html.parser",
+        help="HTML sanitizer backend",
+    )
+    parser.add_argument(
+        "--sanitize-workers",
+        type=int,
+        default=0,
+        help="Processes for HTML sanitization (0 = sanitize in the fetch threads)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Send conditional requests and skip pages that have not changed",
+    )
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Store page bodies once in objects/ and hard-link them into pages/",
+    )
+    parser.add_argument(
+        "--index",
+        action="store_true",
+        help=f"Add changed pages to the full-text search index ({INDEX_NAME})",
+    )
+    parser.add_argument(
+        "--depth",
+        type=int,
+        default=0,
+        help="Follow same-domain links this many hops from each site (0 = front page only)",
+    )
+    parser.add_argument(
+        "--max-pages",
+        type=int,
+        default=1000,
+        help="Most URLs a crawl will store (with --depth)",
+    )
     args = parser.parse_args()
 
     sites_path = Path(args.sites)
     output_dir = Path(args.output)
     output_dir.mkdir(parents=True, exist_ok=True)
-    manifest = output_dir / "manifest.json"
+    if args.depth > 0:
+        if args.incremental:
+            parser.error("--incremental cannot be combined with --depth")
+        with ManifestStore(output_dir / "manifest.json") as manifest:
+            try:
+                summary = crawl(
+                    read_sites(sites_path),
+                    output_dir,
+                    manifest,
+                    depth=args.depth,
+                    max_pages=args.max_pages,
+                    concurrency=args.concurrency,
+                    per_domain=args.per_domain,
+                    retries=args.retries,
+                    backend=args.parser,
+                    sanitize_workers=args.sanitize_workers,
+                    dedup=args.dedup,
+                    index=args.index,
+                )
+            except KeyboardInterrupt:
+                raise SystemExit(
+                    f"Interrupted; run the same command again to resume (metadata/{CRAWL_JOURNAL})"
+                )
+        for result in summary.failed:
+            print(f"Failed {result.url}: {result.error}")
+        if summary.resumed:
+            print(f"Resumed crawl with {summary.resumed} pages already stored")
+        print(f"Crawled sites from {sites_path} into {output_dir}")
+        print(", ".join(f"{count} {status}" for status, count in summary.counts.items()))
+        if summary.failed:
+            print(f"Run again to retry failed pages (progress kept in metadata/{CRAWL_JOURNAL})")
+            raise SystemExit(1)
+        return
 
-    for url in read_sites(sites_path):
-        fetch_site(url, output_dir, manifest)
+    with ManifestStore(output_dir / "manifest.json") as manifest:
+        results = fetch_all(
+            read_sites(sites_path),
+            output_dir,
+            manifest,
+            concurrency=args.concurrency,
+            per_domain=args.per_domain,
+            retries=args.retries,
+            backend=args.parser,
+            sanitize_workers=args.sanitize_workers,
+            incremental=args.incremental,
+            dedup=args.dedup,
+            index=args.index,
+        )
+    failed = [r for r in results if r.status == FAILED]
+    for result in failed:
+        print(f"Failed {result.url}: {result.error}")
 
     print(f"Fetched sites from {sites_path} into {output_dir}")
+    counts = {status: 0 for status in (CHANGED, UNCHANGED, FAILED)}
+    for result in results:
+        counts[result.status] += 1
+    print(", ".join(f"{count} {status}" for status, count in counts.items()))
+    if failed:
+        raise SystemExit(1)
 
 
 if __name__ == "__main__":
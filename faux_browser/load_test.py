@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""Load-test offline_server.py against a synthetic repository.
+
+Usage:
+    python load_test.py --pages 10000 --clients 32 --duration 10 -- --workers 16
+    python load_test.py --clients 32 -- --asyncio --workers 8
+    python load_test.py --pack --clients 32 -- --workers 16
+
+Arguments after ``--`` are passed to offline_server.py. A repository with
+``--pages`` pages spread over ``--domains`` domains is generated in a temporary
+directory along with a profile allowing every domain. Each client thread keeps
+one HTTP/1.1 connection open and requests random pages until ``--duration``
+elapses. Run with more clients than server workers: besides the totals, the
+report shows responses per client and each client's first-response latency,
+so connections that get starved behind others show up. With ``--pack`` the
+repository is packed with pack.py and served with ``offline_server.py --pack``.
+The report lists server startup time, requests/sec, p50/p95/p99 latency,
+per-client counts, and status codes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from pack import build_pack
+
+PAGE = "<html><body><h1>Page {n}</h1>" + "<p>Synthetic content.</p>" * 40 + "</body></html>"
+
+
+def build_repository(root: Path, pages: int, domains: int) -> list[str]:
+    """Write a synthetic repository and return the URL paths it contains."""
+    paths = []
+    for n in range(pages):
+        domain = f"site{n % domains}.test"
+        dest = root / "pages" / domain
+        dest.mkdir(parents=True, exist_ok=True)
+        (dest / f"page{n}.html").write_text(PAGE.format(n=n), encoding="utf-8")
+        paths.append(f"/pages/{domain}/page{n}.html")
+    profile = {"allowed_domains": [f"site{d}.test" for d in range(domains)]}
+    (root / "profile.json").write_text(json.dumps(profile))
+    return paths
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("localhost", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise SystemExit(f"Server did not start on port {port}")
+
+
+def client(
+    port: int,
+    paths: list[str],
+    stop_at: float,
+    latencies: list[float],
+    codes: Counter,
+    per_client: list[tuple[int, float | None]],
+) -> None:
+    started = time.perf_counter()
+    first = None
+    conn = http.client.HTTPConnection("localhost", port, timeout=30)
+    rng = random.Random()
+    local_latencies = []
+    local_codes = Counter()
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        try:
+            conn.request("GET", rng.choice(paths))
+            resp = conn.getresponse()
+            resp.read()
+        except (OSError, http.client.HTTPException):
+            local_codes["error"] += 1
+            conn.close()
+            conn = http.client.HTTPConnection("localhost", port, timeout=30)
+            continue
+        local_latencies.append(time.perf_counter() - start)
+        if first is None:
+            first = time.perf_counter() - started
+        local_codes[resp.status] += 1
+        if resp.will_close:
+            conn.close()
+            conn = http.client.HTTPConnection("localhost", port, timeout=30)
+    conn.close()
+    latencies.extend(local_latencies)
+    codes.update(local_codes)
+    per_client.append((len(local_latencies), first))
+
+
+def percentile(ordered: list[float], pct: float) -> float:
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main() -> None:
+    argv = sys.argv[1:]
+    server_args = []
+    if "--" in argv:
+        idx = argv.index("--")
+        argv, server_args = argv[:idx], argv[idx + 1:]
+    parser = argparse.ArgumentParser(description="Load-test the offline server")
+    parser.add_argument("--pages", type=int, default=10000, help="Synthetic pages to generate")
+    parser.add_argument("--domains", type=int, default=100, help="Synthetic domains")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent client connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="Test length in seconds")
+    parser.add_argument("--pack", action="store_true", help="Serve the repository from a pack file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        paths = build_repository(root, args.pages, args.domains)
+        if args.pack:
+            build_pack(root, root / "repository.pack")
+            server_args = ["--pack", str(root / "repository.pack"), *server_args]
+        port = free_port()
+        launched = time.perf_counter()
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                str(Path(__file__).with_name("offline_server.py")),
+                "--repo", str(root),
+                "--port", str(port),
+                "--profile", str(root / "profile.json"),
+                *server_args,
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_for_port(port)
+            startup = time.perf_counter() - launched
+            latencies: list[float] = []
+            codes: Counter = Counter()
+            per_client: list[tuple[int, float | None]] = []
+            stop_at = time.perf_counter() + args.duration
+            threads = [
+                threading.Thread(target=client, args=(port, paths, stop_at, latencies, codes, per_client))
+                for _ in range(args.clients)
+            ]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            wall = time.perf_counter() - start
+        finally:
+            server.terminate()
+            server.wait()
+
+    latencies.sort()
+    print(f"server args: {' '.join(server_args) or '(default)'}")
+    print(f"startup:     {startup:.2f}s")
+    print(f"requests:    {len(latencies)} in {wall:.1f}s")
+    print(f"throughput:  {len(latencies) / wall:.1f} req/sec")
+    if latencies:
+        for pct in (50, 95, 99):
+            print(f"latency p{pct}: {percentile(latencies, pct) * 1000:.1f} ms")
+    counts = sorted(count for count, _ in per_client)
+    print(f"per client:  min {counts[0]} / median {counts[len(counts) // 2]} / max {counts[-1]} responses")
+    firsts = sorted(first for _, first in per_client if first is not None)
+    if firsts:
+        print(f"first response: p50 {percentile(firsts, 50) * 1000:.1f} ms, max {firsts[-1] * 1000:.1f} ms")
+    if len(firsts) < len(per_client):
+        print(f"no response:  {len(per_client) - len(firsts)} clients")
+    print(f"status:      {dict(codes)}")
+
+
+if __name__ == "__main__":
+    main()
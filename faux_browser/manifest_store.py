@@ -0,0 +1,153 @@
+"""Crash-safe, batched storage for ``manifest.json``.
+
+Entries are appended to ``manifest.journal`` (one JSON object per line) as soon
+as they are recorded, and the journal is periodically compacted into
+``manifest.json`` with a write-to-temp-then-rename. A process killed at any
+point leaves either the old or the new ``manifest.json`` on disk plus a journal
+that is replayed on the next open, so no recorded entry is lost.
+
+Only ``manifest.json`` is fsynced. Page and screenshot files are written
+without it, so after a system crash an entry replayed from the journal may
+point at a file that never reached the disk; ``ManifestStore`` checks those
+files against their recorded hashes on open and forgets entries that do not
+match, so the next fetch downloads them again.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from hashlib import sha256
+from pathlib import Path
+
+
+def atomic_write_bytes(path: Path, data: bytes, fsync: bool = False) -> None:
+    """Write ``data`` to ``path`` via a temporary file and ``os.replace``.
+
+    With ``fsync`` the data is on disk before the rename, which survives a
+    system crash rather than only a crash of this process.
+    """
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with tmp.open("wb") as fh:
+        fh.write(data)
+        if fsync:
+            fh.flush()
+            os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+def file_hash(path: Path) -> str:
+    h = sha256()
+    with path.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_manifest(manifest: Path) -> dict[str, dict]:
+    """Return manifest entries including any not yet compacted from the journal."""
+    data: dict[str, dict] = {}
+    if manifest.exists():
+        data = json.loads(manifest.read_text())
+    data.update(read_journal(journal_path(manifest)))
+    return data
+
+
+def read_journal(journal: Path) -> dict[str, dict]:
+    """Return the entries recorded in ``journal`` since the last compaction."""
+    data: dict[str, dict] = {}
+    if journal.exists():
+        with journal.open("r", encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # torn final line from an interrupted append
+                data[record["url"]] = record["entry"]
+    return data
+
+
+def _intact(root: Path, record: dict) -> bool:
+    path = root / record["path"]
+    return path.is_file() and file_hash(path) == record["sha256"]
+
+
+def index_by_path(entries: dict[str, dict]) -> dict[str, dict]:
+    """Map each entry's repository-relative POSIX path to the entry."""
+    return {Path(entry["path"]).as_posix(): entry for entry in entries.values() if "path" in entry}
+
+
+def journal_path(manifest: Path) -> Path:
+    return manifest.with_suffix(".journal")
+
+
+class ManifestStore:
+    """In-memory manifest backed by an append-only journal.
+
+    ``set`` costs one journal append. ``manifest.json`` is rewritten once the
+    journal holds at least ``batch_size`` entries and at least as many entries
+    as the manifest itself, so the total rewrite cost stays linear in the
+    number of URLs fetched. Call ``close`` (or use as a context manager) to
+    compact whatever is left.
+    """
+
+    def __init__(self, manifest: Path, batch_size: int = 500):
+        self.path = manifest
+        self.batch_size = batch_size
+        self.entries = load_manifest(manifest)
+        self._journal_path = journal_path(manifest)
+        self._lock = threading.Lock()
+        self._pending = 0
+        if self._journal_path.exists():
+            self._drop_lost_files(read_journal(self._journal_path))
+            self._write_manifest()
+            self._journal_path.unlink()
+        self._journal = self._journal_path.open("a", encoding="utf-8")
+
+    def get(self, url: str) -> dict | None:
+        return self.entries.get(url)
+
+    def set(self, url: str, entry: dict) -> None:
+        line = json.dumps({"url": url, "entry": entry}) + "\n"
+        with self._lock:
+            self.entries[url] = entry
+            self._journal.write(line)
+            self._journal.flush()
+            self._pending += 1
+            if self._pending >= max(self.batch_size, len(self.entries)):
+                self._compact()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._pending:
+                self._compact()
+
+    def close(self) -> None:
+        self.flush()
+        self._journal.close()
+
+    def __enter__(self) -> "ManifestStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _drop_lost_files(self, journaled: dict[str, dict]) -> None:
+        """Forget journaled entries whose files did not survive a crash."""
+        root = self.path.parent
+        for url, entry in journaled.items():
+            if "path" in entry and "sha256" in entry and not _intact(root, entry):
+                del self.entries[url]
+            elif "screenshot" in entry and not _intact(root, entry["screenshot"]):
+                self.entries[url] = {k: v for k, v in entry.items() if k != "screenshot"}
+
+    def _write_manifest(self) -> None:
+        atomic_write_bytes(self.path, json.dumps(self.entries, indent=2).encode("utf-8"), fsync=True)
+
+    def _compact(self) -> None:
+        self._write_manifest()
+        # Only drop the journal once the compacted manifest is durable.
+        self._journal.truncate(0)
+        self._journal.seek(0)
+        self._pending = 0
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Content-addressed blob store for the local repository.
+
+Each unique file body is stored once as ``objects/<first 2 hex>/<rest of
+SHA-256>`` and ``pages/<domain>/...`` paths are hard links to it. Where a hard
+link cannot be created (e.g. the filesystem does not support them), the page
+path is left out and the manifest entry's ``object`` field points the offline
+server at the blob instead.
+
+Usage:
+    python objects.py gc --repo repository [--dry-run]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import threading
+from pathlib import Path
+
+from manifest_store import atomic_write_bytes, load_manifest
+
+OBJECTS_DIR = "objects"
+
+
+class BlobStore:
+    def __init__(self, root: Path):
+        self.root = root
+        self.objects = root / OBJECTS_DIR
+
+    def blob_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest[2:]
+
+    def put(self, data: bytes, digest: str) -> Path:
+        """Store ``data`` under ``digest`` unless an identical blob exists."""
+        blob = self.blob_path(digest)
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_bytes(blob, data)
+            # Blobs are shared by every page linked to them; never edit in place.
+            blob.chmod(0o444)
+        return blob
+
+    def link(self, blob: Path, dest: Path) -> bool:
+        """Point ``dest`` at ``blob`` with a hard link, replacing any old file.
+
+        Returns False (and removes ``dest``) if the link cannot be made, in
+        which case readers resolve the page through the manifest.
+        """
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.link")
+        try:
+            os.link(blob, tmp)
+            os.replace(tmp, dest)
+            return True
+        except OSError:
+            tmp.unlink(missing_ok=True)
+            dest.unlink(missing_ok=True)
+            return False
+
+    def referenced(self, manifest: dict[str, dict]) -> set[Path]:
+        refs = set()
+        for entry in manifest.values():
+            if entry.get("object"):
+                refs.add(self.root / entry["object"])
+        return refs
+
+    def gc(self, manifest: dict[str, dict], dry_run: bool = False) -> tuple[int, int]:
+        """Delete blobs no manifest entry refers to; return (count, bytes)."""
+        keep = self.referenced(manifest)
+        removed = freed = 0
+        if not self.objects.exists():
+            return removed, freed
+        for blob in self.objects.glob("??/*"):
+            if blob in keep or blob.name.startswith("."):
+                continue
+            removed += 1
+            freed += blob.stat().st_size
+            if not dry_run:
+                blob.unlink()
+        if not dry_run:
+            for bucket in self.objects.iterdir():
+                if bucket.is_dir() and not any(bucket.iterdir()):
+                    bucket.rmdir()
+        return removed, freed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage the repository object store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    gc_parser = sub.add_parser("gc", help="Remove blobs not referenced by manifest.json")
+    gc_parser.add_argument("--repo", default="repository", help="Repository directory")
+    gc_parser.add_argument("--dry-run", action="store_true", help="Only report what would be removed")
+    args = parser.parse_args()
+
+    repo = Path(args.repo)
+    manifest_path = repo / "manifest.json"
+    if not manifest_path.exists():
+        raise SystemExit(f"{manifest_path} not found; refusing to collect every blob")
+    manifest = load_manifest(manifest_path)
+    removed, freed = BlobStore(repo).gc(manifest, dry_run=args.dry_run)
+    verb = "Would remove" if args.dry_run else "Removed"
+    print(f"{verb} {removed} unreferenced blobs ({freed / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,96 +1,392 @@
 #!/usr/bin/env python3
 """Offline HTTP server that serves cached pages and placeholder messages."""
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer, SimpleHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
 from datetime import datetime, timezone
+from hashlib import sha256
 import argparse
+import asyncio
+import html
+import io
 import json
 import os
-from hashlib import sha256
+import signal
+import threading
+
+from access_log import BufferedLog
+from domain_policy import ALLOW, BLOCK, DENY, SOFT_ALLOW, DomainPolicy
+from manifest_store import file_hash, index_by_path, load_manifest
+from objects import OBJECTS_DIR
+from pack import Pack
+from page_cache import PageCache
+from search_index import INDEX_NAME, SearchIndex
+
+CACHE_STATS_PATH = "/_cache/stats"
+SEARCH_PATH = "/search"
+MAX_SEARCH_RESULTS = 100
+# Returned by OfflineHandler._locate for directories without a cached index page;
+# SimpleHTTPRequestHandler then redirects or lists them.
+DIRECTORY = object()
 
 
 class OfflineHandler(SimpleHTTPRequestHandler):
     """Serve files from repo and inject a placeholder when missing."""
 
+    # Every response carries a Content-Length so the concurrent server modes can
+    # switch to HTTP/1.1 keep-alive. Idle connections close after ``timeout``.
+    timeout = 15
+    disable_nagle_algorithm = True
     placeholder = (
         "<html><body><h1>Content unavailable</h1>"
         "<p>No cached copy for {path}</p></body></html>"
     )
-    log_path: Path
-    allowed_domains: set[str]
-    soft_allow_domains: set[str]
-    blocked_domains: set[str]
-    approval_log_path: Path
-    manifest: dict[str, dict]
+    access_log: BufferedLog
+    policy: DomainPolicy
+    approval_log: BufferedLog
+    repo_root: Path
+    # Manifest entries keyed by repository-relative path, built once at startup.
+    manifest_paths: dict[str, dict]
+    verify: bool = False
     session_limit: int | None
     session_start: datetime
+    # Digests of files already hashed, keyed on (inode, size, mtime_ns) so an
+    # unchanged file is read once per process rather than on every request.
+    hash_cache: dict[tuple[int, int, int], str] = {}
+    page_cache: PageCache | None = None
+    pack: Pack | None = None
+    # Pack digests already checked by --verify.
+    pack_verified: set[str] = set()
+    search_index: SearchIndex | None = None
+    # Files inside the served tree that must never be sent, such as the search
+    # index, which holds the text of pages from every domain.
+    private_files: frozenset[Path] = frozenset()
+    search_page = (
+        "<html><head><title>Search: {query}</title></head><body>"
+        "<form action=\"{action}\"><input name=\"q\" value=\"{query}\"></form>"
+        "<ol>{results}</ol></body></html>"
+    )
+
+    def _file_digest(self, file_path: Path) -> str:
+        st = file_path.stat()
+        key = (st.st_ino, st.st_size, st.st_mtime_ns)
+        digest = self.hash_cache.get(key)
+        if digest is None:
+            digest = self.hash_cache[key] = file_hash(file_path)
+        return digest
 
-    def _verify_hash(self, file_path: Path) -> bool:
-        rel = str(file_path.relative_to(Path.cwd()))
-        entry = self.manifest.get(rel)
-        if not entry:
+    def _manifest_entry(self, file_path: Path) -> dict | None:
+        try:
+            rel = file_path.relative_to(self.repo_root).as_posix()
+        except ValueError:
+            return None
+        return self.manifest_paths.get(rel)
+
+    def _verify_hash(self, file_path: Path, entry: dict | None) -> bool:
+        if not self.verify or not entry:
             return True
-        h = sha256()
-        with file_path.open('rb') as fh:
-            for chunk in iter(lambda: fh.read(8192), b''):
-                h.update(chunk)
-        return h.hexdigest() == entry.get('sha256')
+        return self._file_digest(file_path) == entry.get('sha256')
 
     def _log_access(self) -> None:
         timestamp = datetime.now(timezone.utc).isoformat()
-        with self.log_path.open("a", encoding="utf-8") as log:
-            log.write(f"{timestamp} {self.path}\n")
+        self.access_log.write(f"{timestamp} {self.path}\n")
 
     def _log_approval_request(self) -> None:
         timestamp = datetime.now(timezone.utc).isoformat()
-        with self.approval_log_path.open("a", encoding="utf-8") as log:
-            log.write(f"{timestamp} {self.path}\n")
+        self.approval_log.write(f"{timestamp} {self.path}\n")
+
+    def _etag_matches(self, etag: str) -> bool:
+        header = self.headers.get("If-None-Match")
+        if not header:
+            return False
+        if header.strip() == "*":
+            return True
+        return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+    def _load_page(self, file_path: Path, stat_key: tuple[int, int, int], content_type: str):
+        """Return the cached page for ``file_path``, reading it on a miss."""
+        page = self.page_cache.get(str(file_path), stat_key)
+        if page is None and stat_key[1] <= self.page_cache.max_file_bytes:
+            body = file_path.read_bytes()
+            digest = self.hash_cache[stat_key] = sha256(body).hexdigest()
+            page = self.page_cache.build(
+                stat_key,
+                f'"{digest}"',
+                content_type,
+                body,
+            )
+            self.page_cache.put(str(file_path), page)
+        return page
+
+    def _locate_file(self, fs_path: Path):
+        """Return (file to send, manifest entry) for ``fs_path`` or None.
+
+        Pages stored only in the object store are resolved through the
+        manifest's ``object`` field.
+        """
+        entry = self._manifest_entry(fs_path)
+        if fs_path.is_file():
+            return fs_path, entry
+        if entry and entry.get("object"):
+            blob = self.repo_root / entry["object"]
+            if blob.is_file():
+                return blob, entry
+        return None
+
+    def _locate(self, fs_path: Path):
+        if fs_path.is_dir():
+            if not self.path.split("?", 1)[0].endswith("/"):
+                return DIRECTORY
+            for name in ("index.html", "index.htm"):
+                located = self._locate_file(fs_path / name)
+                if located:
+                    return (*located, fs_path / name)
+            return DIRECTORY
+        located = self._locate_file(fs_path)
+        return (*located, fs_path) if located else None
+
+    def _serve_file(self, file_path: Path, entry: dict | None, logical_path: Path) -> None:
+        st = file_path.stat()
+        stat_key = (st.st_ino, st.st_size, st.st_mtime_ns)
+        content_type = self.guess_type(str(logical_path))
+        page = self._load_page(file_path, stat_key, content_type) if self.page_cache else None
+        if not self._verify_hash(file_path, entry):
+            self._send_body(500, b"Checksum mismatch")
+            return
+        if entry and entry.get("sha256"):
+            etag = f'"{entry["sha256"]}"'
+        else:
+            etag = page.etag if page else f'"{self._file_digest(file_path)}"'
+        if self._etag_matches(etag):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        body = page.body if page else None
+        self.send_response(200)
+        self.send_header("Content-type", content_type)
+        if page and page.gzipped is not None:
+            self.send_header("Vary", "Accept-Encoding")
+            if "gzip" in self.headers.get("Accept-Encoding", ""):
+                body = page.gzipped
+                self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body) if page else st.st_size))
+        self.send_header("Last-Modified", self.date_time_string(st.st_mtime))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if page:
+            self.wfile.write(body)
+        else:
+            with file_path.open("rb") as fh:
+                self.copyfile(fh, self.wfile)
+
+    def _serve_from_pack(self, fs_path: str) -> None:
+        """Serve a request straight from the memory-mapped pack."""
+        url_path = self.path.split("?", 1)[0]
+        try:
+            rel = Path(fs_path).relative_to(self.repo_root).as_posix()
+        except ValueError:
+            rel = None
+        if rel == ".":
+            rel = ""
+        if rel in self.pack.dirs:
+            if not url_path.endswith("/"):
+                self.send_response(301)
+                self.send_header("Location", url_path + "/")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            rel = f"{rel}/index.html" if rel else "index.html"
+        found = self.pack.get(rel) if rel is not None else None
+        if found is None:
+            self._send_placeholder()
+            return
+        view, digest = found
+        if self.verify and digest not in self.pack_verified:
+            if sha256(view).hexdigest() != digest:
+                self._send_body(500, b"Checksum mismatch")
+                return
+            self.pack_verified.add(digest)
+        etag = f'"{digest}"'
+        if self._etag_matches(etag):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-type", self.guess_type(rel))
+        self.send_header("Content-Length", str(len(view)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(view)
+
+    def _send_search(self, query_string: str) -> None:
+        if self.search_index is None:
+            self._send_body(404, b"Search index not available")
+            return
+        params = parse_qs(query_string)
+        query = params.get("q", [""])[0]
+        try:
+            limit = min(int(params.get("n", ["20"])[0]), MAX_SEARCH_RESULTS)
+        except ValueError:
+            limit = 20
+        # Only domains the profile allows outright are listed, so results
+        # never reveal blocked or approval-only pages.
+        hits = self.search_index.search(
+            query, limit, allow=lambda domain: self.policy.verdict(domain) == ALLOW
+        )
+        results = "".join(
+            f"<li><a href=\"/{html.escape(hit.path)}\">{html.escape(hit.title or hit.url)}</a>"
+            f"<p>{html.escape(hit.snippet)}</p></li>"
+            for hit in hits
+        )
+        page = self.search_page.format(
+            query=html.escape(query), action=SEARCH_PATH, results=results
+        )
+        self._send_body(200, page.encode("utf-8"), "text/html; charset=utf-8")
+
+    def _send_placeholder(self) -> None:
+        msg = self.placeholder.format(path=self.path)
+        self._send_body(200, msg.encode("utf-8"), "text/html; charset=utf-8")
+
+    def _send_body(
+        self, code: int, body: bytes, content_type: str = "text/plain; charset=utf-8"
+    ) -> None:
+        self.send_response(code)
+        self.send_header("Content-type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
 
     def do_GET(self):
+        # PooledHTTPServer bounds how many requests are handled at once; the
+        # slot is taken only after the request line arrived, so idle
+        # keep-alive connections never hold one.
+        slots = getattr(self.server, "request_slots", None)
+        if slots is None:
+            self._handle_get()
+        else:
+            with slots:
+                self._handle_get()
+
+    def _handle_get(self):
         if self.session_limit is not None:
             now = datetime.now(timezone.utc)
             elapsed = (now - self.session_start).total_seconds() / 60
             if elapsed > self.session_limit:
-                self.send_response(403)
-                self.end_headers()
-                self.wfile.write(b"Time limit exceeded")
+                self._send_body(403, b"Time limit exceeded")
                 self._log_access()
                 return
+        if not self.path.startswith("/"):
+            self._send_body(400, b"Bad request path")
+            self._log_access()
+            return
         path = self.translate_path(self.path)
-        domain = (
-            Path(self.path).parts[1]
-            if self.path.startswith('/pages/') and len(Path(self.path).parts) > 1
-            else ''
-        )
-        if domain in self.blocked_domains:
-            self.send_response(403)
-            self.end_headers()
-            self.wfile.write(b"Blocked domain")
-        elif domain and domain not in self.allowed_domains:
-            self.send_response(403)
-            self.end_headers()
-            if domain in self.soft_allow_domains:
-                self.wfile.write(b"Approval required")
-                self._log_approval_request()
-            else:
-                self.wfile.write(b"Access denied")
-        elif Path(path).exists():
-            file_ok = self._verify_hash(Path(path))
-            if not file_ok:
-                self.send_response(500)
-                self.end_headers()
-                self.wfile.write(b"Checksum mismatch")
-            else:
-                super().do_GET()
+        # Repository-relative parts of the unquoted, normalized path, so that
+        # /./pages/... or /%70ages/... get the same checks as /pages/...
+        # pages/<domain>/... -> ('pages', '<domain>', ...)
+        relative = Path(path).relative_to(self.directory).parts
+        domain = relative[1] if len(relative) > 1 and relative[0] == "pages" else ""
+        verdict = self.policy.verdict(domain) if domain else None
+        url = urlsplit(self.path)
+        if self.path == CACHE_STATS_PATH:
+            stats = self.page_cache.stats() if self.page_cache else {}
+            self._send_body(200, json.dumps(stats).encode("utf-8"), "application/json")
+        elif url.path == SEARCH_PATH:
+            self._send_search(url.query)
+        elif verdict == BLOCK:
+            self._send_body(403, b"Blocked domain")
+        elif verdict == SOFT_ALLOW:
+            self._send_body(403, b"Approval required")
+            self._log_approval_request()
+        elif verdict == DENY or relative[:1] == (OBJECTS_DIR,) or Path(path) in self.private_files:
+            # Blobs are only reachable through their page paths, and the search
+            # index not at all, so profile rules cannot be bypassed by
+            # requesting objects/ or the index file directly.
+            self._send_body(403, b"Access denied")
+        elif self.pack is not None:
+            self._serve_from_pack(path)
+        elif (target := self._locate(Path(path))) is DIRECTORY:
+            super().do_GET()
+        elif target is not None:
+            self._serve_file(*target)
         else:
-            self.send_response(200)
-            self.send_header("Content-type", "text/html; charset=utf-8")
-            self.end_headers()
-            msg = self.placeholder.format(path=self.path)
-            self.wfile.write(msg.encode("utf-8"))
+            self._send_placeholder()
         self._log_access()
 
 
+class PooledHTTPServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer that caps how many requests are handled at once.
+
+    Every connection gets its own thread, so a keep-alive client waiting on
+    its socket never blocks others; ``workers`` bounds the requests being
+    processed concurrently.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, server_address, handler_class, workers: int):
+        super().__init__(server_address, handler_class)
+        self.request_slots = threading.BoundedSemaphore(workers)
+
+
+class BufferedOfflineHandler(OfflineHandler):
+    """Run one OfflineHandler request against in-memory buffers.
+
+    Used by the asyncio server: the event loop reads the request head, a
+    worker thread runs the unchanged handler policy, and the loop writes the
+    buffered response back to the client.
+    """
+
+    def __init__(self, raw_request: bytes, client_address):
+        self.raw_request = raw_request
+        super().__init__(None, client_address, None)
+
+    def setup(self):
+        self.rfile = io.BytesIO(self.raw_request)
+        self.wfile = io.BytesIO()
+
+    def handle(self):
+        self.handle_one_request()
+
+    def finish(self):
+        pass
+
+
+async def _serve_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    loop = asyncio.get_running_loop()
+    peer = writer.get_extra_info("peername")
+    try:
+        while True:
+            try:
+                head = await asyncio.wait_for(
+                    reader.readuntil(b"\r\n\r\n"), OfflineHandler.timeout
+                )
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, TimeoutError):
+                break
+            handler = await loop.run_in_executor(None, BufferedOfflineHandler, head, peer)
+            writer.write(handler.wfile.getvalue())
+            await writer.drain()
+            if handler.close_connection:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_async(host: str, port: int, workers: int) -> None:
+    """Serve with an asyncio event loop; file I/O runs on ``workers`` threads."""
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=workers))
+    server = await asyncio.start_server(_serve_connection, host, port)
+    async with server:
+        await server.serve_forever()
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Serve cached pages from repository")
     parser.add_argument("--repo", default="repository", help="Path to local repository")
@@ -101,44 +397,136 @@ def main() -> None:
         "--log-dir",
         help="Directory for server logs (default: REPO/metadata)",
     )
+    parser.add_argument(
+        "--log-max-bytes",
+        type=int,
+        default=0,
+        help="Rotate server_access.log once it reaches this size (0 = never)",
+    )
+    parser.add_argument(
+        "--log-backups",
+        type=int,
+        default=5,
+        help="Number of rotated access logs to keep",
+    )
+    parser.add_argument(
+        "--pack",
+        help="Serve from a pack file built by pack.py instead of the --repo directory",
+    )
+    parser.add_argument(
+        "--cache-mb",
+        type=float,
+        default=64,
+        help="Memory budget for the in-memory page cache in MiB (0 = disabled)",
+    )
+    parser.add_argument(
+        "--cache-max-file-kb",
+        type=int,
+        default=1024,
+        help="Largest file kept in the page cache, in KiB",
+    )
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="Keep gzip-compressed copies of cached text pages for clients that accept them",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Requests handled at once, each connection on its own thread (1 = single-threaded)",
+    )
+    parser.add_argument(
+        "--asyncio",
+        action="store_true",
+        help="Use an asyncio event loop for connections (file I/O on --workers threads)",
+    )
+    parser.add_argument(
+        "--search-db",
+        help=f"Search index for /search (default: REPO/{INDEX_NAME} if it exists)",
+    )
     args = parser.parse_args()
 
-    repo_path = Path(args.repo).resolve()
+    if args.pack:
+        # The pack replaces the repository directory; logs go next to it.
+        OfflineHandler.pack = Pack(Path(args.pack))
+        repo_path = Path(args.pack).resolve().parent
+    else:
+        repo_path = Path(args.repo).resolve()
     if not repo_path.exists():
         raise SystemExit(f"Repository path {repo_path} does not exist")
 
     log_dir = Path(args.log_dir).resolve() if args.log_dir else repo_path / "metadata"
     log_dir.mkdir(parents=True, exist_ok=True)
-    OfflineHandler.log_path = log_dir / "server_access.log"
-    OfflineHandler.approval_log_path = log_dir / "approval_requests.log"
+    OfflineHandler.access_log = BufferedLog(
+        log_dir / "server_access.log",
+        max_bytes=args.log_max_bytes,
+        backups=args.log_backups,
+    )
+    OfflineHandler.approval_log = BufferedLog(log_dir / "approval_requests.log")
 
     manifest_path = repo_path / "manifest.json"
-    if args.verify and manifest_path.exists():
-        OfflineHandler.manifest = json.loads(manifest_path.read_text())
-    else:
-        OfflineHandler.manifest = {}
+    manifest = load_manifest(manifest_path) if manifest_path.exists() and not args.pack else {}
+    OfflineHandler.manifest_paths = index_by_path(manifest)
+    OfflineHandler.repo_root = repo_path
+    OfflineHandler.verify = args.verify
 
     profile_path = Path(args.profile)
-    if profile_path.exists():
-        profile = json.loads(profile_path.read_text())
-        OfflineHandler.allowed_domains = set(profile.get("allowed_domains", []))
-        OfflineHandler.soft_allow_domains = set(profile.get("soft_allow_domains", []))
-        OfflineHandler.blocked_domains = set(profile.get("blocked_domains", []))
-        OfflineHandler.session_limit = profile.get("time_limit_minutes")
-    else:
-        OfflineHandler.allowed_domains = set()
-        OfflineHandler.soft_allow_domains = set()
-        OfflineHandler.blocked_domains = set()
-        OfflineHandler.session_limit = None
+    profile = json.loads(profile_path.read_text()) if profile_path.exists() else {}
+    OfflineHandler.policy = DomainPolicy.from_profile(profile)
+    OfflineHandler.session_limit = profile.get("time_limit_minutes")
     OfflineHandler.session_start = datetime.now(timezone.utc)
 
+    if args.cache_mb > 0 and not args.pack:
+        OfflineHandler.page_cache = PageCache(
+            max_bytes=int(args.cache_mb * 1024 * 1024),
+            max_file_bytes=args.cache_max_file_kb * 1024,
+            compress=args.gzip,
+        )
+
+    search_db = Path(args.search_db).resolve() if args.search_db else repo_path / INDEX_NAME
+    OfflineHandler.private_files = frozenset(
+        Path(f"{db}{suffix}")
+        for db in {search_db, repo_path / INDEX_NAME}
+        for suffix in ("", "-wal", "-shm", "-journal")
+    )
+    if search_db.exists():
+        OfflineHandler.search_index = SearchIndex(search_db, readonly=True)
+    elif args.search_db:
+        raise SystemExit(f"Search index {search_db} does not exist")
+
+    if args.asyncio or args.workers > 1:
+        OfflineHandler.protocol_version = "HTTP/1.1"
+
     os.chdir(repo_path)
-    httpd = HTTPServer(("localhost", args.port), OfflineHandler)
     print(f"Serving {repo_path} on http://localhost:{args.port}")
+    signal.signal(signal.SIGTERM, _interrupt)
     try:
-        httpd.serve_forever()
+        serve(args)
     except KeyboardInterrupt:
         print("Server stopped")
+    finally:
+        OfflineHandler.access_log.close()
+        OfflineHandler.approval_log.close()
+
+
+def _interrupt(signum, frame):
+    # Treat SIGTERM like Ctrl-C so queued log entries are drained on exit.
+    raise KeyboardInterrupt
+
+
+def serve(args: argparse.Namespace) -> None:
+    if args.asyncio:
+        asyncio.run(serve_async("localhost", args.port, max(args.workers, 1)))
+        return
+    if args.workers > 1:
+        httpd = PooledHTTPServer(("localhost", args.port), OfflineHandler, args.workers)
+    else:
+        httpd = HTTPServer(("localhost", args.port), OfflineHandler)
+    try:
+        httpd.serve_forever()
+    finally:
+        httpd.server_close()
 
 
 if __name__ == "__main__":
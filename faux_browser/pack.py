@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Single-file packed repository format.
+
+A pack holds every file under ``pages/`` plus an index in one file, so a
+repository can be copied as a single blob and served without an open/stat per
+request. Layout::
+
+    b"FBPACK01"                     magic (8 bytes)
+    index offset, index length      two little-endian uint64
+    file bodies                     concatenated, identical bodies stored once
+    index                           UTF-8 JSON: {"files": {path: [offset, length, sha256]}}
+
+Usage:
+    python pack.py --repo repository --out repository.pack
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import os
+import struct
+from hashlib import sha256
+from pathlib import Path
+
+from manifest_store import index_by_path, load_manifest
+
+MAGIC = b"FBPACK01"
+HEADER = struct.Struct("<8sQQ")
+
+
+def _repository_files(repo: Path, entries: dict[str, dict]) -> dict[str, Path]:
+    """Map repository-relative paths to the files holding their bodies."""
+    files = {}
+    pages = repo / "pages"
+    if pages.exists():
+        for path in sorted(pages.rglob("*")):
+            if path.is_file():
+                files[path.relative_to(repo).as_posix()] = path
+    # Pages kept only in the object store are reachable through the manifest.
+    for rel, entry in entries.items():
+        if rel not in files and entry.get("object") and (repo / entry["object"]).is_file():
+            files[rel] = repo / entry["object"]
+    return files
+
+
+def build_pack(repo: Path, out: Path) -> int:
+    """Write a pack of ``repo`` to ``out`` and return the number of files.
+
+    Each file is indexed under the SHA-256 recorded in the manifest when there
+    is one, so ``offline_server.py --pack --verify`` still catches files that
+    were modified after they were fetched.
+    """
+    manifest_path = repo / "manifest.json"
+    entries = index_by_path(load_manifest(manifest_path)) if manifest_path.exists() else {}
+    index: dict[str, list] = {}
+    offsets: dict[str, tuple[int, int]] = {}
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(f".{out.name}.{os.getpid()}.tmp")
+    with tmp.open("wb") as fh:
+        fh.write(HEADER.pack(MAGIC, 0, 0))
+        for rel, path in _repository_files(repo, entries).items():
+            data = path.read_bytes()
+            digest = sha256(data).hexdigest()
+            if digest not in offsets:
+                offsets[digest] = (fh.tell(), len(data))
+                fh.write(data)
+            offset, length = offsets[digest]
+            expected = entries.get(rel, {}).get("sha256") or digest
+            if expected != digest:
+                print(f"Warning: {rel} does not match its manifest hash")
+            index[rel] = [offset, length, expected]
+        index_offset = fh.tell()
+        blob = json.dumps({"files": index}, separators=(",", ":")).encode("utf-8")
+        fh.write(blob)
+        fh.seek(0)
+        fh.write(HEADER.pack(MAGIC, index_offset, len(blob)))
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, out)
+    return len(index)
+
+
+class Pack:
+    """Read-only, memory-mapped view of a pack file."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with path.open("rb") as fh:
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, index_offset, index_length = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a repository pack")
+        self._view = memoryview(self._mmap)
+        self.files: dict[str, list] = json.loads(
+            self._view[index_offset:index_offset + index_length].tobytes()
+        )["files"]
+        self.dirs = {""}
+        for rel in self.files:
+            parts = rel.split("/")
+            for depth in range(1, len(parts)):
+                self.dirs.add("/".join(parts[:depth]))
+
+    def get(self, rel: str) -> tuple[memoryview, str] | None:
+        """Return a zero-copy view of ``rel``'s body and its SHA-256."""
+        item = self.files.get(rel)
+        if item is None:
+            return None
+        offset, length, digest = item
+        return self._view[offset:offset + length], digest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pack a repository into a single file")
+    parser.add_argument("--repo", default="repository", help="Repository directory")
+    parser.add_argument("--out", default="repository.pack", help="Pack file to write")
+    args = parser.parse_args()
+
+    count = build_pack(Path(args.repo), Path(args.out))
+    size = Path(args.out).stat().st_size
+    print(f"Packed {count} files into {args.out} ({size / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Size-bounded LRU cache of page bytes for the offline server."""
+
+from __future__ import annotations
+
+import gzip
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+
+
+class CachedPage(NamedTuple):
+    stat_key: tuple[int, int, int]
+    etag: str
+    content_type: str
+    body: bytes
+    gzipped: bytes | None = None
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzipped or b"")
+
+
+class PageCache:
+    """LRU cache keyed by file path and validated against the file's stat key.
+
+    ``max_bytes`` bounds the total size of cached bodies (including gzip
+    copies); files larger than ``max_file_bytes`` are never cached.
+    """
+
+    def __init__(self, max_bytes: int, max_file_bytes: int = 1 << 20, compress: bool = False):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self.compress = compress
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = 0
+        self._pages: OrderedDict[str, CachedPage] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str, stat_key: tuple[int, int, int]) -> CachedPage | None:
+        with self._lock:
+            page = self._pages.get(path)
+            if page is not None and page.stat_key == stat_key:
+                self._pages.move_to_end(path)
+                self.hits += 1
+                return page
+            if page is not None:  # file changed on disk
+                self._remove(path)
+            self.misses += 1
+            return None
+
+    def build(
+        self,
+        stat_key: tuple[int, int, int],
+        etag: str,
+        content_type: str,
+        body: bytes,
+    ) -> CachedPage:
+        gzipped = None
+        if self.compress and content_type.startswith(COMPRESSIBLE_TYPES):
+            gzipped = gzip.compress(body, compresslevel=6, mtime=0)
+            if len(gzipped) >= len(body):
+                gzipped = None
+        return CachedPage(stat_key, etag, content_type, body, gzipped)
+
+    def put(self, path: str, page: CachedPage) -> None:
+        if page.size > self.max_file_bytes or page.size > self.max_bytes:
+            return
+        with self._lock:
+            if path in self._pages:
+                self._remove(path)
+            self._pages[path] = page
+            self._bytes += page.size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._pages))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._pages),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _remove(self, path: str) -> None:
+        page = self._pages.pop(path)
+        self._bytes -= page.size
@@ -0,0 +1,144 @@
+"""HTML sanitization backends used by the fetcher.
+
+Every backend removes ``script``, ``form`` and ``iframe`` elements (with their
+contents) and strips ``on*`` event-handler attributes:
+
+* ``html.parser`` - BeautifulSoup with the pure-Python parser (reference).
+* ``lxml`` - BeautifulSoup with the lxml parser; needs ``lxml`` installed.
+* ``stream`` - single pass over the tokenizer from ``html.parser`` that copies
+  allowed markup through unchanged instead of building a tree. It keeps a
+  stack of open element names so misnested end tags close (and end drops)
+  the same elements the reference tree builder closes.
+
+The stream backend keeps the source's formatting, so its output matches the
+reference once both are parsed again, not byte for byte. A tag cut off at the
+end of the input is escaped as text, as the reference does.
+"""
+
+from __future__ import annotations
+
+from html import escape
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+
+DROP_TAGS = ("script", "form", "iframe")
+BACKENDS = ("html.parser", "lxml", "stream")
+# Elements BeautifulSoup's html.parser builder never leaves open.
+VOID_TAGS = frozenset((
+    "area", "base", "basefont", "bgsound", "br", "col", "command", "embed", "frame",
+    "hr", "image", "img", "input", "isindex", "keygen", "link", "menuitem", "meta",
+    "nextid", "param", "source", "spacer", "track", "wbr",
+))
+
+
+def sanitize_html(html: str, backend: str = "html.parser") -> str:
+    """Strip scripts, forms, and event handlers."""
+    if backend == "stream":
+        return stream_sanitize(html)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown sanitizer backend {backend!r}")
+    soup = BeautifulSoup(html, backend)
+    for tag in soup(DROP_TAGS):
+        tag.decompose()
+    for tag in soup.find_all(True):
+        handlers = [attr for attr in tag.attrs if attr.lower().startswith("on")]
+        for attr in handlers:
+            del tag.attrs[attr]
+    return str(soup)
+
+
+def stream_sanitize(html: str) -> str:
+    parser = _StreamSanitizer()
+    parser.feed(html)
+    parser.close()
+    return "".join(parser.out)
+
+
+def _render_starttag(tag: str, attrs: list[tuple[str, str | None]], close: bool) -> str:
+    parts = [tag]
+    for name, value in attrs:
+        parts.append(name if value is None else f'{name}="{escape(value, quote=True)}"')
+    return f"<{' '.join(parts)}{' /' if close else ''}>"
+
+
+class _StreamSanitizer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.out: list[str] = []
+        # Open elements, so an end tag closes whatever it implicitly closes in
+        # the tree builder; _skip_at is the stack index of the dropped element.
+        self._open: list[str] = []
+        self._skip_at: int | None = None
+
+    def close(self):
+        # Markup still buffered at EOF is a tag cut off mid-way; HTMLParser would
+        # flush it verbatim, so escape it as text the way the tree builder does.
+        rest = self.rawdata if self.rawdata.startswith("<") else ""
+        self.rawdata = self.rawdata[len(rest):]
+        super().close()
+        self._emit(escape(rest, quote=False))
+
+    def _emit_starttag(self, tag, attrs, close):
+        if any(name.startswith("on") for name, _ in attrs):
+            kept = [(name, value) for name, value in attrs if not name.startswith("on")]
+            self.out.append(_render_starttag(tag, kept, close))
+        else:
+            self.out.append(self.get_starttag_text())
+
+    def handle_starttag(self, tag, attrs):
+        if self._skip_at is None:
+            if tag in DROP_TAGS:
+                self._skip_at = len(self._open)
+            else:
+                self._emit_starttag(tag, attrs, close=False)
+        if tag not in VOID_TAGS:
+            self._open.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if self._skip_at is None and tag not in DROP_TAGS:
+            self._emit_starttag(tag, attrs, close=True)
+
+    def handle_endtag(self, tag):
+        # Like the tree builder: close the innermost open ``tag`` and every
+        # element opened inside it, and ignore end tags with nothing to close.
+        for index in range(len(self._open) - 1, -1, -1):
+            if self._open[index] == tag:
+                break
+        else:
+            return
+        closed = self._open[index:]
+        del self._open[index:]
+        if self._skip_at is not None:
+            if index > self._skip_at:
+                return
+            # Closing an ancestor of the dropped element ends the drop too.
+            closed = closed[:self._skip_at - index]
+            self._skip_at = None
+        self.out.extend(f"</{name}>" for name in reversed(closed))
+
+    def _emit(self, text):
+        if self._skip_at is None:
+            self.out.append(text)
+
+    def handle_data(self, data):
+        self._emit(data)
+
+    def handle_entityref(self, name):
+        self._emit(f"&{name};")
+
+    def handle_charref(self, name):
+        self._emit(f"&#{name};")
+
+    def handle_comment(self, data):
+        self._emit(f"<!--{data}-->")
+
+    def handle_decl(self, decl):
+        self._emit(f"<!{decl}>")
+
+    def handle_pi(self, data):
+        self._emit(f"<?{data}>")
+
+    def unknown_decl(self, data):
+        # CDATA sections end with "]]>", other marked sections with "]>".
+        self._emit(f"<![{data}]]>" if data.startswith("CDATA[") else f"<![{data}]>")
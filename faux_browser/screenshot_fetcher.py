@@ -1,25 +1,209 @@
+#!/usr/bin/env python3
+"""Capture screenshots of whitelisted sites with a pool of headless-browser tabs.
+
+Usage:
+    python screenshot_fetcher.py --sites whitelist.txt --output repository/
+    python screenshot_fetcher.py --sites whitelist.txt --via http://localhost:8000
+
+Reads the same sites file as ``fetcher.py``. Screenshots are saved under
+``repository/screenshots/`` and recorded in ``manifest.json`` with their hash
+and the hash of the HTML they were taken from; pages whose HTML has not changed
+since the last capture are skipped. ``--via`` captures the cached copies served
+by a running ``offline_server.py`` instead of the live sites.
+"""
+
+from __future__ import annotations
+
+import argparse
 import asyncio
+import sys
+from datetime import datetime, timezone
+from hashlib import sha256
 from pathlib import Path
 
 from pyppeteer import launch
 
-WHITELIST = [
-    "https://example.com",
-]
+from fetcher import read_sites, url_domain
+from manifest_store import ManifestStore, atomic_write_bytes
+
+VIEWPORT = {"width": 1280, "height": 800}
+
+
+class TabPool:
+    """Bounded pool of browser tabs spread across one or more browsers.
+
+    A broken tab that cannot be replaced is dropped and the pool shrinks;
+    once no tabs are left, ``acquire`` raises ``RuntimeError``.
+    """
+
+    def __init__(self, browsers: int, tabs_per_browser: int):
+        self.browser_count = browsers
+        self.tabs_per_browser = tabs_per_browser
+        self.browsers = []
+        self.size = 0
+        self._free: asyncio.Queue = asyncio.Queue()
+
+    async def start(self) -> None:
+        for _ in range(self.browser_count):
+            browser = await launch(headless=True, args=["--no-sandbox"])
+            self.browsers.append(browser)
+            for _ in range(self.tabs_per_browser):
+                await self._free.put(await self._new_tab(browser))
+                self.size += 1
+
+    async def _new_tab(self, browser):
+        page = await browser.newPage()
+        await page.setViewport(VIEWPORT)
+        return page
+
+    async def acquire(self):
+        page = await self._free.get()
+        if page is None:
+            # Pass the wake-up on to the next waiter.
+            self._free.put_nowait(None)
+            raise RuntimeError("no browser tabs left")
+        return page
+
+    async def release(self, page, broken: bool = False) -> None:
+        """Return ``page`` to the pool; never raises, so it is safe in ``finally``."""
+        if broken:
+            # A tab that timed out may still be loading; replace it.
+            browser = page.browser
+            try:
+                await page.close()
+            except Exception:
+                pass
+            try:
+                page = await self._new_tab(browser)
+            except Exception as exc:
+                self.size -= 1
+                print(f"Could not replace a broken tab ({exc!r}); {self.size} tabs left", file=sys.stderr)
+                if not self.size:
+                    self._free.put_nowait(None)
+                return
+        await self._free.put(page)
+
+    async def close(self) -> None:
+        for browser in self.browsers:
+            await browser.close()
+
+
+def capture_url(url: str, via: str | None) -> str:
+    if via is None:
+        return url
+    return f"{via.rstrip('/')}/pages/{url_domain(url)}/"
+
+
+def needs_capture(entry: dict | None, output_dir: Path) -> bool:
+    shot = (entry or {}).get("screenshot")
+    if not shot or not (output_dir / shot["path"]).exists():
+        return True
+    return entry.get("sha256") is None or shot.get("source_sha256") != entry.get("sha256")
+
+
+async def capture(
+    pool: TabPool,
+    url: str,
+    output_dir: Path,
+    manifest: ManifestStore,
+    timeout: float,
+    via: str | None,
+) -> str:
+    entry = manifest.get(url) or {}
+    try:
+        page = await pool.acquire()
+    except RuntimeError as exc:
+        return f"failed: {exc}"
+    broken = False
+    try:
+        await asyncio.wait_for(page.goto(capture_url(url, via)), timeout)
+        data = await asyncio.wait_for(page.screenshot(), timeout)
+    except Exception as exc:
+        broken = True
+        return f"failed: {exc!r}"
+    finally:
+        await pool.release(page, broken)
+
+    dest = output_dir / "screenshots" / f"{url_domain(url)}.png"
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    digest = sha256(data).hexdigest()
+    atomic_write_bytes(dest, data)
+    manifest.set(url, {
+        **entry,
+        "screenshot": {
+            "path": dest.relative_to(output_dir).as_posix(),
+            "sha256": digest,
+            "source_sha256": entry.get("sha256"),
+            "captured_at": datetime.now(timezone.utc).isoformat(),
+        },
+    })
+    return "captured"
+
+
+async def fetch_screenshots(
+    urls: list[str],
+    output_dir: Path,
+    manifest: ManifestStore,
+    browsers: int = 1,
+    tabs: int = 4,
+    timeout: float = 30.0,
+    via: str | None = None,
+    force: bool = False,
+) -> dict[str, str]:
+    """Capture ``urls`` on a shared tab pool and return a status per URL."""
+    results = {}
+    pending = []
+    for url in urls:
+        if force or needs_capture(manifest.get(url), output_dir):
+            pending.append(url)
+        else:
+            results[url] = "unchanged"
+    if not pending:
+        return results
+
+    pool = TabPool(browsers, tabs)
+    await pool.start()
+    try:
+        statuses = await asyncio.gather(
+            *(capture(pool, url, output_dir, manifest, timeout, via) for url in pending)
+        )
+    finally:
+        await pool.close()
+    results.update(zip(pending, statuses))
+    return results
 
-OUTPUT_DIR = Path("repository/screenshots")
 
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Capture screenshots of whitelisted sites")
+    parser.add_argument("--sites", required=True, help="Path to file listing allowed URLs")
+    parser.add_argument("--output", default="repository", help="Repository directory")
+    parser.add_argument("--browsers", type=int, default=1, help="Browser processes to launch")
+    parser.add_argument("--tabs", type=int, default=4, help="Tabs per browser")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-page timeout in seconds")
+    parser.add_argument("--via", help="Capture through an offline server, e.g. http://localhost:8000")
+    parser.add_argument("--force", action="store_true", help="Recapture pages whose HTML is unchanged")
+    args = parser.parse_args()
 
-async def fetch_screenshots() -> None:
-    browser = await launch(headless=True, args=["--no-sandbox"])
-    page = await browser.newPage()
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    for url in WHITELIST:
-        await page.goto(url)
-        domain = url.split("//", 1)[-1].split("/", 1)[0]
-        await page.screenshot({"path": str(OUTPUT_DIR / f"{domain}.png")})
-    await browser.close()
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with ManifestStore(output_dir / "manifest.json") as manifest:
+        results = asyncio.run(fetch_screenshots(
+            read_sites(Path(args.sites)),
+            output_dir,
+            manifest,
+            browsers=args.browsers,
+            tabs=args.tabs,
+            timeout=args.timeout,
+            via=args.via,
+            force=args.force,
+        ))
+    for url, status in results.items():
+        if status.startswith("failed"):
+            print(f"{url}: {status}")
+    captured = sum(status == "captured" for status in results.values())
+    unchanged = sum(status == "unchanged" for status in results.values())
+    print(f"{captured} captured, {unchanged} unchanged, {len(results) - captured - unchanged} failed")
 
 
 if __name__ == "__main__":
-    asyncio.run(fetch_screenshots())
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""Full-text search index over cached pages, stored in SQLite FTS5.
+
+The fetcher adds pages as it stores them (``fetcher.py --index``) and this
+script can (re)build the index for an existing repository. Indexing is
+incremental: a page whose SHA-256 has not changed since it was last indexed is
+skipped, and pages that disappeared from the manifest are dropped.
+
+Usage:
+    python search_index.py --repo repository
+    python search_index.py --repo repository --query "solar system"
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sqlite3
+import threading
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Callable, Iterator, NamedTuple
+
+from manifest_store import load_manifest
+
+INDEX_NAME = "search.sqlite3"
+SKIP_TEXT_TAGS = {"script", "style", "noscript", "template"}
+_WORD = re.compile(r"\w+", re.UNICODE)
+# bm25 column weights: a match in the title counts for more than one in the body.
+TITLE_WEIGHT = 5.0
+
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(
+    title, body, url UNINDEXED, path UNINDEXED, domain UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS indexed (
+    path TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    doc INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS domains (domain TEXT PRIMARY KEY);
+"""
+
+
+class SearchHit(NamedTuple):
+    url: str
+    path: str
+    domain: str
+    title: str
+    snippet: str
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.title: list[str] = []
+        self.text: list[str] = []
+        self._skip = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TEXT_TAGS:
+            self._skip += 1
+        elif tag == "title":
+            self._in_title = True
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TEXT_TAGS and self._skip:
+            self._skip -= 1
+        elif tag == "title":
+            self._in_title = False
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        (self.title if self._in_title else self.text).append(data)
+
+
+def extract_text(html: str) -> tuple[str, str]:
+    """Return (title, visible text) of ``html`` with whitespace collapsed."""
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    return " ".join("".join(parser.title).split()), " ".join(" ".join(parser.text).split())
+
+
+def to_match_query(query: str) -> str:
+    """Turn free text into an FTS5 query that ANDs every word as a literal."""
+    return " ".join(f'"{word}"' for word in _WORD.findall(query))
+
+
+class SearchIndex:
+    """Thread-safe writer and reader for the page index.
+
+    Writes share one connection behind a lock and are committed every
+    ``batch_size`` pages and on ``close``. Searches use a read connection per
+    thread, so concurrent server threads do not serialize on the writer. A
+    ``readonly`` index (as opened by the offline server) has no writer.
+    """
+
+    def __init__(self, path: Path, batch_size: int = 200, readonly: bool = False):
+        self.path = path
+        self.batch_size = batch_size
+        self._conn = None
+        if not readonly:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            # WAL lets the server keep answering searches while pages are added.
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            # Indexes built before the domains table existed get it filled once.
+            if self._conn.execute("SELECT 1 FROM domains LIMIT 1").fetchone() is None:
+                self._conn.execute("INSERT OR IGNORE INTO domains SELECT DISTINCT domain FROM pages")
+            self._conn.commit()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._readers = threading.local()
+
+    def add(self, path: str, url: str, domain: str, html: str, digest: str) -> bool:
+        """Index one page; return False if it is already indexed at ``digest``."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sha256, doc FROM indexed WHERE path = ?", (path,)
+            ).fetchone()
+            if row and row[0] == digest:
+                return False
+            title, body = extract_text(html)
+            if row:
+                self._conn.execute("DELETE FROM pages WHERE rowid = ?", (row[1],))
+            doc = self._conn.execute(
+                "INSERT INTO pages (title, body, url, path, domain) VALUES (?, ?, ?, ?, ?)",
+                (title, body, url, path, domain),
+            ).lastrowid
+            self._conn.execute(
+                "INSERT OR REPLACE INTO indexed (path, sha256, doc) VALUES (?, ?, ?)",
+                (path, digest, doc),
+            )
+            self._conn.execute("INSERT OR IGNORE INTO domains (domain) VALUES (?)", (domain,))
+            self._pending += 1
+            if self._pending >= self.batch_size:
+                self._conn.commit()
+                self._pending = 0
+            return True
+
+    def digests(self) -> dict[str, str]:
+        """Return the SHA-256 each indexed path was last indexed at."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT path, sha256 FROM indexed"))
+
+    def remove_missing(self, keep: set[str]) -> int:
+        with self._lock:
+            stale = [
+                (path, doc)
+                for path, doc in self._conn.execute("SELECT path, doc FROM indexed")
+                if path not in keep
+            ]
+            for path, doc in stale:
+                self._conn.execute("DELETE FROM pages WHERE rowid = ?", (doc,))
+                self._conn.execute("DELETE FROM indexed WHERE path = ?", (path,))
+            self._conn.commit()
+            return len(stale)
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._readers, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._readers.conn = conn
+        return conn
+
+    def domains(self) -> list[str]:
+        """Return every domain that has (or had) a page in the index."""
+        try:
+            rows = self._reader().execute("SELECT domain FROM domains").fetchall()
+        except sqlite3.OperationalError:
+            # Read-only index from before the domains table existed.
+            rows = self._reader().execute("SELECT DISTINCT domain FROM pages").fetchall()
+        return [domain for (domain,) in rows]
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        allow: Callable[[str], bool] | None = None,
+    ) -> list[SearchHit]:
+        """Return up to ``limit`` best matches whose domain passes ``allow``.
+
+        ``allow`` is applied to the index's domain list, not to each hit, so
+        the domain restriction and the limit both run inside SQLite and
+        ranking and snippets are computed only for the rows returned.
+        """
+        match = to_match_query(query)
+        if not match:
+            return []
+        sql = (
+            "SELECT url, path, domain, title, snippet(pages, 1, '[', ']', '...', 16) "
+            "FROM pages WHERE pages MATCH ?"
+        )
+        params: list = [match]
+        if allow is not None:
+            allowed = [domain for domain in self.domains() if allow(domain)]
+            if not allowed:
+                return []
+            sql += " AND domain IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps(allowed))
+        sql += " ORDER BY bm25(pages, ?, 1.0) LIMIT ?"
+        params += [TITLE_WEIGHT, limit]
+        return [SearchHit(*row) for row in self._reader().execute(sql, params)]
+
+    def flush(self) -> None:
+        if self._conn is None:
+            return
+        with self._lock:
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self) -> None:
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+
+    def __enter__(self) -> "SearchIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def iter_repository_pages(repo: Path) -> Iterator[tuple[str, str, str, Path, str]]:
+    """Yield (path, url, domain, file, sha256) for every HTML page in the manifest."""
+    for url, entry in load_manifest(repo / "manifest.json").items():
+        rel = entry.get("path")
+        if not rel or not rel.endswith((".html", ".htm")):
+            continue
+        source = repo / rel
+        if not source.exists() and entry.get("object"):
+            source = repo / entry["object"]
+        parts = Path(rel).parts
+        domain = parts[1] if len(parts) > 2 and parts[0] == "pages" else ""
+        yield Path(rel).as_posix(), url, domain, source, entry.get("sha256", "")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build or query the page search index")
+    parser.add_argument("--repo", default="repository", help="Repository directory")
+    parser.add_argument("--db", help=f"Index file (default: REPO/{INDEX_NAME})")
+    parser.add_argument("--query", help="Run a search instead of indexing")
+    args = parser.parse_args()
+
+    repo = Path(args.repo)
+    db = Path(args.db) if args.db else repo / INDEX_NAME
+    with SearchIndex(db) as index:
+        if args.query:
+            for hit in index.search(args.query):
+                print(f"{hit.url}  {hit.title}\n    {hit.snippet}")
+            return
+        added = seen = 0
+        keep = set()
+        current = index.digests()
+        for path, url, domain, source, digest in iter_repository_pages(repo):
+            keep.add(path)
+            if not source.exists():
+                continue
+            seen += 1
+            if digest and current.get(path) == digest:
+                continue
+            html = source.read_text(encoding="utf-8", errors="replace")
+            added += index.add(path, url, domain, html, digest)
+        removed = index.remove_missing(keep)
+    print(f"Indexed {added} changed pages of {seen}; removed {removed} stale pages")
+
+
+if __name__ == "__main__":
+    main()
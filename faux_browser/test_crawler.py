@@ -0,0 +1,52 @@
+"""Tests for crawler.py's local paths and fetcher.crawl_page storing pages at them."""
+import pytest
+
+from crawler import local_path
+from fetcher import crawl_page
+from manifest_store import ManifestStore
+
+
+class FakeResponse:
+    def __init__(self, url, body, content_type):
+        self.url = url
+        self.content = body.encode("utf-8")
+        self.text = body
+        self.headers = {"Content-Type": content_type}
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def get(self, url, timeout=None):
+        return FakeResponse(url, *self.pages[url])
+
+
+@pytest.mark.parametrize("url, path", [
+    ("http://d.test/", "index.html"),
+    ("http://d.test/about", "about/index.html"),
+    ("http://d.test/v1.2", "v1.2/index.html"),
+    ("http://d.test/wiki/U.S._Navy", "wiki/U.S._Navy/index.html"),
+    ("http://d.test/v1.2/x.html", "v1.2/x.html"),
+    ("http://d.test/static/site.CSS", "static/site.CSS"),
+    ("http://d.test/logo.png?size=2", "logo__a0f8da28.png"),
+])
+def test_local_path(url, path):
+    assert local_path(url) == path
+
+
+def test_dotted_page_and_page_below_it_are_both_stored(tmp_path):
+    session = FakeSession({
+        "http://d.test/v1.2": ('<a href="/v1.2/x.html">x</a>', "text/html"),
+        "http://d.test/v1.2/x.html": ("<p>x</p>", "text/html; charset=utf-8"),
+    })
+    with ManifestStore(tmp_path / "manifest.json") as manifest:
+        links = crawl_page("http://d.test/v1.2", tmp_path, manifest, session)
+        assert links == ["http://d.test/v1.2/x.html"]
+        crawl_page(links[0], tmp_path, manifest, session)
+    pages = tmp_path / "pages" / "d.test"
+    assert "/pages/d.test/v1.2/x.html" in (pages / "v1.2" / "index.html").read_text()
+    assert (pages / "v1.2" / "x.html").read_text() == "<p>x</p>"
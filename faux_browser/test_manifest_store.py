@@ -0,0 +1,45 @@
+"""Crash-recovery tests for manifest_store.py."""
+from hashlib import sha256
+
+from manifest_store import ManifestStore, atomic_write_bytes, load_manifest
+
+
+def record(store, root, url, name, data):
+    path = root / "pages" / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_bytes(path, data)
+    store.set(url, {"path": f"pages/{name}", "sha256": sha256(data).hexdigest()})
+    return path
+
+
+def test_reopen_keeps_journaled_entries(tmp_path):
+    store = ManifestStore(tmp_path / "manifest.json")
+    record(store, tmp_path, "http://a.test/", "a.html", b"a")
+    # No close: the entry exists only in the journal.
+    assert ManifestStore(tmp_path / "manifest.json").get("http://a.test/")["path"] == "pages/a.html"
+
+
+def test_reopen_forgets_entries_whose_files_were_lost(tmp_path):
+    store = ManifestStore(tmp_path / "manifest.json")
+    record(store, tmp_path, "http://kept.test/", "kept.html", b"kept")
+    record(store, tmp_path, "http://torn.test/", "torn.html", b"torn").write_bytes(b"")
+    record(store, tmp_path, "http://gone.test/", "gone.html", b"gone").unlink()
+    shot = tmp_path / "screenshots" / "kept.png"
+    shot.parent.mkdir()
+    shot.write_bytes(b"")
+    store.set("http://kept.test/", {
+        **store.get("http://kept.test/"),
+        "screenshot": {"path": "screenshots/kept.png", "sha256": sha256(b"png").hexdigest()},
+    })
+
+    reopened = ManifestStore(tmp_path / "manifest.json")
+    reopened.close()
+    entries = load_manifest(tmp_path / "manifest.json")
+    assert list(entries) == ["http://kept.test/"]
+    assert "screenshot" not in entries["http://kept.test/"]
+
+
+def test_compacted_entries_are_not_rechecked(tmp_path):
+    with ManifestStore(tmp_path / "manifest.json") as store:
+        record(store, tmp_path, "http://a.test/", "a.html", b"a").unlink()
+    assert ManifestStore(tmp_path / "manifest.json").get("http://a.test/") is not None
@@ -0,0 +1,73 @@
+"""Access-control tests for offline_server.py, run against a live server process."""
+import http.client
+import json
+import socket
+
+import pytest
+
+BLOB = "ab" + "cd" * 31
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory, start_server):
+    root = tmp_path_factory.mktemp("repo")
+    for domain in ("allowed.test", "blocked.test"):
+        page = root / "pages" / domain / "index.html"
+        page.parent.mkdir(parents=True)
+        page.write_text(f"<html><body>{domain}</body></html>")
+    blob = root / "objects" / BLOB[:2] / BLOB[2:]
+    blob.parent.mkdir(parents=True)
+    blob.write_text("<html><body>raw blob</body></html>")
+    profile = root / "profile.json"
+    profile.write_text(json.dumps({"allowed_domains": ["allowed.test"], "blocked_domains": ["blocked.test"]}))
+    return start_server(root, profile)
+
+
+def get(port, path):
+    conn = http.client.HTTPConnection("localhost", port, timeout=10)
+    try:
+        # http.client sends the path as given, without normalizing it.
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        return resp.status, resp.read()
+    finally:
+        conn.close()
+
+
+def test_allowed_page_is_served(server):
+    status, body = get(server, "/pages/allowed.test/")
+    assert status == 200 and b"allowed.test" in body
+
+
+@pytest.mark.parametrize("path", [
+    f"/objects/{BLOB[:2]}/{BLOB[2:]}",
+    f"/./objects/{BLOB[:2]}/{BLOB[2:]}",
+    f"/%6Fbjects/{BLOB[:2]}/{BLOB[2:]}",
+    f"/pages/../objects/{BLOB[:2]}/{BLOB[2:]}",
+])
+def test_objects_are_never_served(server, path):
+    status, body = get(server, path)
+    assert status == 403 and b"raw blob" not in body
+
+
+@pytest.mark.parametrize("path", [
+    "/pages/blocked.test/",
+    "/./pages/blocked.test/",
+    "/%70ages/blocked.test/",
+    "/pages/./blocked.test/index.html",
+    "/pages/allowed.test/../blocked.test/",
+])
+def test_blocked_domain_cannot_be_reached_by_respelling(server, path):
+    status, body = get(server, path)
+    assert status == 403 and b"blocked.test" not in body
+
+
+def test_unlisted_domain_is_denied(server):
+    assert get(server, "/%70ages/unlisted.test/")[0] == 403
+
+
+def test_request_target_without_slash_gets_400(server):
+    with socket.create_connection(("localhost", server), timeout=10) as sock:
+        sock.sendall(b"GET foo HTTP/1.0\r\n\r\n")
+        reply = sock.makefile("rb").readline()
+    assert reply.split()[1] == b"400"
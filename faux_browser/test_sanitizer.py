@@ -0,0 +1,92 @@
+"""Equivalence tests for the sanitizer backends against the html.parser reference."""
+from html import escape
+
+import pytest
+from bs4 import BeautifulSoup
+
+from sanitizer import sanitize_html
+
+ARTICLE = """
+<div class="story" onclick="track({n})">
+  <h2><a href="/news/{n}" onmouseover="hover()">Headline number {n} &amp; more</a></h2>
+  <img src="/img/{n}.jpg" alt="Photo {n}" onload="lazy(this)">
+  <p>Lorem ipsum dolor sit amet, consectetur adipiscing elit &mdash; sed do eiusmod
+  tempor incididunt ut labore et dolore magna aliqua.</p>
+  <script>window.ads.push({n});</script>
+  <form action="/subscribe"><input name="email"><button>Go</button></form>
+  <iframe src="https://ads.example/{n}"></iframe>
+  <!-- comment {n} -->
+</div>
+"""
+
+
+def synthetic_page(target_bytes: int = 1_000_000) -> str:
+    body = []
+    size = n = 0
+    while size < target_bytes:
+        chunk = ARTICLE.format(n=n)
+        body.append(chunk)
+        size += len(chunk)
+        n += 1
+    return "<!DOCTYPE html><html><head><title>News</title></head><body>" + "".join(body) + "</body></html>"
+
+
+def normalized(html: str) -> str:
+    """Re-serialize ``html`` with whitespace runs collapsed for comparison."""
+    return " ".join(str(BeautifulSoup(html, "html.parser")).split())
+
+
+MISNESTED = [
+    # Forms never closed, or closed only after their parent.
+    "<html><body><div><form><p>in</div><p>after</p></body></html>",
+    "<html><body><div><form></div><p>after</p></body></html>",
+    "<html><body><div><form><p>in</div></form><p>after</p></body></html>",
+    "<html><body><table><tr><td><form><input></td></tr></table><p>after</p></body></html>",
+    # Dropped elements nested in each other and in kept markup.
+    "<div><form><form>x</form>y</form><p>after</p></div>",
+    "<div><b>bold<script>x()</script></div><p>after</p>",
+    # Stray and implicitly closed end tags outside any dropped element.
+    "<div><b><i>x</div></i><p>after</p></b>",
+    "<p>one<br></br>two</span></p>",
+]
+
+
+@pytest.mark.parametrize("html", MISNESTED)
+def test_stream_matches_reference_on_misnested_markup(html):
+    assert normalized(sanitize_html(html, "stream")) == normalized(sanitize_html(html))
+
+
+def test_stream_drops_and_closes():
+    html = "<div><form><p>in</div><p onclick='x()'>after</p>"
+    assert sanitize_html(html, "stream") == "<div></div><p>after</p>"
+
+
+TRUNCATED = [
+    '<p>x</p><a href=x onclick="y"',
+    '<p>x</p><a href="x>y" onclick="z',
+    "<p>x</p><!-- never closed",
+    "<div><p>x</p></di",
+    "<p>a < b</p><img src=x onerror=alert(1)",
+]
+
+
+@pytest.mark.parametrize("html", TRUNCATED)
+def test_stream_escapes_a_tag_cut_off_at_the_end(html):
+    output = sanitize_html(html, "stream")
+    assert normalized(output) == normalized(sanitize_html(html))
+    assert output.endswith(escape(html[html.rindex("<"):], quote=False))
+
+
+def test_stream_drops_a_cut_off_tag_inside_a_dropped_element():
+    assert sanitize_html("<p>x</p><script>run()</scr", "stream") == "<p>x</p>"
+
+
+@pytest.mark.parametrize("backend", ["lxml", "stream"])
+def test_backend_matches_reference_on_synthetic_page(backend):
+    if backend == "lxml":
+        pytest.importorskip("lxml")
+    page = synthetic_page(20_000)
+    output = sanitize_html(page, backend)
+    assert normalized(output) == normalized(sanitize_html(page))
+    for dropped in ("<script", "<form", "<iframe", "onclick", "onload"):
+        assert dropped not in output
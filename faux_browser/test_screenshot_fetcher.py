@@ -0,0 +1,84 @@
+"""Tests for screenshot_fetcher.py's tab pool, capturing through a local offline_server.py."""
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("pyppeteer")
+
+from manifest_store import ManifestStore  # noqa: E402
+from screenshot_fetcher import TabPool, capture, fetch_screenshots  # noqa: E402
+
+SITES = ["http://one.test/", "http://two.test/", "http://three.test/"]
+
+
+@pytest.fixture(scope="module")
+def via(tmp_path_factory, start_server):
+    root = tmp_path_factory.mktemp("repo")
+    for url in SITES:
+        domain = url.split("/")[2]
+        page = root / "pages" / domain / "index.html"
+        page.parent.mkdir(parents=True)
+        page.write_text(f"<html><body><h1>{domain}</h1></body></html>")
+    profile = root / "profile.json"
+    profile.write_text(json.dumps({"allowed_domains": [url.split("/")[2] for url in SITES]}))
+    return f"http://localhost:{start_server(root, profile)}"
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_captures_through_offline_server(tmp_path, via):
+    with ManifestStore(tmp_path / "manifest.json") as manifest:
+        results = run(fetch_screenshots(SITES, tmp_path, manifest, tabs=2, via=via))
+        assert results == dict.fromkeys(SITES, "captured")
+        shot = manifest.get(SITES[0])["screenshot"]
+    assert (tmp_path / shot["path"]).read_bytes().startswith(b"\x89PNG")
+
+
+def test_broken_tab_is_replaced(via):
+    async def scenario():
+        pool = TabPool(1, 1)
+        await pool.start()
+        try:
+            page = await pool.acquire()
+            await pool.release(page, broken=True)
+            replacement = await pool.acquire()
+            assert replacement is not page and page.isClosed()
+            assert pool.size == 1
+            await replacement.goto(f"{via}/pages/one.test/")
+            assert "one.test" in await replacement.content()
+            await pool.release(replacement)
+        finally:
+            await pool.close()
+
+    run(scenario())
+
+
+def test_pool_shrinks_when_replacement_fails(tmp_path, via):
+    async def scenario():
+        pool = TabPool(1, 2)
+        await pool.start()
+        try:
+            async def no_new_tabs(browser):
+                raise ConnectionError("browser gone")
+
+            pool._new_tab = no_new_tabs
+            # A broken tab that cannot be replaced is dropped; the other keeps working.
+            await pool.release(await pool.acquire(), broken=True)
+            assert pool.size == 1
+            with ManifestStore(tmp_path / "manifest.json") as manifest:
+                assert await capture(pool, SITES[0], tmp_path, manifest, 30, via) == "captured"
+                # A timeout breaks the last tab; every capture after it fails instead of hanging.
+                statuses = await asyncio.gather(
+                    capture(pool, SITES[1], tmp_path, manifest, 0.000001, via),
+                    capture(pool, SITES[2], tmp_path, manifest, 30, via),
+                )
+            assert pool.size == 0
+            assert all(status.startswith("failed") for status in statuses)
+            assert statuses[1] == "failed: no browser tabs left"
+        finally:
+            await pool.close()
+
+    run(scenario())
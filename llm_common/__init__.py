@@ -0,0 +1,4 @@
+"""Code shared by the Agent_Gen_ECS and agentic_task_gen pipelines."""
+from llm_common.async_client import AsyncLLMClient, SyncLLMClient, TokenBucket
+
+__all__ = ["AsyncLLMClient", "SyncLLMClient", "TokenBucket"]
@@ -0,0 +1,264 @@
+"""Shared asynchronous chat-completion client for the agent pipelines.
+
+``AsyncLLMClient`` keeps one pooled ``AsyncOpenAI`` connection, caps requests
+and tokens per minute with token buckets, retries rate limits (429), server
+errors (5xx) and dropped connections with jittered exponential backoff, and
+fans prompts out concurrently with ``generate_many``. ``stream`` yields a
+completion piece by piece as it is generated. ``SyncLLMClient`` runs one on a
+background event loop for callers that are not async.
+
+Pass ``base_url`` (e.g. ``http://localhost:8700/v1`` from mock_server.py) to
+run against a local endpoint instead of the OpenAI API.
+"""
+import asyncio
+import queue
+import random
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Sequence, Union
+
+import openai
+
+Messages = Union[str, List[Dict[str, str]]]
+SYSTEM_PROMPT = "You are a helpful assistant."
+
+
+class TokenBucket:
+    """Refills ``per_minute`` tokens a minute, holding at most ``capacity``."""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        # Requests bigger than the bucket would never fit; let them drain it.
+        amount = min(amount, self.capacity)
+        # The lock makes waiters take tokens in arrival order.
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+    def adjust(self, delta: float) -> None:
+        """Return (positive) or charge (negative) tokens after the fact."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + delta)
+
+
+def estimate_tokens(messages: List[Dict[str, str]], max_tokens: Optional[int]) -> int:
+    """Rough prompt size (4 characters a token) plus the completion budget."""
+    prompt = sum(len(m["content"]) for m in messages) // 4 + 4 * len(messages)
+    return prompt + (max_tokens or 256)
+
+
+def _retryable(exc: Exception) -> bool:
+    if isinstance(exc, openai.RateLimitError):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code >= 500
+    return isinstance(exc, openai.APIConnectionError)  # includes timeouts
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class AsyncLLMClient:
+    def __init__(
+        self,
+        model: str = "gpt-3.5-turbo",
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        requests_per_minute: float = 500,
+        tokens_per_minute: float = 90_000,
+        max_concurrency: int = 16,
+        max_retries: int = 5,
+        timeout: float = 60.0,
+        max_tokens: Optional[int] = None,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        client=None,
+    ):
+        self.model = model
+        self.max_tokens = max_tokens
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # Retries are handled here so they go through the rate limiters too.
+        self.client = client or openai.AsyncOpenAI(
+            api_key=api_key, base_url=base_url, max_retries=0, timeout=timeout
+        )
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "tokens": 0}
+
+    @staticmethod
+    def to_messages(prompt: Messages) -> List[Dict[str, str]]:
+        if isinstance(prompt, str):
+            return [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ]
+        return list(prompt)
+
+    async def _backoff(self, exc: Exception, attempt: int) -> None:
+        """Sleep before retry ``attempt + 1``, or re-raise ``exc`` if it is final."""
+        if not _retryable(exc) or attempt == self.max_retries:
+            self.stats["failures"] += 1
+            raise exc
+        self.stats["retries"] += 1
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        # Full jitter spreads retries from many callers apart.
+        await asyncio.sleep(max(_retry_after(exc) or 0.0, random.uniform(0, delay)))
+
+    def _charge(self, estimate: int, used: Optional[int]) -> None:
+        used = used or estimate
+        self.tokens.adjust(estimate - used)
+        self.stats["tokens"] += used
+
+    async def generate(self, prompt: Messages) -> str:
+        """Return the completion for a prompt string or a message list."""
+        messages = self.to_messages(prompt)
+        estimate = estimate_tokens(messages, self.max_tokens)
+        kwargs = {"max_tokens": self.max_tokens} if self.max_tokens else {}
+        for attempt in range(self.max_retries + 1):
+            await self.requests.acquire()
+            await self.tokens.acquire(estimate)
+            self.stats["requests"] += 1
+            try:
+                async with self._slots:
+                    response = await self.client.chat.completions.create(
+                        model=self.model, messages=messages, **kwargs
+                    )
+            except Exception as exc:
+                await self._backoff(exc, attempt)
+                continue
+            self._charge(estimate, getattr(getattr(response, "usage", None), "total_tokens", None))
+            return (response.choices[0].message.content or "").strip()
+        raise AssertionError("unreachable")
+
+    async def stream(self, prompt: Messages) -> AsyncIterator[str]:
+        """Yield the completion as text fragments while it is generated.
+
+        Failures before the first fragment are retried like ``generate``;
+        once text has been yielded, an error is raised to the caller.
+        """
+        messages = self.to_messages(prompt)
+        estimate = estimate_tokens(messages, self.max_tokens)
+        kwargs = {"max_tokens": self.max_tokens} if self.max_tokens else {}
+        for attempt in range(self.max_retries + 1):
+            await self.requests.acquire()
+            await self.tokens.acquire(estimate)
+            self.stats["requests"] += 1
+            chars = 0
+            try:
+                async with self._slots:
+                    response = await self.client.chat.completions.create(
+                        model=self.model, messages=messages, stream=True, **kwargs
+                    )
+                    async for chunk in response:
+                        text = chunk.choices[0].delta.content if chunk.choices else None
+                        if text:
+                            chars += len(text)
+                            yield text
+            except Exception as exc:
+                if chars:
+                    self.stats["failures"] += 1
+                    raise
+                await self._backoff(exc, attempt)
+                continue
+            # Streams carry no usage; charge the prompt estimate plus the text seen.
+            self._charge(estimate, estimate - (self.max_tokens or 256) + chars // 4)
+            return
+
+    async def generate_many(
+        self, prompts: Sequence[Messages], return_exceptions: bool = False
+    ) -> List[Union[str, BaseException]]:
+        """Run ``prompts`` concurrently and return results in the same order."""
+        return await asyncio.gather(
+            *(self.generate(prompt) for prompt in prompts), return_exceptions=return_exceptions
+        )
+
+    async def aclose(self) -> None:
+        await self.client.close()
+
+
+class SyncLLMClient:
+    """Blocking facade over an AsyncLLMClient running on its own event loop.
+
+    Safe to call from many threads; every call shares the one connection pool
+    and the same rate limits.
+    """
+
+    def __init__(self, **kwargs):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self.client: AsyncLLMClient = self._call(self._create(kwargs))
+        self.model = self.client.model
+
+    @staticmethod
+    async def _create(kwargs) -> AsyncLLMClient:
+        # Built on the loop so its locks and connections belong to it.
+        return AsyncLLMClient(**kwargs)
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return dict(self.client.stats)
+
+    def generate(self, prompt: Messages) -> str:
+        return self._call(self.client.generate(prompt))
+
+    def generate_many(self, prompts: Sequence[Messages], return_exceptions: bool = False):
+        return self._call(self.client.generate_many(prompts, return_exceptions))
+
+    def stream(self, prompt: Messages) -> Iterator[str]:
+        """Blocking iterator over ``AsyncLLMClient.stream``."""
+        pieces: "queue.Queue" = queue.Queue()
+        done = object()
+
+        async def pump():
+            try:
+                async for piece in self.client.stream(prompt):
+                    pieces.put(piece)
+            except BaseException as exc:
+                pieces.put(exc)
+            else:
+                pieces.put(done)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self._loop)
+        try:
+            while True:
+                piece = pieces.get()
+                if piece is done:
+                    return
+                if isinstance(piece, BaseException):
+                    raise piece
+                yield piece
+        finally:
+            future.cancel()
+
+    def close(self) -> None:
+        self._call(self.client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
@@ -0,0 +1,66 @@
+"""Benchmark AsyncLLMClient against the local mock endpoint.
+
+Usage:
+    python -m llm_common.bench_client [--prompts 200] [--latency 0.1] [--error-rate 0.1]
+
+Compares one-at-a-time calls (the old behaviour) with ``generate_many`` and
+reports retries and how many TCP connections the server saw.
+"""
+import argparse
+import asyncio
+import time
+
+from llm_common.async_client import AsyncLLMClient
+from llm_common.mock_server import serve
+
+
+async def run(base_url, prompts, args):
+    client = AsyncLLMClient(
+        api_key="mock",
+        base_url=base_url,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+        max_concurrency=args.concurrency,
+        backoff=0.05,
+    )
+    sample = prompts[: args.sequential]
+    start = time.perf_counter()
+    for prompt in sample:
+        await client.generate(prompt)
+    sequential = (time.perf_counter() - start) / max(len(sample), 1) * len(prompts)
+
+    start = time.perf_counter()
+    results = await client.generate_many(prompts, return_exceptions=True)
+    concurrent = time.perf_counter() - start
+    await client.aclose()
+    failed = sum(isinstance(result, BaseException) for result in results)
+    return sequential, concurrent, failed, client.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the shared async LLM client")
+    parser.add_argument("--prompts", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.1, help="Mock response time (s)")
+    parser.add_argument("--error-rate", type=float, default=0.1, help="Share of 429/503 replies")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rpm", type=float, default=60_000)
+    parser.add_argument("--tpm", type=float, default=10_000_000)
+    parser.add_argument("--sequential", type=int, default=10, help="Calls timed one at a time")
+    args = parser.parse_args()
+
+    server = serve(0, args.latency, args.error_rate)
+    base_url = f"http://127.0.0.1:{server.server_port}/v1"
+    prompts = [f"prompt {i}" for i in range(args.prompts)]
+    sequential, concurrent, failed, stats = asyncio.run(run(base_url, prompts, args))
+    server.shutdown()
+
+    counts = server.RequestHandlerClass.counts
+    print(f"prompts:           {args.prompts} ({failed} failed after retries)")
+    print(f"sequential (est.): {sequential:.2f}s")
+    print(f"generate_many:     {concurrent:.2f}s")
+    print(f"client stats:      {stats}")
+    print(f"server saw:        {counts['requests']} requests on {counts['connections']} connections")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Local stand-in for the OpenAI chat-completions endpoint.
+
+Usage:
+    python -m llm_common.mock_server [--port 8700] [--latency 0.2] [--error-rate 0.1]
+
+Answers ``POST /v1/chat/completions`` with an echo of the last user message
+after ``--latency`` seconds, streamed a word at a time ``--token-latency``
+apart when the request sets ``stream``. A random ``--error-rate`` share of
+requests fails with a 429 (with ``Retry-After``) or a 503. Point a client at it with
+``base_url="http://localhost:8700/v1"`` or ``OPENAI_BASE_URL``.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is visible
+    latency = 0.0
+    token_latency = 0.0
+    error_rate = 0.0
+    counts = {"requests": 0, "errors": 0, "connections": 0}
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with self.lock:
+            self.counts["connections"] += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload, headers=()):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, model, text):
+        """Send ``text`` as server-sent events, one word per chunk."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            delta = {"content": word if i == 0 else " " + word}
+            self._chunk(model, delta, None)
+            time.sleep(self.token_latency)
+        self._chunk(model, {}, "stop")
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _chunk(self, model, delta, finish_reason):
+        event = {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        self._write_chunk(b"data: " + json.dumps(event).encode("utf-8") + b"\n\n")
+
+    def _write_chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with self.lock:
+            self.counts["requests"] += 1
+        if not self.path.endswith("/chat/completions"):
+            self._send(404, {"error": {"message": "not found"}})
+            return
+        time.sleep(self.latency)
+        if random.random() < self.error_rate:
+            with self.lock:
+                self.counts["errors"] += 1
+            if random.random() < 0.5:
+                self._send(429, {"error": {"message": "rate limited"}}, [("Retry-After", "0.05")])
+            else:
+                self._send(503, {"error": {"message": "overloaded"}})
+            return
+        messages = request.get("messages", [])
+        prompt = messages[-1]["content"] if messages else ""
+        if request.get("stream"):
+            self._stream(request.get("model", "mock"), f"echo: {prompt}")
+            return
+        prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4 + 1
+        self._send(200, {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": f"echo: {prompt}"},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": prompt_tokens,
+                "total_tokens": 2 * prompt_tokens,
+            },
+        })
+
+
+def serve(port: int = 0, latency: float = 0.0, error_rate: float = 0.0,
+          token_latency: float = 0.0) -> ThreadingHTTPServer:
+    """Start the mock server on a background thread and return it."""
+    handler = type("Handler", (MockHandler,), {
+        "latency": latency,
+        "token_latency": token_latency,
+        "error_rate": error_rate,
+        "counts": {"requests": 0, "errors": 0, "connections": 0},
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI chat-completions endpoint")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of 429/503 replies")
+    parser.add_argument("--token-latency", type=float, default=0.0,
+                        help="Seconds between words of a streamed reply")
+    args = parser.parse_args()
+    server = serve(args.port, args.latency, args.error_rate, args.token_latency)
+    print(f"Serving http://127.0.0.1:{server.server_port}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Append-only JSONL journal of a pipeline run.
+
+Every LLM response, LLM failure and task state change is appended as one
+JSON line and flushed straight away, so an interrupted run loses at most the
+line being written. Reopening the journal reads it back: ``JournaledLLM``
+answers prompts that already have a response from the journal instead of
+calling the model, so rerunning after a crash or Ctrl-C skips finished work.
+With ``replay=True`` it never calls the model at all, which repeats a run
+deterministically and isolates the orchestration overhead for benchmarking.
+
+    journal = RunJournal("run_journal.jsonl")
+    llm = JournaledLLM(LLM(), journal)
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+def prompt_key(model: str, prompt) -> str:
+    payload = json.dumps({"model": model, "prompt": prompt}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ReplayMiss(LookupError):
+    """A replayed run asked for a prompt the journal has no response for."""
+
+
+class RunJournal:
+    """Journal file plus the state rebuilt from it.
+
+    ``responses`` maps prompt keys to responses, ``errors`` holds prompts
+    whose latest attempt failed as (prompt, error), and ``states`` maps task
+    ids to their latest state. Ids must be unique per task (TaskScheduler
+    uses arrival index plus a description hash), not just descriptions.
+    """
+
+    def __init__(self, path: str, fsync: bool = False):
+        self.path = path
+        self.fsync = fsync
+        self.responses: Dict[str, str] = {}
+        self.errors: Dict[str, Tuple[object, str]] = {}
+        self.states: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        torn = self._load()
+        self._file = open(path, "a", encoding="utf-8")
+        if torn:
+            # The last write was cut off; start the next record on a fresh line.
+            self._file.write("\n")
+
+    def _load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, encoding="utf-8") as journal:
+            line = ""
+            for line in journal:
+                try:
+                    self._apply(json.loads(line))
+                except (json.JSONDecodeError, KeyError):
+                    continue
+        return bool(line) and not line.endswith("\n")
+
+    def _apply(self, record: dict) -> None:
+        kind = record["type"]
+        if kind == "response":
+            self.responses[record["key"]] = record["response"]
+            self.errors.pop(record["key"], None)
+        elif kind == "error":
+            self.errors[record["key"]] = (record["prompt"], record["error"])
+        elif kind == "state":
+            self.states[record["task"]] = record["state"]
+
+    def _append(self, record: dict) -> None:
+        record["at"] = time.time()
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._apply(record)
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+    def response(self, key: str) -> Optional[str]:
+        return self.responses.get(key)
+
+    def record_response(self, key: str, prompt, response: str) -> None:
+        self._append({"type": "response", "key": key, "prompt": prompt, "response": response})
+
+    def record_error(self, key: str, prompt, error: BaseException) -> None:
+        self._append({"type": "error", "key": key, "prompt": prompt, "error": repr(error)})
+
+    def record_state(self, task: str, state: str, **details) -> None:
+        self._append({"type": "state", "task": task, "state": state, **details})
+
+    def failed_prompts(self) -> List[object]:
+        """Prompts whose latest attempt failed and that have no response yet."""
+        return [prompt for prompt, _ in self.errors.values()]
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self) -> "RunJournal":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class JournaledLLM:
+    """Wraps an LLM so every call goes through a RunJournal.
+
+    Prompts already answered in the journal are served from it. Otherwise
+    the wrapped ``llm`` is called and the response, or the error, is
+    recorded. Errors are re-raised, never returned as text. With
+    ``replay=True`` (or no ``llm``) the model is never called, and prompts
+    missing from the journal raise ReplayMiss.
+    """
+
+    def __init__(self, llm, journal: RunJournal, replay: bool = False, model: Optional[str] = None):
+        self.llm = llm
+        self.journal = journal
+        self.replay = replay or llm is None
+        self.model = model if model is not None else getattr(llm, "model", "")
+        self.stats = {"journal_hits": 0, "calls": 0, "errors": 0}
+        self._lock = threading.Lock()
+
+    def key(self, prompt) -> str:
+        return prompt_key(self.model, prompt)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def _journaled(self, key: str, prompt) -> Optional[str]:
+        response = self.journal.response(key)
+        if response is not None:
+            self._count("journal_hits")
+            return response
+        if self.replay:
+            raise ReplayMiss(f"No journaled response for prompt {str(prompt)[:80]!r}")
+        self._count("calls")
+        return None
+
+    def generate(self, prompt) -> str:
+        key = self.key(prompt)
+        response = self._journaled(key, prompt)
+        if response is not None:
+            return response
+        try:
+            response = self.llm.generate(prompt)
+        except Exception as exc:
+            self._count("errors")
+            self.journal.record_error(key, prompt, exc)
+            raise
+        self.journal.record_response(key, prompt, response)
+        return response
+
+    def stream(self, prompt) -> Iterator[str]:
+        """Stream from the wrapped LLM; journaled responses come back whole."""
+        key = self.key(prompt)
+        response = self._journaled(key, prompt)
+        if response is not None:
+            yield response
+            return
+        pieces = []
+        try:
+            chunks = self.llm.stream(prompt) if hasattr(self.llm, "stream") else [self.llm.generate(prompt)]
+            for piece in chunks:
+                pieces.append(piece)
+                yield piece
+        except Exception as exc:
+            self._count("errors")
+            self.journal.record_error(key, prompt, exc)
+            raise
+        self.journal.record_response(key, prompt, "".join(pieces).strip())
+
+    def generate_many(self, prompts: Sequence, return_exceptions: bool = False) -> List:
+        """Like the wrapped ``generate_many``, sending only unjournaled prompts."""
+        keys = [self.key(prompt) for prompt in prompts]
+        results: List = [None] * len(prompts)
+        missing = []
+        for i, (key, prompt) in enumerate(zip(keys, prompts)):
+            try:
+                results[i] = self._journaled(key, prompt)
+            except ReplayMiss as exc:
+                results[i] = exc
+                continue
+            if results[i] is None:
+                missing.append(i)
+        if missing:
+            fresh = self.llm.generate_many([prompts[i] for i in missing], return_exceptions=True)
+            for i, result in zip(missing, fresh):
+                if isinstance(result, Exception):
+                    self._count("errors")
+                    self.journal.record_error(keys[i], prompts[i], result)
+                else:
+                    self.journal.record_response(keys[i], prompts[i], result)
+                results[i] = result
+        if not return_exceptions:
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+        return results
+
+    def close(self) -> None:
+        if hasattr(self.llm, "close"):
+            self.llm.close()
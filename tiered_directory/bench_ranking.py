@@ -0,0 +1,54 @@
+"""Time tier ranking on a synthetic set of sites.
+
+Usage:
+    python bench_ranking.py [--sites 1000000] [--categories 20000]
+
+Builds random inbound-link, freshness and Wikipedia signals for ``--sites``
+sites spread over ``--categories`` categories, then reports the time to build
+the ranker, to tier every category, and to update a single signal.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from ranking import Freshness, InboundLinks, ListingOrder, Ranker, WikipediaPresence
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<28} {time.perf_counter() - start:7.2f}s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tier ranking")
+    parser.add_argument("--sites", type=int, default=1_000_000)
+    parser.add_argument("--categories", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    urls = [f"https://site{i}.example/" for i in range(args.sites)]
+    categories = [f"Top/Category_{c}" for c in rng.integers(0, args.categories, args.sites)]
+    domains = [f"site{i}.example" for i in range(args.sites)]
+    links = dict(zip(domains, rng.zipf(2.0, args.sites).tolist()))
+    fresh = dict(zip(domains, rng.random(args.sites).tolist()))
+    wiki = [d for d, hit in zip(domains, rng.random(args.sites) < 0.05) if hit]
+
+    ranker = timed("build ranker (4 signals)", lambda: Ranker(urls, categories, [
+        ListingOrder(),
+        InboundLinks(links, weight=2.0),
+        Freshness(fresh),
+        WikipediaPresence(wiki, weight=3.0),
+    ]))
+    tiers = timed("tier all categories", ranker.tier_indices)
+    changed = dict(links, **{domains[0]: 10_000})
+    timed("update one signal", lambda: ranker.set_signal(InboundLinks(changed, weight=2.0)))
+    timed("re-tier", ranker.tier_indices)
+    counts = np.bincount(tiers, minlength=6)
+    print("tier sizes:", dict(zip("SABCDF", counts.tolist())))
+
+
+if __name__ == "__main__":
+    main()
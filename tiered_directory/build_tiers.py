@@ -1,48 +1,114 @@
-"""Demonstrate simple tier assignment for Curlie category sites.
+"""Assign S/A/B/C/D/F tiers to Curlie category sites.
 
 Usage:
-    python build_tiers.py [category_path]
+    python build_tiers.py [category_path] [--repo REPO] [--wikipedia]
+    python build_tiers.py --crawl internet.jsonl --repo REPO --out tiers.jsonl
 
-The first site is marked S-tier, then A/B/C/D tiers get 2/3/4/5 sites
-respectively, with the remainder assigned to F-tier. This is a placeholder
-algorithm until proper ranking metrics are integrated.
+Sites are scored with the signals in ranking.py and tiered by quantile within
+their category. Curlie's listing order is always a signal; ``--repo`` adds
+inbound links and freshness from a faux_browser repository, and
+``--wikipedia`` adds whether each site's name has a Wikipedia article.
+``--crawl`` tiers every category of a crawl_curlie.py output at once.
+
+Category pages are read through the HTTP cache, so repeated runs within the
+TTL do not touch the network.
 """
-import sys
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+
+from crawl_curlie import read_crawl
+from http_cache import DEFAULT_CACHE_DIR, DEFAULT_TTL, HttpCache, RateLimiter
+from ranking import (
+    TIERS,
+    Freshness,
+    InboundLinks,
+    ListingOrder,
+    Ranker,
+    WikipediaPresence,
+    site_domain,
+)
 from scrape_curlie import fetch_sites
+from scrape_wikipedia import WikiClient, lookup_titles
 
-TIER_COUNTS = [
-    ("S", 1),
-    ("A", 2),
-    ("B", 3),
-    ("C", 4),
-    ("D", 5),
-]
 
+def assign_tiers(sites, signals=None):
+    """Return ``{tier: [site, ...]}`` for one category's sites, best first.
 
-def assign_tiers(sites):
+    Without ``signals`` the sites are ranked by listing order alone.
+    """
+    ranker = Ranker([site["url"] for site in sites], signals=signals or [ListingOrder()])
     tiers = {}
-    idx = 0
-    for tier, count in TIER_COUNTS:
-        if idx >= len(sites):
-            break
-        tiers[tier] = sites[idx:idx + count]
-        idx += count
-    if idx < len(sites):
-        tiers["F"] = sites[idx:]
+    indices = ranker.tier_indices()
+    scores = ranker.scores
+    for i in sorted(range(len(sites)), key=lambda i: -scores[i]):
+        tiers.setdefault(TIERS[indices[i]], []).append(sites[i])
     return tiers
 
 
+def wikipedia_signal(sites, cache: HttpCache) -> WikipediaPresence:
+    """Look up every site name on Wikipedia (50 titles per request)."""
+    found = lookup_titles({site["name"] for site in sites}, WikiClient(cache=cache))
+    present = {site["name"] for site in sites if not found[site["name"]].get("missing")}
+    return WikipediaPresence(site_domain(s["url"]) for s in sites if s["name"] in present)
+
+
 def main():
-    category = (
-        sys.argv[1]
-        if len(sys.argv) > 1
-        else "Computers/Internet/On_the_Web/Online_Communities"
+    parser = argparse.ArgumentParser(description="Assign tiers to Curlie category sites")
+    parser.add_argument(
+        "category", nargs="?", default="Computers/Internet/On_the_Web/Online_Communities"
     )
-    sites = fetch_sites(category)
-    tiers = assign_tiers(sites)
-    for tier in ["S", "A", "B", "C", "D", "F"]:
-        for site in tiers.get(tier, []):
-            print(f"{tier}: {site['name']} - {site['url']}")
+    parser.add_argument("--crawl", help="Tier every category in a crawl_curlie.py JSONL file")
+    parser.add_argument("--repo", help="faux_browser repository for link and freshness signals")
+    parser.add_argument("--wikipedia", action="store_true", help="Use Wikipedia presence")
+    parser.add_argument("--out", help="Write JSONL (category, tier, score, name, url)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="HTTP cache directory")
+    parser.add_argument("--ttl", type=float, default=DEFAULT_TTL, help="Cache lifetime in seconds")
+    parser.add_argument("--offline", action="store_true", help="Only use cached pages")
+    args = parser.parse_args()
+
+    cache = HttpCache(args.cache_dir, ttl=args.ttl, offline=args.offline,
+                      limiter=RateLimiter(4, 0.1))
+    if args.crawl:
+        sites, categories = [], []
+        for record in read_crawl(args.crawl):
+            for site in record.get("sites", ()):
+                sites.append(site)
+                categories.append(record["category"])
+    else:
+        sites = fetch_sites(args.category, cache)
+        categories = [args.category] * len(sites)
+
+    signals = [ListingOrder()]
+    if args.repo:
+        repo = Path(args.repo)
+        signals.append(InboundLinks.from_repository(repo))
+        signals.append(Freshness.from_manifest(repo / "manifest.json"))
+    if args.wikipedia:
+        signals.append(wikipedia_signal(sites, cache))
+    ranker = Ranker([site["url"] for site in sites], categories, signals)
+    tiers = ranker.tier_indices()
+    scores = ranker.scores
+
+    # By category, then tier, then score; ties keep listing order.
+    order = np.lexsort((np.arange(len(sites)), -scores, tiers, ranker.groups))
+    out = open(args.out, "w", encoding="utf-8") if args.out else None
+    try:
+        for i in order:
+            site, tier = sites[i], TIERS[tiers[i]]
+            if out is not None:
+                record = {"category": categories[i], "tier": tier, "score": round(float(scores[i]), 6),
+                          "name": site["name"], "url": site["url"]}
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            elif args.crawl:
+                print(f"{categories[i]} {tier}: {site['name']} - {site['url']}")
+            else:
+                print(f"{tier}: {site['name']} - {site['url']}")
+    finally:
+        if out is not None:
+            out.close()
 
 
 if __name__ == "__main__":
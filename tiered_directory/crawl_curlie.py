@@ -0,0 +1,110 @@
+"""Crawl a Curlie category subtree and stream its sites to JSONL.
+
+Usage:
+    python crawl_curlie.py [category_path] [--out sites.jsonl] [--workers 4]
+Examples:
+    python crawl_curlie.py Computers/Internet --max-depth 2 --out internet.jsonl
+    python crawl_curlie.py Computers/Internet --cache-dir fixtures/ --offline
+
+Each output line is one category:
+    {"category": ..., "depth": n, "sites": [{"name", "url"}], "subcategories": [...]}
+Lines are written as pages arrive, so memory holds only the set of visited
+category names and a bounded window of in-flight requests. Pages come from an
+HttpCache; ``--offline`` replays a previously recorded cache directory without
+touching the network. Network requests stay polite: at most ``--workers`` in
+flight, started at least ``--interval`` seconds apart.
+"""
+import argparse
+import json
+import sys
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from http_cache import DEFAULT_CACHE_DIR, DEFAULT_TTL, HttpCache, RateLimiter
+from scrape_curlie import fetch_category
+
+DEFAULT_CATEGORY = 'Computers/Internet/On_the_Web/Online_Communities'
+
+
+def crawl(root: str, cache: HttpCache, workers: int = 4, max_depth: int | None = None,
+          max_categories: int | None = None):
+    """Yield one record per category in the subtree below ``root``, breadth first.
+
+    Failed pages yield a record with an ``error`` field instead of sites.
+    Fetches go through ``cache``, whose RateLimiter (if any) keeps them polite.
+    """
+    root = root.strip('/')
+    visited = {root}
+    frontier = deque([(root, 0)])
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight = {}
+        while frontier or in_flight:
+            while frontier and len(in_flight) < workers * 2:
+                category, depth = frontier.popleft()
+                in_flight[pool.submit(fetch_category, category, cache)] = (category, depth)
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                category, depth = in_flight.pop(future)
+                try:
+                    sites, subcategories = future.result()
+                except Exception as exc:  # reported in the output, keep going
+                    yield {'category': category, 'depth': depth, 'error': repr(exc)}
+                    continue
+                if max_depth is None or depth < max_depth:
+                    for child in subcategories:
+                        if child in visited:
+                            continue
+                        if max_categories is not None and len(visited) >= max_categories:
+                            break
+                        visited.add(child)
+                        frontier.append((child, depth + 1))
+                yield {
+                    'category': category,
+                    'depth': depth,
+                    'sites': sites,
+                    'subcategories': subcategories,
+                }
+
+
+def read_crawl(path):
+    """Yield the category records of a crawl_curlie.py JSONL file."""
+    with open(path, encoding='utf-8') as fh:
+        for line in fh:
+            if line.strip():
+                yield json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crawl a Curlie category subtree')
+    parser.add_argument('category', nargs='?', default=DEFAULT_CATEGORY)
+    parser.add_argument('--out', help='JSONL output file (default: stdout)')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent requests')
+    parser.add_argument('--interval', type=float, default=0.1,
+                        help='Minimum seconds between request starts')
+    parser.add_argument('--max-depth', type=int, help='Levels below the root to visit')
+    parser.add_argument('--max-categories', type=int, help='Stop after this many categories')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='HTTP cache directory')
+    parser.add_argument('--ttl', type=float, default=DEFAULT_TTL, help='Cache lifetime in seconds')
+    parser.add_argument('--offline', action='store_true', help='Serve every page from the cache')
+    args = parser.parse_args()
+
+    cache = HttpCache(args.cache_dir, ttl=args.ttl, offline=args.offline, pool_size=args.workers,
+                      limiter=RateLimiter(args.workers, args.interval))
+    out = open(args.out, 'w', encoding='utf-8') if args.out else sys.stdout
+    categories = sites = errors = 0
+    try:
+        for record in crawl(args.category, cache, args.workers, args.max_depth,
+                            args.max_categories):
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+            categories += 1
+            sites += len(record.get('sites', ()))
+            errors += 'error' in record
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f'{categories} categories, {sites} sites, {errors} errors '
+          f'({cache.hits} cached, {cache.misses} fetched)', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Persistent on-disk cache for HTTP GET requests.
+
+Responses are stored under ``cache_dir`` as ``<key>.body`` with a ``<key>.json``
+sidecar holding the URL and fetch time, where ``key`` is the SHA-256 of the URL.
+Entries younger than the TTL are served without touching the network. In
+offline mode every request is answered from the cache, stale or not, and a
+miss raises ``CacheMiss``, so a cache directory recorded by one run doubles as
+a set of fixtures for replaying it.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from hashlib import sha256
+from pathlib import Path
+from typing import Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_CACHE_DIR = ".http_cache"
+DEFAULT_TTL = 7 * 24 * 3600
+USER_AGENT = "tiered-directory/0.1"
+
+
+class CacheMiss(LookupError):
+    """Raised in offline mode when a URL has never been fetched."""
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+class RateLimiter:
+    """Politeness limit: at most ``max_concurrent`` requests in flight, with
+    request starts spaced at least ``min_interval`` seconds apart."""
+
+    def __init__(self, max_concurrent: int = 2, min_interval: float = 0.0):
+        self.min_interval = min_interval
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def __enter__(self):
+        self._slots.acquire()
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+        return self
+
+    def __exit__(self, *exc):
+        self._slots.release()
+
+
+class HttpCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl: float = DEFAULT_TTL,
+                 offline: bool = False, pool_size: int = 10,
+                 limiter: RateLimiter | None = None):
+        self.root = Path(cache_dir)
+        self.ttl = ttl
+        self.offline = offline
+        # Applied to network requests only; cache hits are never throttled.
+        self.limiter = limiter or nullcontext()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._session.headers["User-Agent"] = USER_AGENT
+
+    def _paths(self, url: str):
+        key = sha256(url.encode("utf-8")).hexdigest()
+        bucket = self.root / key[:2]
+        return bucket / f"{key}.body", bucket / f"{key}.json"
+
+    def lookup(self, url: str, max_age: float | None = None):
+        """Return the cached body of ``url`` if it is younger than ``max_age``."""
+        body_path, meta_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if max_age is not None and time.time() - meta["fetched_at"] > max_age:
+                return None
+            return body_path.read_text(encoding="utf-8")
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def store(self, url: str, body: str) -> None:
+        body_path, meta_path = self._paths(url)
+        body_path.parent.mkdir(parents=True, exist_ok=True)
+        # Body first: a sidecar only ever points at a complete body.
+        _atomic_write(body_path, body.encode("utf-8"))
+        meta = {"url": url, "fetched_at": time.time()}
+        _atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+
+    def get_text(self, url: str, params: dict | None = None, timeout: float = 10,
+                 validate: Callable[[str], None] | None = None) -> str:
+        """Return the body of ``url``, from the cache when fresh enough.
+
+        ``validate`` is called on a fetched body before it is cached; if it
+        raises, the body is not stored and the exception propagates.
+        """
+        if params:
+            url = requests.Request("GET", url, params=params).prepare().url
+        body = self.lookup(url, None if self.offline else self.ttl)
+        if body is not None:
+            with self._lock:
+                self.hits += 1
+            return body
+        if self.offline:
+            raise CacheMiss(url)
+        with self._lock:
+            self.misses += 1
+        with self.limiter:
+            resp = self._session.get(url, timeout=timeout)
+        resp.raise_for_status()
+        if validate is not None:
+            validate(resp.text)
+        self.store(url, resp.text)
+        return resp.text
+
+    def get_json(self, url: str, params: dict | None = None, timeout: float = 10,
+                 validate: Callable[[object], None] | None = None):
+        """``get_text`` parsed as JSON; ``validate`` sees the parsed value."""
+        check = None if validate is None else lambda body: validate(json.loads(body))
+        return json.loads(self.get_text(url, params, timeout, check))
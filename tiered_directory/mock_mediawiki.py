@@ -0,0 +1,162 @@
+"""Local stand-in for the parts of the MediaWiki API that scrape_wikipedia.py uses.
+
+Usage:
+    python mock_mediawiki.py [--port 8701] [--page-size 10]
+
+Serves ``/w/api.php`` with ``action=query`` for:
+
+* ``list=categorymembers``, returning at most ``--page-size`` members per
+  response and a ``continue`` token for the rest;
+* ``titles=A|B|...``, reporting ``normalized`` titles (underscores to spaces,
+  first letter upper-cased) and one level of ``redirects`` like MediaWiki
+  does, and answering more than 50 titles with a ``toomanyvalues`` error.
+
+``serve(errors={"Category:X": n})`` answers the first ``n`` listings of a
+category with a ``maxlag`` error, like a lagged replica would.
+
+The wiki content is the small ``SAMPLE_WIKI`` below unless ``serve`` is given
+another one. Point the scraper at it with
+``--api-url http://127.0.0.1:8701/w/api.php``.
+"""
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+MAX_TITLES = 50
+
+SAMPLE_WIKI = {
+    "categories": {
+        "Category:Search engines": [f"Engine {n}" for n in range(1, 24)]
+        + ["Category:Web search engines", "Category:Defunct search engines"],
+        "Category:Web search engines": ["Engine 1", "Metasearch", "Category:Search engines"],
+        "Category:Defunct search engines": ["Old engine", "Category:Web search engines"],
+    },
+    "pages": ["Metasearch", "Old engine", "Alpha", "Beta"] + [f"Engine {n}" for n in range(1, 24)],
+    # from -> to, as stored on the redirect pages.
+    "redirects": {"Alpha (software)": "Alpha", "Engine one": "Engine 1"},
+}
+
+
+def normalize(title: str) -> str:
+    title = " ".join(title.replace("_", " ").split())
+    return title[:1].upper() + title[1:]
+
+
+class MediaWikiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    wiki = SAMPLE_WIKI
+    page_size = 10
+    counts = {"requests": 0, "max_titles": 0}
+    # Category title -> listings still to answer with a maxlag error.
+    errors: dict = {}
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        with self.lock:
+            self.counts["requests"] += 1
+        if url.path != "/w/api.php" or params.get("action") != "query":
+            self._send({"error": {"code": "badvalue", "info": "only action=query is supported"}})
+        elif params.get("list") == "categorymembers":
+            self._send(self._category_members(params))
+        elif "titles" in params:
+            self._send(self._titles(params))
+        else:
+            self._send({"error": {"code": "badvalue", "info": "unsupported query"}})
+
+    def _category_members(self, params):
+        title = normalize(params.get("cmtitle", ""))
+        with self.lock:
+            lagged = self.errors.get(title, 0) > 0
+            if lagged:
+                self.errors[title] -= 1
+        if lagged:
+            return {"error": {"code": "maxlag", "info": "Waiting for a database server: 5 seconds lagged."}}
+        members = self.wiki["categories"].get(title, [])
+        limit = self.page_size
+        if params.get("cmlimit", "max") != "max":
+            limit = min(limit, int(params["cmlimit"]))
+        start = int(params.get("cmcontinue", "page|0").split("|")[1])
+        chunk = members[start:start + limit]
+        data = {"query": {"categorymembers": [
+            {"ns": 14 if member.startswith("Category:") else 0, "title": member}
+            for member in chunk
+        ]}}
+        if start + limit < len(members):
+            data["continue"] = {"cmcontinue": f"page|{start + limit}", "continue": "-||"}
+        else:
+            data["batchcomplete"] = True
+        return data
+
+    def _titles(self, params):
+        titles = params["titles"].split("|")
+        with self.lock:
+            self.counts["max_titles"] = max(self.counts["max_titles"], len(titles))
+        if len(titles) > MAX_TITLES:
+            return {"error": {"code": "toomanyvalues",
+                              "info": f"Too many values supplied for parameter \"titles\". "
+                                      f"The limit is {MAX_TITLES}."}}
+        query = {"normalized": [], "redirects": [], "pages": []}
+        resolved = []
+        for title in titles:
+            target = normalize(title)
+            if target != title:
+                query["normalized"].append({"from": title, "to": target})
+            if params.get("redirects") and target in self.wiki["redirects"]:
+                query["redirects"].append({"from": target, "to": self.wiki["redirects"][target]})
+                target = self.wiki["redirects"][target]
+            resolved.append(target)
+        pages = self.wiki["pages"]
+        for title in dict.fromkeys(resolved):
+            if title in pages:
+                query["pages"].append({"pageid": pages.index(title) + 1, "ns": 0, "title": title})
+            else:
+                query["pages"].append({"ns": 0, "title": title, "missing": True})
+        return {"batchcomplete": True, "query": {k: v for k, v in query.items() if v}}
+
+
+def serve(port: int = 0, wiki: dict | None = None, page_size: int = 10,
+          errors: dict | None = None) -> ThreadingHTTPServer:
+    """Start the stand-in on a background thread and return it."""
+    handler = type("Handler", (MediaWikiHandler,), {
+        "wiki": wiki or SAMPLE_WIKI,
+        "page_size": page_size,
+        "counts": {"requests": 0, "max_titles": 0},
+        "errors": dict(errors or {}),
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the MediaWiki API")
+    parser.add_argument("--port", type=int, default=8701)
+    parser.add_argument("--page-size", type=int, default=10,
+                        help="Category members per response before continuing")
+    args = parser.parse_args()
+    server = serve(args.port, page_size=args.page_size)
+    print(f"Serving http://127.0.0.1:{server.server_port}/w/api.php")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
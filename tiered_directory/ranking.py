@@ -0,0 +1,224 @@
+"""Score sites from pluggable ranking signals and bucket them into tiers.
+
+Each signal turns the sites into one column of values scaled to [0, 1]; the
+composite score is the weighted mean of the columns. Sites are then tiered
+within their category by quantile, using the thresholds from the README:
+S = top 0.1%, A = next 0.9%, B = next 4%, C = next 15%, D = next 30%, and F
+for the rest. Every step works on NumPy arrays, so re-tiering a million sites
+takes a fraction of a second once the signal values are known.
+
+Changing one signal with ``Ranker.set_signal`` swaps that column in place and
+adjusts the composite score without recomputing the other signals.
+
+    ranker = Ranker(urls, categories, [ListingOrder(), InboundLinks.from_repository(repo)])
+    tiers = ranker.tier_labels()
+"""
+import json
+import math
+import re
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+TIERS = ["S", "A", "B", "C", "D", "F"]
+# Cumulative share of each category that falls in S, A, B, C and D.
+TIER_CUTOFFS = np.array([0.001, 0.01, 0.05, 0.20, 0.50])
+# Scheme, optional userinfo, then the host; cheaper than urlsplit per site.
+_HOST = re.compile(r"(?:[a-zA-Z][a-zA-Z0-9+.-]*:)?//(?:[^@/?#]*@)?([^:/?#]*)")
+_HREF = re.compile(rb"""href\s*=\s*["']?https?://([^/"'\s>:?#]+)""", re.IGNORECASE)
+
+
+def site_domain(url: str) -> str:
+    """Return the host of ``url`` without a leading ``www.``."""
+    match = _HOST.match(url)
+    host = (match.group(1) if match and match.group(1) else url).lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def minmax(values: np.ndarray) -> np.ndarray:
+    low, high = values.min(initial=0.0), values.max(initial=0.0)
+    if high == low:
+        return np.zeros_like(values, dtype=float)
+    return (values - low) / (high - low)
+
+
+class Signal:
+    """A ranking signal. Subclasses implement ``values`` for a ranker's sites."""
+
+    name = "signal"
+
+    def __init__(self, weight: float = 1.0):
+        self.weight = weight
+
+    def values(self, ranker: "Ranker") -> np.ndarray:
+        raise NotImplementedError
+
+    def column(self, ranker: "Ranker") -> np.ndarray:
+        return minmax(np.asarray(self.values(ranker), dtype=float))
+
+
+class ListingOrder(Signal):
+    """Earlier position in the category listing ranks higher (Curlie's own order)."""
+
+    name = "listing_order"
+
+    def values(self, ranker):
+        return 1.0 - ranker.positions / np.maximum(ranker.sizes[ranker.groups], 1)
+
+
+class DomainSignal(Signal):
+    """Signal given as a value per domain; unknown domains get ``default``."""
+
+    def __init__(self, by_domain: dict, weight: float = 1.0, default: float = 0.0):
+        super().__init__(weight)
+        self.by_domain = by_domain
+        self.default = default
+
+    def values(self, ranker):
+        get = self.by_domain.get
+        return np.fromiter(
+            (get(domain, self.default) for domain in ranker.domains),
+            dtype=float,
+            count=len(ranker.domains),
+        )
+
+
+class WikipediaPresence(DomainSignal):
+    """1 for sites with a Wikipedia article, 0 otherwise."""
+
+    name = "wikipedia"
+
+    def __init__(self, domains, weight: float = 1.0):
+        super().__init__(dict.fromkeys(domains, 1.0), weight)
+
+
+class InboundLinks(DomainSignal):
+    """Number of other crawled domains linking to a site, on a log scale."""
+
+    name = "inbound_links"
+
+    def column(self, ranker):
+        return minmax(np.log1p(self.values(ranker)))
+
+    @classmethod
+    def from_repository(cls, repo: Path, weight: float = 1.0) -> "InboundLinks":
+        """Count linking domains in a faux_browser repository's ``pages/``."""
+        counts = Counter()
+        pages = Path(repo) / "pages"
+        for domain_dir in pages.iterdir() if pages.exists() else ():
+            source = site_domain(f"http://{domain_dir.name}")
+            targets = set()
+            for path in domain_dir.rglob("*.htm*"):
+                targets.update(m.decode("ascii", "replace").lower() for m in _HREF.findall(path.read_bytes()))
+            for target in {site_domain(f"http://{t}") for t in targets}:
+                if target != source:
+                    counts[target] += 1
+        return cls(dict(counts), weight)
+
+
+class Freshness(DomainSignal):
+    """How recently a site was fetched, halving every ``half_life_days``."""
+
+    name = "freshness"
+
+    def column(self, ranker):
+        # Already on an absolute 0..1 scale; min-max would exaggerate small gaps.
+        return self.values(ranker)
+
+    @classmethod
+    def from_manifest(cls, manifest: Path, half_life_days: float = 30.0,
+                      weight: float = 1.0, now: datetime | None = None) -> "Freshness":
+        """Read ``fetched_at`` times from a faux_browser ``manifest.json``."""
+        manifest = Path(manifest)
+        entries = json.loads(manifest.read_text()) if manifest.exists() else {}
+        journal = manifest.with_suffix(".journal")
+        if journal.exists():
+            # Entries recorded since the last compaction (see manifest_store.py).
+            for line in journal.read_text(encoding="utf-8").splitlines():
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                entries[record["url"]] = record["entry"]
+        now = now or datetime.now(timezone.utc)
+        decay = math.log(2) / (half_life_days * 86400)
+        latest = {}
+        for url, entry in entries.items():
+            fetched = entry.get("fetched_at")
+            if not fetched:
+                continue
+            age = (now - datetime.fromisoformat(fetched)).total_seconds()
+            domain = site_domain(url)
+            latest[domain] = max(latest.get(domain, 0.0), math.exp(-decay * max(age, 0.0)))
+        return cls(latest, weight)
+
+
+class Ranker:
+    """Composite scores and per-category tiers for a fixed list of sites."""
+
+    def __init__(self, urls, categories=None, signals=()):
+        self.urls = list(urls)
+        self.domains = [site_domain(url) for url in self.urls]
+        n = len(self.urls)
+        if categories is None:
+            self.groups = np.zeros(n, dtype=np.int64)
+            self.categories = [""]
+        else:
+            # Dict-based encoding; np.unique on Python strings is far slower.
+            codes: dict[str, int] = {}
+            self.groups = np.fromiter(
+                (codes.setdefault(c, len(codes)) for c in categories), dtype=np.int64, count=n
+            )
+            self.categories = list(codes)
+        self.sizes = np.bincount(self.groups, minlength=len(self.categories))
+        # Position of each site within its category, in input order.
+        order = np.argsort(self.groups, kind="stable")
+        starts = np.concatenate(([0], np.cumsum(self.sizes)[:-1]))
+        self.positions = np.empty(n, dtype=np.int64)
+        self.positions[order] = np.arange(n) - starts[self.groups[order]]
+        self.columns: dict[str, np.ndarray] = {}
+        self.weights: dict[str, float] = {}
+        self._weighted = np.zeros(n)
+        for signal in signals:
+            self.set_signal(signal)
+
+    def set_signal(self, signal: Signal) -> None:
+        """Add or replace ``signal``; only its column is recomputed."""
+        column = signal.column(self)
+        if signal.name in self.columns:
+            self._weighted -= self.weights[signal.name] * self.columns[signal.name]
+        self._weighted += signal.weight * column
+        self.columns[signal.name] = column
+        self.weights[signal.name] = signal.weight
+
+    def remove_signal(self, name: str) -> None:
+        self._weighted -= self.weights.pop(name) * self.columns.pop(name)
+
+    @property
+    def scores(self) -> np.ndarray:
+        total = sum(self.weights.values())
+        return self._weighted / total if total else np.zeros_like(self._weighted)
+
+    def tier_indices(self) -> np.ndarray:
+        """Return each site's tier as an index into ``TIERS``.
+
+        Within a category, sites are ordered by score (ties keep input order)
+        and the first ``cutoff * size`` sites, rounded to the nearest whole
+        site, fall in each tier or above. Each tier's share of a category is
+        therefore within one site of its quantile, and a tier too small for the
+        category (S below 500 sites) stays empty rather than taking the top site.
+        """
+        n = len(self.urls)
+        order = np.lexsort((np.arange(n), -self.scores, self.groups))
+        groups = self.groups[order]
+        starts = np.concatenate(([0], np.cumsum(self.sizes)[:-1]))
+        rank = np.arange(n) - starts[groups]
+        bounds = np.floor(np.outer(self.sizes, TIER_CUTOFFS) + 0.5).astype(np.int64)
+        tiers = np.empty(n, dtype=np.int8)
+        tiers[order] = (rank[:, None] >= bounds[groups]).sum(axis=1)
+        return tiers
+
+    def tier_labels(self) -> list[str]:
+        return [TIERS[i] for i in self.tier_indices()]
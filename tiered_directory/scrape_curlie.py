@@ -4,24 +4,95 @@ Usage:
     python scrape_curlie.py [category_path]
 Example:
     python scrape_curlie.py Computers/Internet/On_the_Web/Online_Communities
+
+Pages are parsed with lxml when it is installed and html.parser otherwise.
+Pass an ``HttpCache`` to ``fetch_sites``/``fetch_category`` to reuse responses
+across runs.
 """
 import sys
+from urllib.parse import unquote
+
 import requests
 from bs4 import BeautifulSoup
 
+try:
+    import lxml.html
+except ImportError:  # optional speedup
+    lxml = None
+
 BASE_URL = "https://curlie.org/en/"
+SITE_XPATH = (
+    "//div[contains(concat(' ', normalize-space(@class), ' '), ' title-and-desc ')]"
+)
+
+
+def category_url(category: str) -> str:
+    return BASE_URL + category.strip('/') + '/'
+
+
+def _child_category(href: str, prefix: str):
+    """Return the child category named by ``href`` if it is directly under ``prefix``."""
+    path = unquote(href.split('#', 1)[0].split('?', 1)[0])
+    if path.startswith('https://curlie.org'):
+        path = path[len('https://curlie.org'):]
+    if not path.startswith(prefix) or path == prefix:
+        return None
+    rest = path[len(prefix):].strip('/')
+    return prefix[len('/en/'):] + rest if rest and '/' not in rest else None
+
+
+def _site_name(text: str) -> str:
+    # Titles wrap across lines and nest <b>/<i>; both parsers collapse the same way.
+    return ' '.join(text.split())
 
-def fetch_sites(category: str):
-    url = BASE_URL + category.strip('/') + '/'
-    resp = requests.get(url, timeout=10)
-    resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, 'html.parser')
+
+def parse_category(html: str, category: str):
+    """Return (sites, subcategories) listed on a category page."""
+    prefix = '/en/' + category.strip('/') + '/'
     sites = []
-    for td in soup.select('div.title-and-desc'):
-        a = td.find('a', href=True)
-        if a and a['href'].startswith('http'):
-            sites.append({'name': a.get_text(strip=True), 'url': a['href']})
-    return sites
+    hrefs = []
+    if lxml is not None:
+        doc = lxml.html.fromstring(html)
+        for div in doc.xpath(SITE_XPATH):
+            links = div.xpath('.//a[@href]')
+            if links and links[0].get('href').startswith('http'):
+                a = links[0]
+                sites.append({'name': _site_name(a.text_content()), 'url': a.get('href')})
+        hrefs = doc.xpath('//a/@href')
+    else:
+        soup = BeautifulSoup(html, 'html.parser')
+        for td in soup.select('div.title-and-desc'):
+            a = td.find('a', href=True)
+            if a and a['href'].startswith('http'):
+                sites.append({'name': _site_name(a.get_text()), 'url': a['href']})
+        hrefs = [a['href'] for a in soup.find_all('a', href=True)]
+    subcategories = []
+    for href in hrefs:
+        child = _child_category(href, prefix)
+        if child and child not in subcategories:
+            subcategories.append(child)
+    return sites, subcategories
+
+
+def parse_sites(html: str):
+    return parse_category(html, '')[0]
+
+
+def fetch_category(category: str, cache=None):
+    """Fetch a category page and return (sites, subcategories)."""
+    url = category_url(category)
+    if cache is not None:
+        html = cache.get_text(url)
+    else:
+        resp = requests.get(url, timeout=10)
+        resp.raise_for_status()
+        html = resp.text
+    return parse_category(html, category)
+
+
+def fetch_sites(category: str, cache=None):
+    return fetch_category(category, cache)[0]
+
 
 if __name__ == '__main__':
     category = sys.argv[1] if len(sys.argv) > 1 else 'Computers/Internet/On_the_Web/Online_Communities'
@@ -1,27 +1,209 @@
 """Fetch members of a Wikipedia category via MediaWiki API.
 
 Usage:
-    python scrape_wikipedia.py [Category_Name]
+    python scrape_wikipedia.py [Category_Name] [--depth N] [--workers 4]
 Example:
-    python scrape_wikipedia.py Search_engine_software
+    python scrape_wikipedia.py Search_engine_software --depth 2 --out members.jsonl
+
+Listings follow the API's ``continue`` token, so large categories are returned
+in full. With ``--depth``, subcategories are visited breadth first (each at
+most once, so category cycles terminate) and concurrently, within a politeness
+limit of ``--workers`` requests in flight spaced ``--interval`` seconds apart.
+Responses are cached on disk (see http_cache.py); ``--api-url`` points the
+client at another MediaWiki install or a local stand-in server.
 """
+import argparse
+import json
 import sys
-import requests
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from http_cache import DEFAULT_CACHE_DIR, DEFAULT_TTL, HttpCache, RateLimiter
 
 API_URL = "https://en.wikipedia.org/w/api.php"
+CATEGORY_NS = 14
+# MediaWiki accepts at most 50 titles per request for ordinary clients.
+MAX_TITLES = 50
+
+
+class WikiClient:
+    def __init__(self, api_url: str = API_URL, cache: HttpCache | None = None):
+        self.api_url = api_url
+        self.cache = cache or HttpCache()
+
+    def query(self, params: dict) -> dict:
+        params = {"action": "query", "format": "json", "formatversion": 2, **params}
+        # Checked before caching, so maxlag/ratelimited replies are retried
+        # on the next call instead of being replayed for the whole TTL.
+        return self.cache.get_json(self.api_url, params, validate=_check_response)
+
+    def iter_query(self, params: dict):
+        """Yield every response of a query, following ``continue`` tokens."""
+        cont = {}
+        while True:
+            data = self.query({**params, **cont})
+            yield data
+            if "continue" not in data:
+                return
+            cont = data["continue"]
+
 
-def fetch_category_members(category: str, limit: int = 20):
+def _check_response(data) -> None:
+    if "error" in data:
+        raise RuntimeError(f"MediaWiki error: {data['error']}")
+
+
+def _category_title(category: str) -> str:
+    return category if category.startswith("Category:") else f"Category:{category}"
+
+
+def list_members(client: WikiClient, category: str):
+    """Return (pages, subcategories) of ``category``, following continuation."""
+    pages, subcategories = [], []
     params = {
-        'action': 'query',
-        'list': 'categorymembers',
-        'cmtitle': f'Category:{category}',
-        'cmlimit': limit,
-        'format': 'json'
+        "list": "categorymembers",
+        "cmtitle": _category_title(category),
+        "cmlimit": "max",
+        "cmprop": "title|ns",
     }
-    data = requests.get(API_URL, params=params, timeout=10).json()
-    return [m['title'] for m in data.get('query', {}).get('categorymembers', [])]
+    for data in client.iter_query(params):
+        for member in data.get("query", {}).get("categorymembers", []):
+            target = subcategories if member["ns"] == CATEGORY_NS else pages
+            target.append(member["title"])
+    return pages, subcategories
+
+
+def fetch_category_members(category: str, limit: int | None = None,
+                           client: WikiClient | None = None):
+    """Return the titles of every member of ``category`` (at most ``limit``)."""
+    pages, subcategories = list_members(client or WikiClient(), category)
+    titles = pages + subcategories
+    return titles[:limit] if limit is not None else titles
+
+
+def walk_category(root: str, client: WikiClient, max_depth: int = 0, workers: int = 4):
+    """Yield one record per category for ``root`` and the subcategories below
+    it, up to ``max_depth`` levels down.
+
+    Records hold ``category``, ``depth``, ``pages`` and ``subcategories``, or
+    an ``error`` instead of the last two if the listing failed. Category
+    listings run concurrently on ``workers`` threads; the client's limiter
+    bounds how many reach the API at once.
+    """
+    root = _category_title(root)
+    visited = {root}
+    frontier = deque([(root, 0)])
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight = {}
+        while frontier or in_flight:
+            while frontier and len(in_flight) < workers * 2:
+                category, depth = frontier.popleft()
+                in_flight[pool.submit(list_members, client, category)] = (category, depth)
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                category, depth = in_flight.pop(future)
+                try:
+                    pages, subcategories = future.result()
+                except Exception as exc:  # reported in the output, keep going
+                    yield {"category": category, "depth": depth, "error": repr(exc)}
+                    continue
+                if depth < max_depth:
+                    for child in subcategories:
+                        if child not in visited:
+                            visited.add(child)
+                            frontier.append((child, depth + 1))
+                yield {"category": category, "depth": depth, "pages": pages,
+                       "subcategories": subcategories}
+
+
+def _merge_page(into: dict, page: dict) -> None:
+    # Continued prop queries return more values for the same page; extend lists.
+    for key, value in page.items():
+        if isinstance(value, list) and isinstance(into.get(key), list):
+            into[key].extend(value)
+        else:
+            into.setdefault(key, value)
+
+
+def lookup_titles(titles, client: WikiClient, prop: str = "info", workers: int = 4,
+                  extra: dict | None = None) -> dict:
+    """Look up ``titles`` in batches of 50 and return page data per input title.
+
+    Normalized and redirected titles are resolved, so each requested title maps
+    to the page it ends up at; missing pages map to ``{"missing": True, ...}``.
+    """
+    titles = list(dict.fromkeys(titles))
+    batches = [titles[i:i + MAX_TITLES] for i in range(0, len(titles), MAX_TITLES)]
+
+    def run(batch):
+        params = {"titles": "|".join(batch), "prop": prop, "redirects": 1, **(extra or {})}
+        pages, aliases = {}, {}
+        for data in client.iter_query(params):
+            query = data.get("query", {})
+            for item in query.get("normalized", []) + query.get("redirects", []):
+                aliases[item["from"]] = item["to"]
+            for page in query.get("pages", []):
+                _merge_page(pages.setdefault(page["title"], {}), page)
+        result = {}
+        for title in batch:
+            resolved = title
+            # A title can be normalized and then redirected; follow the chain.
+            for _ in range(len(aliases) + 1):
+                if resolved not in aliases:
+                    break
+                resolved = aliases[resolved]
+            result[title] = pages.get(resolved, {"title": resolved, "missing": True})
+        return result
+
+    found = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(run, batches):
+            found.update(result)
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List members of a Wikipedia category")
+    parser.add_argument("category", nargs="?", default="Search_engine_software")
+    parser.add_argument("--depth", type=int, default=0, help="Subcategory levels to visit")
+    parser.add_argument("--workers", type=int, default=4, help="Requests in flight at once")
+    parser.add_argument("--interval", type=float, default=0.1,
+                        help="Minimum seconds between request starts")
+    parser.add_argument("--api-url", default=API_URL, help="MediaWiki api.php endpoint")
+    parser.add_argument("--out", help="Write one JSON line per category instead of titles")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="HTTP cache directory")
+    parser.add_argument("--ttl", type=float, default=DEFAULT_TTL, help="Cache lifetime in seconds")
+    parser.add_argument("--offline", action="store_true", help="Only use cached responses")
+    args = parser.parse_args()
+
+    cache = HttpCache(
+        args.cache_dir,
+        ttl=args.ttl,
+        offline=args.offline,
+        pool_size=args.workers,
+        limiter=RateLimiter(args.workers, args.interval),
+    )
+    client = WikiClient(args.api_url, cache)
+    out = open(args.out, "w", encoding="utf-8") if args.out else None
+    categories = pages_seen = errors = 0
+    try:
+        for record in walk_category(args.category, client, args.depth, args.workers):
+            categories += 1
+            pages_seen += len(record.get("pages", ()))
+            errors += "error" in record
+            if out is not None:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            elif "error" in record:
+                print(f"{record['category']}: {record['error']}", file=sys.stderr)
+            else:
+                for title in record["pages"] + record["subcategories"]:
+                    print(title)
+    finally:
+        if out is not None:
+            out.close()
+    print(f"{categories} categories, {pages_seen} pages, {errors} errors "
+          f"({cache.hits} cached, {cache.misses} fetched)", file=sys.stderr)
+
 
-if __name__ == '__main__':
-    category = sys.argv[1] if len(sys.argv) > 1 else 'Search_engine_software'
-    for title in fetch_category_members(category):
-        print(title)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Offline tests for scrape_curlie.py and crawl_curlie.py on recorded fixture pages."""
+from pathlib import Path
+
+import pytest
+
+import scrape_curlie
+from crawl_curlie import crawl
+from http_cache import HttpCache
+from scrape_curlie import category_url, parse_category
+
+FIXTURES = Path(__file__).with_name("fixtures") / "curlie"
+PAGES = sorted(FIXTURES.glob("*.html"))
+
+
+def fixture_category(path: Path) -> str:
+    return path.stem.replace("__", "/")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = HttpCache(tmp_path / "cache", offline=True)
+    for page in PAGES:
+        cache.store(category_url(fixture_category(page)), page.read_text(encoding="utf-8"))
+    return cache
+
+
+@pytest.mark.parametrize("page", PAGES, ids=lambda page: page.stem)
+def test_parsers_agree(page, monkeypatch):
+    pytest.importorskip("lxml")
+    html, category = page.read_text(encoding="utf-8"), fixture_category(page)
+    with_lxml = parse_category(html, category)
+    monkeypatch.setattr(scrape_curlie, "lxml", None)
+    assert parse_category(html, category) == with_lxml
+
+
+def test_parse_category():
+    page = FIXTURES / "Computers__Internet.html"
+    sites, subcategories = parse_category(page.read_text(encoding="utf-8"), "Computers/Internet")
+    assert sites == [
+        {"name": "Internet Society", "url": "https://www.internetsociety.org/"},
+        {"name": "World Wide Web Consortium & friends", "url": "https://www.w3.org/"},
+    ]
+    # Direct children only, deduplicated, absolute links and escapes resolved.
+    assert subcategories == [
+        "Computers/Internet/Chat",
+        "Computers/Internet/Searching",
+        "Computers/Internet/Web Design",
+        "Computers/Internet/Related",
+    ]
+
+
+def test_crawl_offline(cache):
+    records = {record["category"]: record for record in crawl("Computers/Internet", cache, workers=2)}
+    assert {name: record["depth"] for name, record in records.items()} == {
+        "Computers/Internet": 0,
+        "Computers/Internet/Chat": 1,
+        "Computers/Internet/Searching": 1,
+        "Computers/Internet/Web Design": 1,
+        "Computers/Internet/Related": 1,
+        "Computers/Internet/Searching/Engines": 2,
+    }
+    assert [site["name"] for site in records["Computers/Internet/Chat"]["sites"]] == ["Libera.Chat", "Matrix"]
+    assert [site["name"] for site in records["Computers/Internet/Searching"]["sites"]] == ["Search Engine Land"]
+    # Pages missing from the recording are reported, not fatal.
+    assert "CacheMiss" in records["Computers/Internet/Web Design"]["error"]
+    assert cache.misses == 0
+
+
+def test_crawl_limits(cache):
+    assert [r["category"] for r in crawl("Computers/Internet", cache, max_depth=0)] == ["Computers/Internet"]
+    records = list(crawl("Computers/Internet", cache, max_categories=3))
+    assert len(records) == 3
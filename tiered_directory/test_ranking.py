@@ -0,0 +1,38 @@
+"""Tests for tier allocation in ranking.py."""
+import numpy as np
+import pytest
+
+from ranking import TIER_CUTOFFS, TIERS, ListingOrder, Ranker
+
+
+def tier_counts(size):
+    ranker = Ranker([f"https://site{i}.example/" for i in range(size)], signals=[ListingOrder()])
+    return np.bincount(ranker.tier_indices(), minlength=len(TIERS))
+
+
+@pytest.mark.parametrize("size, expected", [
+    (1, {"D": 1}),
+    (10, {"B": 1, "C": 1, "D": 3, "F": 5}),
+    (100, {"A": 1, "B": 4, "C": 15, "D": 30, "F": 50}),
+    (1000, {"S": 1, "A": 9, "B": 40, "C": 150, "D": 300, "F": 500}),
+])
+def test_small_categories_follow_the_quantiles(size, expected):
+    assert dict(zip(TIERS, tier_counts(size).tolist())) == {tier: expected.get(tier, 0) for tier in TIERS}
+
+
+def test_every_size_stays_within_one_site_of_its_quantiles():
+    for size in range(1, 1200):
+        counts = tier_counts(size)
+        cumulative = np.cumsum(counts)[:-1]
+        assert np.all(np.abs(cumulative - TIER_CUTOFFS * size) <= 0.5), size
+        assert counts[0] <= counts[1], size
+
+
+def test_better_scores_never_get_worse_tiers():
+    ranker = Ranker([f"https://site{i}.example/" for i in range(250)],
+                    ["Top/A" if i % 3 else "Top/B" for i in range(250)], [ListingOrder()])
+    tiers = ranker.tier_indices()
+    for group in range(len(ranker.categories)):
+        members = np.flatnonzero(ranker.groups == group)
+        ranked = tiers[members[np.argsort(-ranker.scores[members], kind="stable")]]
+        assert np.all(np.diff(ranked) >= 0)
@@ -0,0 +1,103 @@
+"""Tests for scrape_wikipedia.py against the mock_mediawiki.py stand-in."""
+import pytest
+
+from http_cache import HttpCache
+from mock_mediawiki import serve
+from scrape_wikipedia import WikiClient, list_members, lookup_titles, walk_category
+
+
+@pytest.fixture
+def wiki(tmp_path):
+    server = serve(page_size=10)
+    client = WikiClient(f"http://127.0.0.1:{server.server_port}/w/api.php",
+                        HttpCache(tmp_path / "cache", ttl=3600))
+    yield server, client
+    server.shutdown()
+    server.server_close()
+
+
+def test_list_members_follows_continuation(wiki):
+    server, client = wiki
+    pages, subcategories = list_members(client, "Search_engines")
+    assert pages == [f"Engine {n}" for n in range(1, 24)]
+    assert subcategories == ["Category:Web search engines", "Category:Defunct search engines"]
+    # 25 members at 10 per response.
+    assert server.RequestHandlerClass.counts["requests"] == 3
+
+
+def test_walk_category_visits_each_category_once(wiki):
+    _, client = wiki
+    visited = [(record["category"], record["depth"]) for record in walk_category(
+        "Search engines", client, max_depth=5, workers=3)]
+    # The subcategories link back to the root and to each other.
+    assert sorted(visited) == [
+        ("Category:Defunct search engines", 1),
+        ("Category:Search engines", 0),
+        ("Category:Web search engines", 1),
+    ]
+
+
+def test_walk_category_respects_depth(wiki):
+    _, client = wiki
+    visited = [record["category"] for record in walk_category("Search engines", client)]
+    assert visited == ["Category:Search engines"]
+
+
+def test_lookup_titles_batches_fifty_per_request(wiki):
+    server, client = wiki
+    titles = [f"Engine {n}" for n in range(1, 24)] + [f"Missing {n}" for n in range(100)]
+    found = lookup_titles(titles, client, workers=2)
+    counts = server.RequestHandlerClass.counts
+    assert counts["requests"] == 3
+    assert counts["max_titles"] == 50
+    assert set(found) == set(titles)
+    assert not found["Engine 7"].get("missing")
+    assert found["Missing 3"]["missing"]
+
+
+def test_lookup_titles_resolves_alias_chains(wiki):
+    _, client = wiki
+    found = lookup_titles(["alpha_(software)", "Engine_one", "Beta", "beta", "gamma"], client)
+    # Normalized, then redirected.
+    assert found["alpha_(software)"]["title"] == "Alpha"
+    assert found["Engine_one"]["title"] == "Engine 1"
+    assert found["beta"]["title"] == "Beta" and not found["beta"].get("missing")
+    assert found["gamma"] == {"ns": 0, "title": "Gamma", "missing": True}
+
+
+def test_repeat_queries_are_served_from_cache(wiki):
+    server, client = wiki
+    list_members(client, "Search engines")
+    list_members(client, "Search engines")
+    assert server.RequestHandlerClass.counts["requests"] == 3
+    assert client.cache.hits == 3
+
+
+def test_error_replies_are_not_cached(tmp_path):
+    server = serve(errors={"Category:Web search engines": 1})
+    try:
+        client = WikiClient(f"http://127.0.0.1:{server.server_port}/w/api.php",
+                            HttpCache(tmp_path / "cache", ttl=3600))
+        with pytest.raises(RuntimeError, match="maxlag"):
+            list_members(client, "Web search engines")
+        # The lagged reply was not stored, so the next call asks again and succeeds.
+        assert list_members(client, "Web search engines")[0] == ["Engine 1", "Metasearch"]
+        assert server.RequestHandlerClass.counts["requests"] == 2
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_walk_category_reports_failed_listings_and_continues(tmp_path):
+    server = serve(errors={"Category:Web search engines": 1})
+    try:
+        client = WikiClient(f"http://127.0.0.1:{server.server_port}/w/api.php",
+                            HttpCache(tmp_path / "cache", ttl=3600))
+        records = {r["category"]: r for r in walk_category("Search engines", client, max_depth=5)}
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert set(records) == {"Category:Search engines", "Category:Web search engines",
+                            "Category:Defunct search engines"}
+    assert "maxlag" in records["Category:Web search engines"]["error"]
+    assert records["Category:Defunct search engines"]["pages"] == ["Old engine"]